@@ -0,0 +1,52 @@
+#!/usr/bin/env python
+# encoding: utf8
+
+"""Compares building models from NDJSON lines serially against
+tienda_mobil.HydrateModels over a process pool.
+
+Usage:
+    python benchmarks/bench_bulk.py [--orders N] [--items N] [--workers N]
+        [--chunk-size N]
+"""
+
+from __future__ import print_function
+
+import argparse
+import json
+import multiprocessing
+
+from payloads import MakePendingOrders, MakeOrders, BestOf
+import tienda_mobil
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--orders', type=int, default=200000)
+    parser.add_argument('--items', type=int, default=10)
+    parser.add_argument('--workers', type=int, default=multiprocessing.cpu_count())
+    parser.add_argument('--chunk-size', type=int, default=1000)
+    args = parser.parse_args()
+
+    previews = [json.dumps(x) for x in MakePendingOrders(args.orders)['data']]
+    orders = [json.dumps(x) for x in MakeOrders(args.orders // 10, items=args.items)]
+
+    cases = [
+        ('OrderPreview', tienda_mobil.OrderPreview, previews, False),
+        ('Order', tienda_mobil.Order, orders, False),
+        ('Order, nested', tienda_mobil.Order, orders, True),
+    ]
+    print('{0} workers, chunks of {1}'.format(args.workers, args.chunk_size))
+    for name, model, lines, nested in cases:
+        def run(workers):
+            return lambda: tienda_mobil.HydrateModels(
+                lines, model, workers=workers, chunk_size=args.chunk_size,
+                nested=nested)
+        serial = BestOf(run(0), 3)
+        parallel = BestOf(run(args.workers), 3)
+        print('{0:<14} {1:8d} objects  serial {2:8.3f}s  parallel {3:8.3f}s'
+              '  speedup {4:5.2f}x'.format(
+                  name, len(lines), serial, parallel, serial / parallel))
+
+
+if __name__ == '__main__':
+    main()
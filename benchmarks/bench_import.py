@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+# encoding: utf8
+
+"""Guards the cold-start cost of importing tienda_mobil.
+
+Every statement runs in a fresh interpreter with -X importtime. The script
+reports the cumulative import time of the tienda_mobil package (best of
+--repeat runs) and the heavy modules it pulled in. It exits with status 1
+if a statement goes over --budget milliseconds or loads any module of the
+HTTP stack (requests, urllib3, aiohttp).
+
+Usage:
+    python benchmarks/bench_import.py [--budget MS] [--repeat N]
+"""
+
+from __future__ import print_function
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+STATEMENTS = (
+    'import tienda_mobil',
+    'from tienda_mobil import Order',
+)
+
+FORBIDDEN = ('requests', 'urllib3', 'aiohttp')
+
+# import time:      1234 |       5678 | tienda_mobil
+_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$')
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def measure(statement):
+    """Returns the cumulative import time of tienda_mobil, in milliseconds,
+    and the top-level names of every module it imported."""
+    code = '{0}\nimport sys\nprint(" ".join(sys.modules))'.format(statement)
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        cwd=ROOT, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+        universal_newlines=True, check=True)
+
+    cumulative = 0
+    for line in proc.stderr.splitlines():
+        match = _LINE.match(line)
+        if match and match.group(4) == 'tienda_mobil':
+            cumulative = int(match.group(2))
+    modules = set(name.split('.')[0] for name in proc.stdout.split())
+    return cumulative / 1000., modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--budget', type=float, default=50.,
+                        help='maximum import time in milliseconds')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    failed = False
+    for statement in STATEMENTS:
+        results = [measure(statement) for _ in range(args.repeat)]
+        best = min(ms for ms, _ in results)
+        loaded = sorted(set(FORBIDDEN) & results[0][1])
+
+        status = 'ok'
+        if best > args.budget:
+            status = 'OVER BUDGET ({0:.0f} ms)'.format(args.budget)
+        if loaded:
+            status = 'loaded {0}'.format(', '.join(loaded))
+        failed = failed or status != 'ok'
+        print('{0:<34} {1:8.1f} ms  {2}'.format(statement, best, status))
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
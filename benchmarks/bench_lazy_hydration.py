@@ -0,0 +1,60 @@
+#!/usr/bin/env python
+# encoding: utf8
+
+"""Times NewFromJsonDict over large order lists when callers only read
+top-level fields, and when they also read the nested customer and items.
+
+Usage:
+    python benchmarks/bench_lazy_hydration.py [--orders N] [--items N]
+"""
+
+from __future__ import print_function
+
+import argparse
+
+from payloads import MakePendingOrders, MakeOrders, BestOf
+import tienda_mobil
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--orders', type=int, default=20000)
+    parser.add_argument('--items', type=int, default=10)
+    args = parser.parse_args()
+
+    previews = MakePendingOrders(args.orders)['data']
+    orders = MakeOrders(args.orders // 10, items=args.items)
+
+    def previews_top_level():
+        for x in previews:
+            p = tienda_mobil.OrderPreview.NewFromJsonDict(x)
+            p.id, p.totalAmount
+
+    def previews_with_customer():
+        for x in previews:
+            p = tienda_mobil.OrderPreview.NewFromJsonDict(x)
+            p.id, p.totalAmount, p.customer.code
+
+    def orders_top_level():
+        for x in orders:
+            o = tienda_mobil.Order.NewFromJsonDict(x)
+            o.id, o.priceList
+
+    def orders_with_nested():
+        for x in orders:
+            o = tienda_mobil.Order.NewFromJsonDict(x)
+            o.id, o.priceList, o.customer.code, len(o.items)
+
+    cases = [
+        ('OrderPreview, top-level fields', previews_top_level, len(previews)),
+        ('OrderPreview, with customer', previews_with_customer, len(previews)),
+        ('Order, top-level fields', orders_top_level, len(orders)),
+        ('Order, with customer and items', orders_with_nested, len(orders)),
+    ]
+    for name, fn, count in cases:
+        elapsed = BestOf(fn)
+        print('{0:<32} {1:8.2f} us/order'.format(name, elapsed / count * 1e6))
+
+
+if __name__ == '__main__':
+    main()
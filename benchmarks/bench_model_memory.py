@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+# encoding: utf8
+
+"""Reports the memory, in bytes per object, retained by tienda_mobil models
+built with NewFromJsonDict. The JSON payloads are created beforehand and are
+not included in the figures.
+
+Usage:
+    python benchmarks/bench_model_memory.py [--objects N]
+"""
+
+from __future__ import print_function
+
+import argparse
+import gc
+import tracemalloc
+
+from payloads import MakeCustomer, MakeOrderPreview, MakeOrder
+import tienda_mobil
+
+
+def measure(factory, payloads):
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    objects = [factory(x) for x in payloads]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del objects
+    return float(after - before) / len(payloads)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--objects', type=int, default=20000)
+    args = parser.parse_args()
+    n = args.objects
+
+    def touch(cls, registry=None):
+        # access nested models the way a consumer reading them would
+        def factory(data):
+            obj = cls.NewFromJsonDict(data, customer_registry=registry)
+            obj.customer
+            getattr(obj, 'items', None)
+            return obj
+        return factory
+
+    cases = [
+        ('Customer', tienda_mobil.Customer.NewFromJsonDict,
+         [MakeCustomer(i) for i in range(n)]),
+        ('OrderItem', tienda_mobil.OrderItem.NewFromJsonDict,
+         [{'code': str(47630000 + i), 'quantity': 1} for i in range(n)]),
+        ('OrderPreview', touch(tienda_mobil.OrderPreview),
+         [MakeOrderPreview(i) for i in range(n)]),
+        ('Order (10 items)', touch(tienda_mobil.Order),
+         [MakeOrder(i) for i in range(n // 10)]),
+    ]
+
+    for name, factory, payloads in cases:
+        print('{0:<18} {1:10.1f} bytes/object'.format(
+            name, measure(factory, payloads)))
+
+    # the same orders again, sharing customers through a registry
+    registry = tienda_mobil.CustomerRegistry()
+    for name, cls, payloads in [
+            ('OrderPreview', tienda_mobil.OrderPreview, cases[2][2]),
+            ('Order (10 items)', tienda_mobil.Order, cases[3][2])]:
+        print('{0:<18} {1:10.1f} bytes/object (interned customers)'.format(
+            name, measure(touch(cls, registry), payloads)))
+    print('Customer registry: {0}'.format(registry.Stats()))
+
+
+if __name__ == '__main__':
+    main()
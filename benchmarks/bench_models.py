@@ -0,0 +1,137 @@
+#!/usr/bin/env python
+# encoding: utf8
+
+"""Times the model hot paths (NewFromJsonDict, AsDict, AsJsonString, __eq__
+and __hash__) on synthetic payloads and compares them against a baseline.
+
+Each case reports its time per object, its throughput and the peak memory
+allocated while it runs. With --update-baseline the results are written to
+the baseline file; otherwise any case slower or hungrier than the baseline by
+more than --tolerance is reported and the script exits with status 1. A
+missing baseline is an error too (status 2), so the comparison cannot be
+skipped silently.
+
+Baselines depend on the machine and interpreter, record them on the same
+host that runs the comparison.
+
+Usage:
+    python benchmarks/bench_models.py [--orders N] [--items N]
+        [--customers N] [--repeat N] [--baseline FILE] [--update-baseline]
+        [--tolerance RATIO]
+"""
+
+from __future__ import print_function
+
+import argparse
+import gc
+import json
+import os
+import sys
+import tracemalloc
+
+from payloads import MakePendingOrders, MakeOrders, BestOf
+import tienda_mobil
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                'models_baseline.json')
+
+
+def peak_memory(fn):
+    gc.collect()
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def cases(args):
+    previews_json = MakePendingOrders(args.orders, args.customers)['data']
+    orders_json = MakeOrders(args.orders, args.items, args.customers)
+    previews = [tienda_mobil.OrderPreview.NewFromJsonDict(x)
+                for x in previews_json]
+    orders = [tienda_mobil.Order.NewFromJsonDict(x) for x in orders_json]
+    copies = [tienda_mobil.Order.NewFromJsonDict(x) for x in orders_json]
+
+    return [
+        ('OrderPreview.NewFromJsonDict', len(previews_json),
+         lambda: [tienda_mobil.OrderPreview.NewFromJsonDict(x)
+                  for x in previews_json]),
+        ('Order.NewFromJsonDict', len(orders_json),
+         lambda: [tienda_mobil.Order.NewFromJsonDict(x) for x in orders_json]),
+        ('OrderPreview.AsDict', len(previews),
+         lambda: [o.AsDict() for o in previews]),
+        ('Order.AsDict', len(orders),
+         lambda: [o.AsDict() for o in orders]),
+        ('OrderPreview.AsJsonString', len(previews),
+         lambda: [o.AsJsonString() for o in previews]),
+        ('Order.AsJsonString', len(orders),
+         lambda: [o.AsJsonString() for o in orders]),
+        ('Order.__eq__', len(orders),
+         lambda: [a == b for a, b in zip(orders, copies)]),
+        ('Order.__hash__', len(orders),
+         lambda: [hash(o) for o in orders]),
+    ]
+
+
+def compare(results, baseline, tolerance):
+    """Returns a message for every case that regressed against baseline."""
+    regressions = []
+    for name, result in sorted(results.items()):
+        if name not in baseline:
+            continue
+        for metric in ('us_per_object', 'peak_bytes'):
+            before, after = baseline[name][metric], result[metric]
+            if before and after > before * (1 + tolerance):
+                regressions.append('{0} {1}: {2:.2f} -> {3:.2f} (+{4:.0%})'.format(
+                    name, metric, before, after, after / before - 1))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--orders', type=int, default=5000)
+    parser.add_argument('--items', type=int, default=10)
+    parser.add_argument('--customers', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--update-baseline', action='store_true',
+                        help='write the results as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='allowed slowdown ratio before failing')
+    args = parser.parse_args()
+
+    results = {}
+    for name, count, fn in cases(args):
+        elapsed = BestOf(fn, args.repeat)
+        peak = peak_memory(fn)
+        results[name] = {
+            'us_per_object': elapsed / count * 1e6,
+            'objects_per_second': count / elapsed,
+            'peak_bytes': peak,
+        }
+        print('{0:<28} {1:8.2f} us/object {2:12.0f} objects/s {3:10.1f} KiB peak'
+              .format(name, elapsed / count * 1e6, count / elapsed, peak / 1024.))
+
+    if args.update_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print('Baseline saved to {0}'.format(args.baseline))
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print('No baseline at {0}, run with --update-baseline to record one'
+              .format(args.baseline), file=sys.stderr)
+        return 2
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args.tolerance)
+    for message in regressions:
+        print('REGRESSION ' + message, file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
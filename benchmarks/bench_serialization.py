@@ -0,0 +1,57 @@
+#!/usr/bin/env python
+# encoding: utf8
+
+"""Times AsDict, AsJsonString and __eq__ over thousands of orders, for every
+JSON backend installed.
+
+Usage:
+    python benchmarks/bench_serialization.py [--orders N] [--items N]
+"""
+
+from __future__ import print_function
+
+import argparse
+
+from payloads import MakePendingOrders, MakeOrders, BestOf
+import tienda_mobil
+from tienda_mobil import jsonlib
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--orders', type=int, default=5000)
+    parser.add_argument('--items', type=int, default=10)
+    args = parser.parse_args()
+
+    groups = [
+        ('OrderPreview', [tienda_mobil.OrderPreview.NewFromJsonDict(x)
+                          for x in MakePendingOrders(args.orders)['data']]),
+        ('Order', [tienda_mobil.Order.NewFromJsonDict(x)
+                   for x in MakeOrders(args.orders, items=args.items)]),
+    ]
+    customers = [o.customer for o in groups[1][1]]
+    groups.append(('Customer', customers))
+
+    for name, objects in groups:
+        copies = [type(o).NewFromJsonDict(o._json) for o in objects]
+        cases = [
+            ('AsDict', lambda: [o.AsDict() for o in objects]),
+            ('__eq__', lambda: [a == b for a, b in zip(objects, copies)]),
+        ]
+        for backend in jsonlib.AvailableBackends():
+            def dumps(backend=backend):
+                tienda_mobil.TiendaMobilModel.SetJsonBackend(backend)
+                try:
+                    [o.AsJsonString() for o in objects]
+                finally:
+                    tienda_mobil.TiendaMobilModel.SetJsonBackend('json')
+            cases.append(('AsJsonString ({0})'.format(backend), dumps))
+
+        for case, fn in cases:
+            elapsed = BestOf(fn)
+            print('{0:<13} {1:<22} {2:8.2f} us/object'.format(
+                name, case, elapsed / len(objects) * 1e6))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+# encoding: utf8
+
+"""Compares per-request latency of one-shot connections against the pooled
+session owned by tienda_mobil.Api, using a local stub server.
+
+Usage:
+    python benchmarks/bench_session.py [--requests N]
+"""
+
+from __future__ import print_function
+
+import argparse
+import json
+import threading
+import time
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+except ImportError:  # Python 2
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+
+import payloads  # noqa, puts the repository root on sys.path
+import requests
+import tienda_mobil
+
+ORDER = json.dumps({
+    'data': {
+        'id': '1',
+        'type': 'orders',
+        'attributes': {
+            'price-list': 'R02-2018',
+            'customer': {'code': '24624348', 'name': 'Schmidt Angelica'},
+            'comment': '',
+            'order-items': [{'quantity': 1, 'code': '47633002'}],
+        }
+    }
+}).encode('utf-8')
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(ORDER)))
+        self.end_headers()
+        self.wfile.write(ORDER)
+
+    def log_message(self, *args):
+        pass
+
+
+class StubServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+def timeit(fn, n):
+    start = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return (time.perf_counter() - start) / n
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=500)
+    args = parser.parse_args()
+
+    server = StubServer(('127.0.0.1', 0), StubHandler)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    base_url = 'http://127.0.0.1:{0}'.format(server.server_address[1])
+
+    try:
+        url = '{0}/orders/1'.format(base_url)
+        one_shot = timeit(lambda: requests.get(url).json(), args.requests)
+
+        with tienda_mobil.Api(base_url, 'bench') as api:
+            pooled = timeit(lambda: api.GetOrder(1), args.requests)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    print('one-shot connections: {0:8.1f} us/request'.format(one_shot * 1e6))
+    print('pooled session:       {0:8.1f} us/request'.format(pooled * 1e6))
+    print('speedup:              {0:8.2f}x'.format(one_shot / pooled))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,167 @@
+#!/usr/bin/env python
+# encoding: utf8
+
+"""A local stand-in for the Tienda Mobil API, serving synthetic payloads.
+
+Implements GET /orders/ (with optional page[number] and page[size]
+pagination), GET and PATCH /orders/{id} and POST /{resource}, with a
+configurable latency, error rate and payload size. It is used by
+load_test.py and can also be run on its own.
+
+Usage:
+    python benchmarks/fake_server.py [--port N] [--orders N] [--items N]
+        [--latency SECONDS] [--error-rate RATIO]
+"""
+
+from __future__ import print_function
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+    from urllib.parse import parse_qs, urlsplit
+except ImportError:  # Python 2
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+    from urlparse import parse_qs, urlsplit
+
+from payloads import MakeOrder, MakeOrderPreview
+
+ORDER_PATH = re.compile(r'^/orders/(\d+)$')
+
+
+class FakeHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        if not self._Delay():
+            return
+        url = urlsplit(self.path)
+        if url.path == '/orders/':
+            self._SendPendingOrders(parse_qs(url.query))
+            return
+        match = ORDER_PATH.match(url.path)
+        if match:
+            self._SendJson(200, {'data': MakeOrder(
+                int(match.group(1)), self.server.items)})
+        else:
+            self._SendJson(404, {'error': 'Not Found'})
+
+    def do_PATCH(self):
+        self._ReadBody()
+        if not self._Delay():
+            return
+        if ORDER_PATH.match(urlsplit(self.path).path):
+            self._SendJson(200, {})
+        else:
+            self._SendJson(404, {'error': 'Not Found'})
+
+    def do_POST(self):
+        self._ReadBody()
+        if self._Delay():
+            self._SendJson(200, {})
+
+    def _SendPendingOrders(self, query):
+        total = self.server.orders
+        size = int(query.get('page[size]', [total])[0])
+        number = int(query.get('page[number]', [1])[0])
+        start = (number - 1) * size
+        document = {'data': [MakeOrderPreview(n)
+                             for n in range(start, min(start + size, total))]}
+        if 'page[size]' in query and start + size < total:
+            document['links'] = {'next': '/orders/?page%5Bnumber%5D={0}'
+                                         '&page%5Bsize%5D={1}'.format(number + 1, size)}
+        self._SendJson(200, document)
+
+    def _Delay(self):
+        """Waits the configured latency. Returns False, after answering with
+        a server error, for the configured fraction of requests."""
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        if self.server.error_rate and random.random() < self.server.error_rate:
+            self._SendJson(503, {'error': 'Service Unavailable'})
+            return False
+        return True
+
+    def _ReadBody(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        return self.rfile.read(length)
+
+    def _SendJson(self, status, document):
+        body = json.dumps(document).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class FakeServer(ThreadingMixIn, HTTPServer):
+    """Threaded HTTP server answering like the Tienda Mobil API.
+
+    Args:
+        address (tuple): (host, port) to listen on, port 0 picks a free one.
+        orders (int): Number of pending orders listed by /orders/.
+        items (int): Number of items of every /orders/{id} order.
+        latency (float): Seconds waited before answering each request.
+        error_rate (float): Fraction of requests answered with a 503.
+    """
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(self, address=('127.0.0.1', 0), orders=1000, items=10,
+                 latency=0, error_rate=0):
+        HTTPServer.__init__(self, address, FakeHandler)
+        self.orders = orders
+        self.items = items
+        self.latency = latency
+        self.error_rate = error_rate
+
+    @property
+    def base_url(self):
+        return 'http://{0}:{1}'.format(*self.server_address[:2])
+
+    def Start(self):
+        """Serves requests from a background thread."""
+        thread = threading.Thread(target=self.serve_forever)
+        thread.daemon = True
+        thread.start()
+
+    def Stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--orders', type=int, default=1000)
+    parser.add_argument('--items', type=int, default=10)
+    parser.add_argument('--latency', type=float, default=0)
+    parser.add_argument('--error-rate', type=float, default=0)
+    args = parser.parse_args()
+
+    server = FakeServer((args.host, args.port), args.orders, args.items,
+                        args.latency, args.error_rate)
+    print('Serving on {0}'.format(server.base_url))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,140 @@
+#!/usr/bin/env python
+# encoding: utf8
+
+"""Drives tienda_mobil.Api at a fixed concurrency, fetching orders and
+marking them processed, and reports latency percentiles and throughput.
+
+Unless --url is given, a local fake_server.FakeServer is started with the
+requested latency, error rate and payload size. Every worker repeatedly
+takes the next order id, calls GetOrder and then UpdateOrderStatus.
+
+Usage:
+    python benchmarks/load_test.py [--orders N] [--concurrency N]
+        [--items N] [--latency SECONDS] [--error-rate RATIO]
+        [--max-retries N] [--url URL --api-key KEY]
+"""
+
+from __future__ import print_function
+
+import argparse
+import itertools
+import threading
+import time
+
+from fake_server import FakeServer
+import tienda_mobil
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return 0
+    index = min(len(sorted_values) - 1, int(round(p / 100. * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class LoadDriver(object):
+    """Runs the fetch and update cycle from a fixed number of threads and
+    collects the latency of every call."""
+
+    def __init__(self, api, order_ids, concurrency):
+        self.api = api
+        self.concurrency = concurrency
+        self._ids = iter(order_ids)
+        self._lock = threading.Lock()
+        self.latencies = {'GetOrder': [], 'UpdateOrderStatus': []}
+        self.errors = {'GetOrder': 0, 'UpdateOrderStatus': 0}
+
+    def Run(self):
+        """Returns the wall clock seconds taken to process every order."""
+        threads = [threading.Thread(target=self._Worker)
+                   for _ in range(self.concurrency)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return time.perf_counter() - start
+
+    def _NextId(self):
+        with self._lock:
+            return next(self._ids, None)
+
+    def _Worker(self):
+        while True:
+            order_id = self._NextId()
+            if order_id is None:
+                return
+            if self._Call('GetOrder', self.api.GetOrder, order_id):
+                self._Call('UpdateOrderStatus', self.api.UpdateOrderStatus, order_id)
+
+    def _Call(self, name, func, order_id):
+        start = time.perf_counter()
+        try:
+            func(order_id)
+            ok = True
+        except tienda_mobil.TiendaMobilError:
+            ok = False
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.latencies[name].append(elapsed)
+            if not ok:
+                self.errors[name] += 1
+        return ok
+
+
+def report(driver, elapsed):
+    print('{0:<18} {1:>8} {2:>7} {3:>9} {4:>9} {5:>9} {6:>9}'.format(
+        'call', 'requests', 'errors', 'p50 ms', 'p95 ms', 'p99 ms', 'req/s'))
+    total = 0
+    for name in ('GetOrder', 'UpdateOrderStatus'):
+        latencies = sorted(driver.latencies[name])
+        total += len(latencies)
+        print('{0:<18} {1:>8} {2:>7} {3:9.2f} {4:9.2f} {5:9.2f} {6:9.1f}'.format(
+            name, len(latencies), driver.errors[name],
+            percentile(latencies, 50) * 1e3,
+            percentile(latencies, 95) * 1e3,
+            percentile(latencies, 99) * 1e3,
+            len(latencies) / elapsed))
+    processed = len(driver.latencies['UpdateOrderStatus']) - driver.errors['UpdateOrderStatus']
+    print('{0} requests in {1:.2f}s: {2:.1f} req/s, {3:.1f} orders processed/s'.format(
+        total, elapsed, total / elapsed, processed / elapsed))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--orders', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--items', type=int, default=10)
+    parser.add_argument('--latency', type=float, default=0.005)
+    parser.add_argument('--error-rate', type=float, default=0)
+    parser.add_argument('--max-retries', type=int, default=0)
+    parser.add_argument('--url', help='run against this server instead')
+    parser.add_argument('--api-key', default='load-test')
+    args = parser.parse_args()
+
+    server = None
+    base_url = args.url
+    if base_url is None:
+        server = FakeServer(orders=args.orders, items=args.items,
+                            latency=args.latency, error_rate=args.error_rate)
+        server.Start()
+        base_url = server.base_url
+
+    try:
+        with tienda_mobil.Api(base_url, args.api_key,
+                              pool_connections=1,
+                              pool_maxsize=args.concurrency,
+                              max_retries=args.max_retries,
+                              retry_backoff=0.01) as api:
+            driver = LoadDriver(api, itertools.islice(itertools.count(1), args.orders),
+                                args.concurrency)
+            elapsed = driver.Run()
+    finally:
+        if server is not None:
+            server.Stop()
+
+    report(driver, elapsed)
+
+
+if __name__ == '__main__':
+    main()
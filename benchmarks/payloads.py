@@ -0,0 +1,105 @@
+# encoding: utf8
+
+"""Synthetic Tienda Mobil payloads shaped like the fixtures in
+tienda_mobil/tests/data, and helpers shared by the benchmark scripts.
+
+Importing this module puts the repository root on sys.path, so the scripts
+run from a checkout without installing tienda_mobil; they import it before
+tienda_mobil for that reason.
+"""
+
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+PRICE_LISTS = ['R01-2018', 'R02-2018', 'R03-2018']
+PROVINCES = ['B', 'C', 'E', 'S', 'X']
+
+
+def MakeCustomer(n, full=True):
+    """Returns the JSON dict of the n-th synthetic customer. If full is False
+    only code and name are included, as in the /orders/ listing."""
+    customer = {
+        'code': '{0:08d}'.format(20000000 + n),
+        'name': 'Customer {0}'.format(n),
+    }
+    if full:
+        customer.update({
+            'associate_code': '{0:08d}'.format(10000000 + n),
+            'businessman_code': '{0:08d}'.format(13000000 + n % 500),
+            'email': 'customer{0}@example.com'.format(n),
+            'gender': 'female' if n % 3 else 'male',
+            'telephone': '',
+            'cellphone': '3435{0:06d}'.format(n),
+            'address': 'Calle {0} {1}'.format(n % 97, n % 1000),
+            'locality': 'Crespo',
+            'city': 'Crespo',
+            'zip_code': '3116',
+            'charge_date': '2017-08-25',
+            'birthdate': '1986-02-15',
+            'province': PROVINCES[n % len(PROVINCES)],
+            'commercial_origin': 'PROMO-PARA-ELLOS',
+        })
+    return customer
+
+
+def MakeOrderPreview(n, customers=1000):
+    """Returns the JSON dict of an element of the /orders/ data array."""
+    return {
+        'id': str(20000 + n),
+        'type': 'orders',
+        'attributes': {
+            'price-list': PRICE_LISTS[n % len(PRICE_LISTS)],
+            'customer': MakeCustomer(n % customers, full=False),
+            'comment': 'Una caja club' if n % 4 == 0 else '',
+            'total-amount': '{0:.1f}'.format(100 + (n * 7919) % 9000 / 10.),
+            'total-quantity': 1 + n % 40,
+            'businessman': '{0:08d}'.format(13000000 + n % 500),
+        }
+    }
+
+
+def MakeOrder(n, items=10, customers=1000):
+    """Returns the JSON dict of the data member of /orders/{id}."""
+    rnd = random.Random(n)
+    return {
+        'id': str(6746740000 + n),
+        'type': 'orders',
+        'attributes': {
+            'price-list': PRICE_LISTS[n % len(PRICE_LISTS)],
+            'customer': MakeCustomer(n % customers),
+            'comment': 'Una caja club' if n % 4 == 0 else '',
+            'order-items': [
+                {'quantity': rnd.randint(1, 6),
+                 'code': '{0:08d}'.format(47630000 + rnd.randint(0, 5000))}
+                for _ in range(items)
+            ],
+        }
+    }
+
+
+def MakePendingOrders(orders, customers=1000):
+    """Returns a /orders/ response document with the given number of
+    orders."""
+    return {'data': [MakeOrderPreview(n, customers) for n in range(orders)]}
+
+
+def MakeOrders(orders, items=10, customers=1000):
+    """Returns a list of /orders/{id} data members."""
+    return [MakeOrder(n, items, customers) for n in range(orders)]
+
+
+def BestOf(fn, repeat=5):
+    """Returns the shortest of repeat runs of fn, in seconds."""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
@@ -53,7 +53,8 @@ setup(
     url=extract_metaitem('url'),
     packages=['tienda_mobil'],
     platforms=['Any'],
-    install_requires=['requests', 'responses'],
+    install_requires=['requests', 'responses', 'futures; python_version < "3"'],
+    extras_require={'async': ['aiohttp']},
     setup_requires=['pytest-runner >=2.0,<3dev'],
     tests_require=['pytest'],
     keywords='tienda_mobil api',
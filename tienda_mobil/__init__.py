@@ -27,12 +27,75 @@ __version__      = '0.1'
 __url__          = 'https://github.com/r-sierra/python-tiendamobil'
 __description__  = 'A Python wrapper around the Tienda Mobil API'
 
-from .error import TiendaMobilError         # noqa
+import sys
+
+from .error import (                        # noqa
+    TiendaMobilError,
+    TiendaMobilValidationError
+)
 from .models import (                       # noqa
+    TiendaMobilModel,
     Order,
     OrderPreview,
     OrderItem,
-    Customer                                # noqa
+    Customer,
+    CustomerRegistry                        # noqa
 )
 
-from .api import Api                        # noqa
+# Everything else is imported on first access, so that processes only
+# using the models never load the HTTP stack (requests, urllib3, aiohttp).
+_LAZY_ATTRIBUTES = {
+    'OrderPreviewBatch': 'batch',
+    'HydrateModels': 'bulk',
+    'IterHydrateModels': 'bulk',
+    'OrderCache': 'cache',
+    'OrderBook': 'orderbook',
+    'RateLimit': 'ratelimit',
+    'Metrics': 'metrics',
+    'InMemoryMetrics': 'metrics',
+    'PrometheusText': 'metrics',
+    'Api': 'api',
+    'AsyncApi': 'async_api',
+    'OrderSync': 'sync',
+    'Poller': 'poller',
+    'OrderStore': 'store',
+    'WebhookReceiver': 'webhook',
+}
+
+if sys.version_info < (3, 5):
+    # AsyncApi needs async/await syntax
+    del _LAZY_ATTRIBUTES['AsyncApi']
+
+# star-imports of the lazy names go through __getattr__
+__all__ = [
+    'TiendaMobilError',
+    'TiendaMobilValidationError',
+    'TiendaMobilModel',
+    'Order',
+    'OrderPreview',
+    'OrderItem',
+    'Customer',
+    'CustomerRegistry',
+] + sorted(_LAZY_ATTRIBUTES)
+
+
+def __getattr__(name):
+    module_name = _LAZY_ATTRIBUTES.get(name)
+    if module_name is None:
+        raise AttributeError(
+            "module 'tienda_mobil' has no attribute '{0}'".format(name))
+    import importlib
+    value = getattr(importlib.import_module('.' + module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_ATTRIBUTES))
+
+
+if sys.version_info < (3, 7):
+    # no module __getattr__ (PEP 562), import everything up front
+    for _name in _LAZY_ATTRIBUTES:
+        __getattr__(_name)
+    del _name
@@ -19,36 +19,53 @@
 
 from __future__ import unicode_literals
 
+import codecs
+import random
+import re
+import time
+
 import requests
-from tienda_mobil.error import TiendaMobilError
+from requests.compat import urlencode, urljoin, urlsplit
+from concurrent.futures import ThreadPoolExecutor
+from tienda_mobil.error import TiendaMobilError, TiendaMobilValidationError
+from tienda_mobil.jsonlib import GetJsonBackend, IterDocument
+from tienda_mobil.ratelimit import RateLimit, RetryAfter
 from tienda_mobil import (
     __version__,
     Order,
     OrderPreview
 )
 
-class Api(object):
-    """A python interface into the Tienda Mobil API"""
+# Verbs safe to send again after a server error or a dropped connection
+IDEMPOTENT_VERBS = ('GET',)
 
-    def __init__(self, base_url, api_key):
-        """Instantiate a new tienda_mobil.Api object.
+# Transient server errors worth retrying
+RETRY_STATUSES = (500, 502, 503, 504)
 
-        Args:
-          api_key (str):
-            Your Tienda Mobil user's api_key.
-          base_url (str):
-            The base URL to use to contact the Tienda Mobil API.
-        """
+_perf_counter = getattr(time, 'perf_counter', time.time)
+
+# Bytes read at a time from streamed responses
+STREAM_CHUNK_SIZE = 64 * 1024
 
+# Numeric path segments, replaced by {id} in metrics endpoint names
+_ID_SEGMENT = re.compile(r'/\d+(?=/|$)')
+
+
+class _ApiBase(object):
+    """Request headers, credentials and error checks shared by the blocking
+    and asyncio clients."""
+
+    def __init__(self, base_url, api_key, json_backend='auto',
+                 customer_registry=None):
         self.base_url = str(base_url)
+        self.json_backend = GetJsonBackend(json_backend)
+        self.customer_registry = customer_registry
 
         self._InitializeRequestHeaders()
         self._InitializeUserAgent()
         self._InitializeDefaultParameters()
         self._SetCredentials(api_key)
 
-        # self.rate_limit = RateLimit()
-
     def _InitializeRequestHeaders(self):
         self._request_headers = {
             'accept': 'application/json',
@@ -65,28 +82,281 @@ class Api(object):
     def _SetCredentials(self, api_key):
         self._request_headers['authorization'] = "Token token={0}".format(api_key)
 
-    def GetPendingOrders(self, return_json=False):
+    def _CheckForError(self, data):
+        """Raises a TiendaMobilError if data has an error message.
+
+        Args:
+            data (dict):
+                A python dict created from the json response
+
+        Raises:
+            (tiendaMobil.TiendaMobilError): TiendaMobilError wrapping the error
+            message if one exists.
+        """
+        # Errors are relatively unlikely, so it is faster
+        # to check first, rather than try and catch the exception
+        if 'error' in data:
+            raise TiendaMobilError('Error: {0}'.format(data['error']))
+        if 'errors' in data:
+            errors = data['errors']
+            if type(errors) == list:
+                errors = ', '.join(errors)
+            raise TiendaMobilError('Errors: {0}'.format(errors))
+
+    def _EncodeBody(self, data):
+        return self.json_backend.dumps(data).encode('utf-8')
+
+    def _JsonHeaders(self):
+        headers = dict(self._request_headers)
+        headers['Content-Type'] = 'application/json'
+        return headers
+
+    def SetUserAgent(self, user_agent):
+        """Override the default user agent.
+
+        Args:
+          user_agent:
+            A string that should be send to the server as the user-agent.
+        """
+        self._request_headers['User-Agent'] = user_agent
+
+
+class Api(_ApiBase):
+    """A python interface into the Tienda Mobil API"""
+
+    def __init__(self,
+                 base_url,
+                 api_key,
+                 pool_connections=10,
+                 pool_maxsize=10,
+                 keep_alive=True,
+                 order_cache=None,
+                 rate_limit=None,
+                 max_retries=0,
+                 retry_backoff=0.5,
+                 retry_backoff_max=30,
+                 metrics=None,
+                 json_backend='auto',
+                 order_book=None,
+                 customer_registry=None):
+        """Instantiate a new tienda_mobil.Api object.
+
+        Args:
+          api_key (str):
+            Your Tienda Mobil user's api_key.
+          base_url (str):
+            The base URL to use to contact the Tienda Mobil API.
+          pool_connections (int, optional):
+            Number of per-host connection pools to keep cached.
+          pool_maxsize (int, optional):
+            Maximum number of connections kept alive for a single host.
+          keep_alive (bool, optional):
+            If False every request asks the server to close the connection
+            once the response has been read.
+          order_cache (tienda_mobil.OrderCache, optional):
+            If given, GetOrder responses are kept in this cache and served
+            from it until they expire or the order is updated.
+          rate_limit (float, tienda_mobil.RateLimit, optional):
+            Maximum sustained requests per second, or a RateLimit shared
+            with other Api instances. When either this or max_retries is
+            set, rate limit headers sent by the server pause every request
+            for up to RateLimit.max_pause seconds; requests asked to wait
+            longer are not retried.
+          max_retries (int, optional):
+            Number of times a request is retried after a 429 response, or
+            after a 5xx response or connection error for idempotent verbs
+            (GET).
+          retry_backoff (float, optional):
+            Base delay in seconds of the exponential backoff between retries.
+            Each delay is randomized between 0 and the exponential value.
+          retry_backoff_max (float, optional):
+            Upper bound in seconds for a single backoff delay.
+          metrics (tienda_mobil.Metrics, optional):
+            If given, every request sent is reported to this collector.
+          json_backend (str, tienda_mobil.jsonlib.JsonBackend, optional):
+            The JSON library used to decode responses and encode request
+            bodies: 'json', 'orjson', 'ujson', or 'auto' for the fastest one
+            installed.
+          order_book (tienda_mobil.OrderBook, optional):
+            If given, every order retrieved with GetOrder is indexed in it,
+            and removed once its status is updated.
+          customer_registry (tienda_mobil.CustomerRegistry, optional):
+            If given, orders and previews returned share their customers
+            through this registry.
+        """
+
+        super(Api, self).__init__(base_url, api_key, json_backend,
+                                  customer_registry)
+        self._InitializeSession(pool_connections, pool_maxsize, keep_alive)
+        self.order_cache = order_cache
+        self.order_book = order_book
+
+        # server rate limit headers only pause requests when asked to
+        self._honor_rate_headers = rate_limit is not None
+        if not isinstance(rate_limit, RateLimit):
+            rate_limit = RateLimit(rate_limit)
+        self.rate_limit = rate_limit
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.retry_backoff_max = retry_backoff_max
+        self.metrics = metrics
+
+    def _InitializeSession(self, pool_connections, pool_maxsize, keep_alive):
+        self._session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize)
+        self._session.mount('http://', adapter)
+        self._session.mount('https://', adapter)
+        if not keep_alive:
+            self._request_headers['Connection'] = 'close'
+
+    def Close(self):
+        """Closes every pooled connection held by this instance."""
+        self._session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.Close()
+
+    def GetPendingOrders(self, return_json=False, stream=False, return_raw=False):
         """Returns a list of pending orders.
 
         Args:
             return_json (bool, optional):
                 If True JSON data will be returned, instead of
                 tienda_mobil.OrderPreview
+            stream (bool, optional):
+                If True the response body is read and decoded incrementally
+                and an iterator is returned instead of a list, so memory use
+                does not grow with the number of orders. The request is only
+                sent once iteration starts, and its connection is held until
+                the iterator is exhausted or closed; errors, including those
+                reported after the data array, are raised while iterating,
+                once the orders before them have been yielded.
+            return_raw (bool, optional):
+                If True the response body is returned undecoded, as bytes
+                (or an iterator of bytes chunks when streaming). Error
+                members in the body are not checked.
 
         Returns:
           A tienda_mobil.OrderPreview list representing all pending orders
         """
         url = '%s/orders/' % self.base_url
+        if stream:
+            return self._IterStream(url, return_json, return_raw)
+
         resp = self._RequestUrl(url, 'GET')
         self._RaiseForHeaderStatus(resp)
+        if return_raw:
+            return resp.content
         data = self._ParseAndCheck(resp)
 
         if return_json:
             return data
         else:
-            return [OrderPreview.NewFromJsonDict(x) for x in data]
+            return [OrderPreview.NewFromJsonDict(
+                x, customer_registry=self.customer_registry) for x in data]
+
+    def IterPendingOrders(self, page_size=100, prefetch=True):
+        """Iterates over pending orders one page at a time.
+
+        Pages are requested using JSON:API pagination (page[number] and
+        page[size]) and the next one is located through the links.next
+        member of each response, so only a single page is held in memory.
+
+        Args:
+            page_size (int, optional):
+                Number of orders requested per page.
+            prefetch (bool, optional):
+                If True the next page is requested in the background while
+                the current one is being consumed.
+
+        Yields:
+          A tienda_mobil.OrderPreview for every pending order
+        """
+        url = '%s/orders/?%s' % (self.base_url, urlencode(
+            [('page[number]', 1), ('page[size]', page_size)]))
+
+        executor = ThreadPoolExecutor(max_workers=1) if prefetch else None
+        try:
+            document, next_url = self._GetPage(url)
+            while True:
+                if next_url and executor is not None:
+                    next_page = executor.submit(self._GetPage, next_url)
+
+                for x in document.get('data') or []:
+                    yield OrderPreview.NewFromJsonDict(
+                        x, customer_registry=self.customer_registry)
+
+                if not next_url:
+                    break
+                elif executor is not None:
+                    document, next_url = next_page.result()
+                else:
+                    document, next_url = self._GetPage(next_url)
+        finally:
+            if executor is not None:
+                executor.shutdown(wait=False)
+
+    def _IterStream(self, url, return_json, return_raw):
+        """Sends a streamed GET request and yields its decoded data elements,
+        or its raw chunks. Being a generator, nothing is requested until the
+        caller starts iterating, so an iterator that is never used holds no
+        connection."""
+        resp = self._RequestUrl(url, 'GET', stream=True)
+        try:
+            self._RaiseForHeaderStatus(resp)
+        except TiendaMobilError:
+            resp.close()
+            raise
+        try:
+            if return_raw:
+                values = resp.iter_content(STREAM_CHUNK_SIZE)
+            else:
+                values = self._IterData(resp, return_json)
+            for value in values:
+                yield value
+        finally:
+            resp.close()
+
+    def _IterData(self, response, return_json):
+        """Yields the elements of the data array of a streamed response as
+        they are decoded, checking error members like _CheckForError."""
+        try:
+            try:
+                for name, value in IterDocument(
+                        response.iter_content(STREAM_CHUNK_SIZE)):
+                    if name == 'data':
+                        yield value if return_json else OrderPreview.NewFromJsonDict(
+                            value, customer_registry=self.customer_registry)
+                    elif name in ('error', 'errors'):
+                        try:
+                            self._CheckForError({name: value})
+                        except TiendaMobilError:
+                            self._RecordError(response, 'ApiError')
+                            raise
+            except ValueError as e:
+                self._RecordError(response, 'ParseError')
+                raise TiendaMobilError('JSON parse error: {0}'.format(str(e)))
+        finally:
+            response.close()
+
+    def _GetPage(self, url):
+        """Returns a (document, next_url) tuple for a paginated resource,
+        next_url being None on the last page."""
+        resp = self._RequestUrl(url, 'GET')
+        self._RaiseForHeaderStatus(resp)
+        document = self._ParseDocument(resp)
+
+        next_url = (document.get('links') or {}).get('next')
+        if next_url:
+            next_url = urljoin(url, next_url)
+        return document, next_url or None
 
-    def GetOrder(self, order_id, return_json=False):
+    def GetOrder(self, order_id, return_json=False, return_raw=False):
         """Returns a single order.
 
         Args:
@@ -94,20 +364,79 @@ class Api(object):
                 The id we want to retrieve.
             return_json (bool, optional):
                 If True JSON data will be returned, instead of tienda_mobil.Order
+            return_raw (bool, optional):
+                If True the response body is returned undecoded, as bytes,
+                bypassing the order cache. Error members in the body are not
+                checked.
 
         Returns:
           A tienda_mobil.Order instance representing that order
         """
-
-        url = '%s/orders/%s' % (self.base_url, order_id)
-        resp = self._RequestUrl(url, 'GET')
-        self._RaiseForHeaderStatus(resp)
-        data = self._ParseAndCheck(resp)
+        if return_raw:
+            url = '%s/orders/%s' % (self.base_url, order_id)
+            resp = self._RequestUrl(url, 'GET')
+            self._RaiseForHeaderStatus(resp)
+            return resp.content
+
+        data = None
+        if self.order_cache is not None:
+            data = self.order_cache.Get(order_id)
+
+        if data is None:
+            if self.order_cache is not None:
+                # an update finishing while this request is in flight makes
+                # its response stale
+                generation = self.order_cache.Generation()
+            url = '%s/orders/%s' % (self.base_url, order_id)
+            resp = self._RequestUrl(url, 'GET')
+            self._RaiseForHeaderStatus(resp)
+            data = self._ParseAndCheck(resp)
+            if self.order_cache is not None:
+                self.order_cache.Set(order_id, data, generation)
+        if self.order_book is not None:
+            self.order_book.Add(data)
 
         if return_json:
             return data
         else:
-            return Order.NewFromJsonDict(data)
+            return Order.NewFromJsonDict(
+                data, customer_registry=self.customer_registry)
+
+    def GetOrders(self, order_ids, max_workers=8, return_json=False):
+        """Returns many orders, fetched concurrently.
+
+        A failure fetching one order does not abort the rest of the batch.
+
+        Args:
+            order_ids (list of int, str):
+                The ids we want to retrieve.
+            max_workers (int, optional):
+                Maximum number of requests in flight at the same time. Values
+                above the constructor's pool_maxsize will open (and discard)
+                extra connections.
+            return_json (bool, optional):
+                If True JSON data will be returned, instead of tienda_mobil.Order
+
+        Returns:
+          A (orders, errors) tuple. orders is a list in the same order as
+          order_ids holding a tienda_mobil.Order for every order retrieved,
+          or None where the request failed. errors maps each failed order id
+          to the exception raised for it, usually a
+          tienda_mobil.TiendaMobilError.
+        """
+        order_ids = list(order_ids)
+        results = self._RunConcurrently(
+            lambda order_id: self.GetOrder(order_id, return_json=return_json),
+            order_ids,
+            max_workers)
+
+        orders = []
+        errors = {}
+        for order_id, (order, error) in zip(order_ids, results):
+            orders.append(order)
+            if error is not None:
+                errors[order_id] = error
+        return orders, errors
 
     def UpdateOrderStatus(self, order_id):
         """Updates de requested order status
@@ -124,7 +453,43 @@ class Api(object):
             message
         """
         payload = {'order': {'processed': True}}
-        return self.UpdateResource('orders', order_id, payload)
+        updated = self.UpdateResource('orders', order_id, payload)
+        if self.order_book is not None:
+            self.order_book.Remove(order_id)
+        return updated
+
+    def UpdateOrderStatuses(self, order_ids, max_concurrency=8):
+        """Updates the status of many orders, sending the requests
+        concurrently. It never raises halfway through the batch.
+
+        Args:
+            order_ids (list of int, str):
+                The order ids we want to update.
+            max_concurrency (int, optional):
+                Maximum number of requests in flight at the same time.
+
+        Returns:
+          A dict with three keys:
+            updated: list of the order ids successfully updated.
+            invalid: dict mapping order ids rejected by the API (HTTP 422)
+              to their tienda_mobil.TiendaMobilValidationError.
+            failed: dict mapping the order ids whose request failed for any
+              other reason to the exception raised, usually a
+              tienda_mobil.TiendaMobilError.
+        """
+        order_ids = list(order_ids)
+        results = self._RunConcurrently(
+            self.UpdateOrderStatus, order_ids, max_concurrency)
+
+        report = {'updated': [], 'invalid': {}, 'failed': {}}
+        for order_id, (_, error) in zip(order_ids, results):
+            if error is None:
+                report['updated'].append(order_id)
+            elif isinstance(error, TiendaMobilValidationError):
+                report['invalid'][order_id] = error
+            else:
+                report['failed'][order_id] = error
+        return report
 
     def UpdateResource(self, resource_name, resource_id, data):
         """Returns True or False if the record was updated
@@ -144,16 +509,22 @@ class Api(object):
           (True): If the update was successfull
 
         Raises:
+            (tiendaMobil.TiendaMobilValidationError): if the API rejected the
+            record, wrapping its error message
             (tiendaMobil.TiendaMobilError): TiendaMobilError wrapping the error
             message
         """
 
         url = '{0}/{1}/{2}'.format(self.base_url, resource_name, resource_id)
-        response = self._RequestUrl(url, 'PATCH', data)
+        try:
+            response = self._RequestUrl(url, 'PATCH', data)
+        finally:
+            if self.order_cache is not None and resource_name == 'orders':
+                self.order_cache.Invalidate(resource_id)
 
         if response.status_code == requests.codes.unprocessable:
             # look for JSON error description
-            self._ParseAndCheck(response)
+            self._RaiseForValidationErrors(response)
         elif response.status_code != requests.codes.ok:
             self._RaiseForHeaderStatus(response)
         return True
@@ -173,6 +544,8 @@ class Api(object):
           True: If the resource creation was successfull
 
         Raises:
+            (tiendaMobil.TiendaMobilValidationError): if the API rejected the
+            record, wrapping its error message
             (tiendaMobil.TiendaMobilError): TiendaMobilError wrapping the error
             message
         """
@@ -182,11 +555,82 @@ class Api(object):
 
         if response.status_code == requests.codes.unprocessable:
             # look for JSON error description
-            self._ParseAndCheck(response)
+            self._RaiseForValidationErrors(response)
         elif response.status_code != requests.codes.ok:
             self._RaiseForHeaderStatus(response)
         return True
 
+    def CreateResources(self, resource_name, records, max_concurrency=8):
+        """Creates many records, sending the requests concurrently. It never
+        raises halfway through the batch.
+
+        Args:
+            resource_name(str):
+                The resource name we wish to create
+            records (list):
+                The records to create, each one a dict conforming to the
+                JSON:API spec 1.0
+            max_concurrency (int, optional):
+                Maximum number of requests in flight at the same time. Values
+                above the constructor's pool_maxsize will open (and discard)
+                extra connections.
+
+        Returns:
+          A (created, errors) tuple. created is a list in the same order as
+          records holding True for every record created, or False where the
+          request failed. errors maps the index of each failed record to the
+          exception raised for it: a tienda_mobil.TiendaMobilValidationError
+          if the API rejected it, usually a tienda_mobil.TiendaMobilError
+          otherwise.
+        """
+        results = self._RunConcurrently(
+            lambda record: self.CreateResource(resource_name, record),
+            records,
+            max_concurrency)
+
+        created = []
+        errors = {}
+        for index, (_, error) in enumerate(results):
+            created.append(error is None)
+            if error is not None:
+                errors[index] = error
+        return created, errors
+
+    def _RunConcurrently(self, func, args, max_workers):
+        """Calls func once per item of args using a bounded thread pool.
+
+        Returns:
+            A list of (result, error) tuples in the same order as args, where
+            error is the exception raised by that call (usually a
+            TiendaMobilError) or None.
+        """
+        def call(arg):
+            try:
+                return func(arg), None
+            except Exception as e:
+                # e.g. a malformed body or a connection error past the
+                # retries must not discard the rest of the batch
+                return None, e
+
+        args = list(args)
+        if not args:
+            return []
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(args))) as executor:
+            return list(executor.map(call, args))
+
+    def _RaiseForValidationErrors(self, response):
+        """Raises the error description of an unprocessable entity (422)
+        response as a TiendaMobilValidationError.
+
+        Raises:
+            (tiendaMobil.TiendaMobilValidationError): TiendaMobilValidationError
+            wrapping the error message
+        """
+        try:
+            self._ParseAndCheck(response)
+        except TiendaMobilError as e:
+            raise TiendaMobilValidationError(e.message)
+
     def _RaiseForHeaderStatus(self, response):
         """Raises an exception if an HTTP error ocurred or status code between
         400 <= x < 600, and status code is not 422
@@ -201,9 +645,10 @@ class Api(object):
         try:
             response.raise_for_status()
         except requests.exceptions.RequestException as e:
+            self._RecordError(response, 'HTTPError')
             raise TiendaMobilError(str(e))
 
-    def _RequestUrl(self, url, verb, data=None):
+    def _RequestUrl(self, url, verb, data=None, stream=False):
         """Request a url.
 
         Args:
@@ -213,6 +658,9 @@ class Api(object):
                 Either POST or GET.
             data:
                 A dict of (str, unicode) key/value pairs.
+            stream:
+                If True the response body is not downloaded until it is
+                read, e.g. with response.iter_content().
 
         Raises:
             (tiendaMobil.TiendaMobilError): TiendaMobilError wrapping the error
@@ -224,21 +672,102 @@ class Api(object):
         if not data:
             data = {}
 
-        resp = 0
+        attempt = 0
+        while True:
+            self.rate_limit.Acquire()
+            try:
+                if self.metrics is None:
+                    resp = self._SendRequest(url, verb, data, stream)
+                else:
+                    resp = self._SendMeasuredRequest(url, verb, data, stream)
+            except requests.exceptions.RequestException as e:
+                if attempt < self.max_retries and verb in IDEMPOTENT_VERBS:
+                    attempt += 1
+                    time.sleep(self._Backoff(attempt))
+                    continue
+                raise TiendaMobilError(str(e))
+
+            retry_after = RetryAfter(resp.headers)
+            if retry_after is not None and retry_after > self.rate_limit.max_pause:
+                # give up rather than wait longer than the rate limit allows,
+                # without holding back the other callers either
+                return resp
+            if self._honor_rate_headers or self.max_retries:
+                self.rate_limit.UpdateFromHeaders(resp.headers)
+            if attempt < self.max_retries and self._ShouldRetry(resp, verb):
+                # release the connection of a response that won't be read
+                resp.close()
+                attempt += 1
+                # Retry-After already paused the shared rate limit
+                if retry_after is None:
+                    time.sleep(self._Backoff(attempt))
+                continue
+            return resp
+
+    def _SendRequest(self, url, verb, data, stream=False):
+        if verb == 'GET':
+            return self._session.get(url, headers=self._request_headers,
+                                     stream=stream)
+        elif verb in ('PATCH', 'PUT'):
+            return self._session.patch(url, data=self._EncodeBody(data),
+                                       headers=self._JsonHeaders())
+        elif verb == 'POST':
+            return self._session.post(url, data=self._EncodeBody(data),
+                                      headers=self._JsonHeaders())
+        else:
+            raise TiendaMobilError('Unknown REST Verb: {0}'.format(verb))
 
+    def _SendMeasuredRequest(self, url, verb, data, stream=False):
+        endpoint = self._Endpoint(url)
+        self.metrics.RequestStarted(endpoint, verb)
+        start = _perf_counter()
+        resp = None
         try:
-            if verb == 'GET':
-                resp = requests.get(url, headers=self._request_headers)
-            elif verb in ('PATCH', 'PUT'):
-                resp = requests.patch(url, json=data, headers=self._request_headers)
-            elif verb == 'POST':
-                resp = requests.post(url, json=data, headers=self._request_headers)
-            else:
-                raise TiendaMobilError('Unknown REST Verb: {0}'.format(verb))
+            resp = self._SendRequest(url, verb, data, stream)
+            return resp
         except requests.exceptions.RequestException as e:
-            raise TiendaMobilError(str(e))
-
-        return resp
+            self.metrics.RequestFailed(endpoint, verb, type(e).__name__)
+            raise
+        finally:
+            elapsed = _perf_counter() - start
+            if resp is None:
+                self.metrics.RequestFinished(endpoint, verb, None, elapsed, 0, 0)
+            else:
+                if stream:
+                    # reading content would download the whole body
+                    response_bytes = int(resp.headers.get('Content-Length') or 0)
+                else:
+                    response_bytes = len(resp.content or b'')
+                self.metrics.RequestFinished(
+                    endpoint, verb, resp.status_code, elapsed,
+                    len(resp.request.body or b''), response_bytes)
+
+    def _Endpoint(self, url):
+        """Returns the metrics name of url: its path relative to base_url,
+        with numeric ids replaced by {id}."""
+        path = urlsplit(url).path
+        base_path = urlsplit(self.base_url).path.rstrip('/')
+        if base_path and path.startswith(base_path):
+            path = path[len(base_path):]
+        return _ID_SEGMENT.sub('/{id}', path)
+
+    def _RecordError(self, response, error_type):
+        if self.metrics is not None:
+            self.metrics.RequestFailed(
+                self._Endpoint(response.url), response.request.method, error_type)
+
+    def _ShouldRetry(self, response, verb):
+        status = response.status_code
+        if status == requests.codes.too_many_requests:
+            # the request was rejected before being processed
+            return True
+        return verb in IDEMPOTENT_VERBS and status in RETRY_STATUSES
+
+    def _Backoff(self, attempt):
+        """Returns the delay before retry number attempt: exponential backoff
+        with full jitter."""
+        delay = min(self.retry_backoff_max, self.retry_backoff * 2 ** (attempt - 1))
+        return random.uniform(0, delay)
 
     def _ParseAndCheck(self, response):
         """Try and parse the JSON returned and return
@@ -255,39 +784,33 @@ class Api(object):
             (tiendaMobil.TiendaMobilError): TiendaMobilError wrapping the error
             message
         """
+        return self._ParseDocument(response).get('data', {})
+
+    def _ResponseBody(self, response):
+        """Returns the body of a response for the JSON backend: the raw bytes
+        when they are UTF-8, which every backend decodes fastest, or the text
+        decoded with the charset the server declared otherwise."""
+        encoding = response.encoding
+        if encoding:
+            try:
+                if codecs.lookup(encoding).name != 'utf-8':
+                    return response.content.decode(encoding)
+            except LookupError:
+                # an unknown charset, let the backend try the bytes
+                pass
+        return response.content
+
+    def _ParseDocument(self, response):
+        """Like _ParseAndCheck, but returns the whole JSON:API document
+        (including links and meta members) instead of its data member."""
         try:
-            data = response.json()
+            data = self.json_backend.loads(self._ResponseBody(response))
         except ValueError as e:
+            self._RecordError(response, 'ParseError')
             raise TiendaMobilError('JSON parse error: {0}'.format(str(e)))
-        self._CheckForError(data)
-        return data.get('data', {})
-
-    def _CheckForError(self, data):
-        """Raises a TiendaMobilError if data has an error message.
-
-        Args:
-            data (dict):
-                A python dict created from the json response
-
-        Raises:
-            (tiendaMobil.TiendaMobilError): TiendaMobilError wrapping the error
-            message if one exists.
-        """
-        # Errors are relatively unlikely, so it is faster
-        # to check first, rather than try and catch the exception
-        if 'error' in data:
-            raise TiendaMobilError('Error: {0}'.format(data['error']))
-        if 'errors' in data:
-            errors = data['errors']
-            if type(errors) == list:
-                errors = ', '.join(errors)
-            raise TiendaMobilError('Errors: {0}'.format(errors))
-
-    def SetUserAgent(self, user_agent):
-        """Override the default user agent.
-
-        Args:
-          user_agent:
-            A string that should be send to the server as the user-agent.
-        """
-        self._request_headers['User-Agent'] = user_agent
+        try:
+            self._CheckForError(data)
+        except TiendaMobilError:
+            self._RecordError(response, 'ApiError')
+            raise
+        return data
@@ -0,0 +1,338 @@
+#!/usr/bin/env python
+# encoding: utf8
+
+#
+#
+# Copyright 2018 Roberto Sierra
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+from tienda_mobil.api import _ApiBase
+from tienda_mobil.error import TiendaMobilError, TiendaMobilValidationError
+from tienda_mobil import (
+    Order,
+    OrderPreview
+)
+
+HTTP_OK = 200
+HTTP_UNPROCESSABLE = 422
+
+
+class AsyncApi(_ApiBase):
+    """An asyncio interface into the Tienda Mobil API.
+
+    Mirrors tienda_mobil.Api, but every request method is a coroutine. Requires
+    the optional aiohttp package.
+    """
+
+    def __init__(self,
+                 base_url,
+                 api_key,
+                 max_concurrency=100,
+                 pool_maxsize=100,
+                 pool_maxsize_per_host=0,
+                 keep_alive=True,
+                 json_backend='auto',
+                 customer_registry=None):
+        """Instantiate a new tienda_mobil.AsyncApi object.
+
+        Args:
+          api_key (str):
+            Your Tienda Mobil user's api_key.
+          base_url (str):
+            The base URL to use to contact the Tienda Mobil API.
+          max_concurrency (int, optional):
+            Maximum number of requests in flight at the same time. Callers
+            past this limit wait for a free slot instead of failing.
+          pool_maxsize (int, optional):
+            Maximum number of open connections, 0 for no limit.
+          pool_maxsize_per_host (int, optional):
+            Maximum number of open connections to a single host, 0 for no
+            limit.
+          keep_alive (bool, optional):
+            If False every connection is closed once its response has been
+            read.
+          json_backend (str, tienda_mobil.jsonlib.JsonBackend, optional):
+            The JSON library used to decode responses and encode request
+            bodies: 'json', 'orjson', 'ujson', or 'auto' for the fastest one
+            installed.
+          customer_registry (tienda_mobil.CustomerRegistry, optional):
+            If given, orders and previews returned share their customers
+            through this registry.
+        """
+        if aiohttp is None:
+            raise TiendaMobilError('AsyncApi requires the aiohttp package')
+
+        super(AsyncApi, self).__init__(base_url, api_key, json_backend,
+                                       customer_registry)
+
+        self._max_concurrency = max_concurrency
+        self._pool_maxsize = pool_maxsize
+        self._pool_maxsize_per_host = pool_maxsize_per_host
+        self._keep_alive = keep_alive
+        self._session = None
+        self._semaphore = None
+
+    def _GetSession(self):
+        # aiohttp sessions must be created from within a running event loop,
+        # so the pool is built on the first request instead of in __init__.
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self._pool_maxsize,
+                limit_per_host=self._pool_maxsize_per_host,
+                force_close=not self._keep_alive)
+            self._session = aiohttp.ClientSession(connector=connector)
+            self._semaphore = asyncio.Semaphore(self._max_concurrency)
+        return self._session
+
+    async def Close(self):
+        """Closes every pooled connection held by this instance."""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.Close()
+
+    async def GetPendingOrders(self, return_json=False, return_raw=False):
+        """Returns a list of pending orders.
+
+        Args:
+            return_json (bool, optional):
+                If True JSON data will be returned, instead of
+                tienda_mobil.OrderPreview
+            return_raw (bool, optional):
+                If True the response body is returned undecoded, as bytes.
+                Error members in the body are not checked.
+
+        Returns:
+          A tienda_mobil.OrderPreview list representing all pending orders
+        """
+        url = '%s/orders/' % self.base_url
+        status, reason, body = await self._RequestUrl(url, 'GET')
+        self._RaiseForHeaderStatus(url, status, reason)
+        if return_raw:
+            return body
+        data = self._ParseAndCheck(body)
+
+        if return_json:
+            return data
+        else:
+            return [OrderPreview.NewFromJsonDict(
+                x, customer_registry=self.customer_registry) for x in data]
+
+    async def GetOrder(self, order_id, return_json=False, return_raw=False):
+        """Returns a single order.
+
+        Args:
+            order_id(int, str):
+                The id we want to retrieve.
+            return_json (bool, optional):
+                If True JSON data will be returned, instead of tienda_mobil.Order
+            return_raw (bool, optional):
+                If True the response body is returned undecoded, as bytes.
+                Error members in the body are not checked.
+
+        Returns:
+          A tienda_mobil.Order instance representing that order
+        """
+        url = '%s/orders/%s' % (self.base_url, order_id)
+        status, reason, body = await self._RequestUrl(url, 'GET')
+        self._RaiseForHeaderStatus(url, status, reason)
+        if return_raw:
+            return body
+        data = self._ParseAndCheck(body)
+
+        if return_json:
+            return data
+        else:
+            return Order.NewFromJsonDict(
+                data, customer_registry=self.customer_registry)
+
+    async def UpdateOrderStatus(self, order_id):
+        """Updates de requested order status
+
+        Args:
+            order_id(int, str):
+                The order id we want to update.
+
+        Returns:
+          (True): if order was successfully updated
+
+        Raises:
+            (tiendaMobil.TiendaMobilError): TiendaMobilError wrapping the error
+            message
+        """
+        payload = {'order': {'processed': True}}
+        return await self.UpdateResource('orders', order_id, payload)
+
+    async def UpdateResource(self, resource_name, resource_id, data):
+        """Returns True or False if the record was updated
+
+        Args:
+            resource_name(str):
+                The resource name we wish to update
+
+            resource_id(int, str):
+                The resource id we want to update.
+
+            data:
+                A dict of (str, unicode) key/value pairs, conforming to the
+                JSON:API spec 1.0
+
+        Returns:
+          (True): If the update was successfull
+
+        Raises:
+            (tiendaMobil.TiendaMobilError): TiendaMobilError wrapping the error
+            message
+        """
+        url = '{0}/{1}/{2}'.format(self.base_url, resource_name, resource_id)
+        status, reason, body = await self._RequestUrl(url, 'PATCH', data)
+
+        if status == HTTP_UNPROCESSABLE:
+            # look for JSON error description
+            self._RaiseForValidationErrors(body)
+        elif status != HTTP_OK:
+            self._RaiseForHeaderStatus(url, status, reason)
+        return True
+
+    async def CreateResource(self, resource_name, data):
+        """Returns True or False if the record was created
+
+        Args:
+            resource_name(str):
+                The resource name we wish to create
+
+            data:
+                A dict of (str, unicode) key/value pairs, conforming to the
+                JSON:API spec 1.0
+
+        Returns:
+          True: If the resource creation was successfull
+
+        Raises:
+            (tiendaMobil.TiendaMobilError): TiendaMobilError wrapping the error
+            message
+        """
+        url = '{0}/{1}'.format(self.base_url, resource_name)
+        status, reason, body = await self._RequestUrl(url, 'POST', data)
+
+        if status == HTTP_UNPROCESSABLE:
+            # look for JSON error description
+            self._RaiseForValidationErrors(body)
+        elif status != HTTP_OK:
+            self._RaiseForHeaderStatus(url, status, reason)
+        return True
+
+    def _RaiseForValidationErrors(self, body):
+        """Raises the error description of an unprocessable entity (422)
+        response body as a TiendaMobilValidationError.
+
+        Raises:
+            (tiendaMobil.TiendaMobilValidationError): TiendaMobilValidationError
+            wrapping the error message
+        """
+        try:
+            self._ParseAndCheck(body)
+        except TiendaMobilError as e:
+            raise TiendaMobilValidationError(e.message)
+
+    def _RaiseForHeaderStatus(self, url, status, reason):
+        """Raises an exception if status code is between 400 <= x < 600. The
+        message matches the one tienda_mobil.Api builds from requests.
+
+        Raises:
+            (tiendaMobil.TiendaMobilError): TiendaMobilError wrapping the error
+            message
+        """
+        if 400 <= status < 500:
+            kind = 'Client'
+        elif 500 <= status < 600:
+            kind = 'Server'
+        else:
+            return
+        raise TiendaMobilError('{0} {1} Error: {2} for url: {3}'.format(
+            status, kind, reason, url))
+
+    async def _RequestUrl(self, url, verb, data=None):
+        """Request a url.
+
+        Args:
+            url:
+                The web location we want to retrieve.
+            verb:
+                Either POST or GET.
+            data:
+                A dict of (str, unicode) key/value pairs.
+
+        Raises:
+            (tiendaMobil.TiendaMobilError): TiendaMobilError wrapping the error
+            message
+
+        Returns:
+            A (status, reason, body) tuple, body being the raw response bytes.
+        """
+        if not data:
+            data = {}
+
+        # headers are sent with every request rather than stored in the
+        # session, so SetUserAgent() applies to an open session too
+        if verb == 'GET':
+            kwargs = {'headers': self._request_headers}
+        elif verb in ('PATCH', 'PUT', 'POST'):
+            verb = 'PATCH' if verb == 'PUT' else verb
+            kwargs = {
+                'data': self._EncodeBody(data),
+                'headers': self._JsonHeaders(),
+            }
+        else:
+            raise TiendaMobilError('Unknown REST Verb: {0}'.format(verb))
+
+        session = self._GetSession()
+        async with self._semaphore:
+            try:
+                async with session.request(verb, url, **kwargs) as resp:
+                    body = await resp.read()
+                    return resp.status, resp.reason, body
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                raise TiendaMobilError(str(e) or type(e).__name__)
+
+    def _ParseAndCheck(self, body):
+        """Try and parse the JSON returned and raise if the server reported an
+        error.
+
+        Args:
+            body (bytes):
+                The raw response body
+
+        Raises:
+            (tiendaMobil.TiendaMobilError): TiendaMobilError wrapping the error
+            message
+        """
+        try:
+            data = self.json_backend.loads(body)
+        except ValueError as e:
+            raise TiendaMobilError('JSON parse error: {0}'.format(str(e)))
+        self._CheckForError(data)
+        return data.get('data', {})
@@ -0,0 +1,212 @@
+#!/usr/bin/env python
+
+"""Column oriented storage of pending orders for reporting.
+
+NumPy is used when installed; otherwise columns are stdlib arrays and the
+aggregations run as plain Python loops.
+"""
+
+from array import array
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class OrderPreviewBatch(object):
+    """Pending orders stored column by column, so totals, group-bys and
+    filters run over typed arrays without building OrderPreview objects.
+
+    Numeric columns are total_amount (float) and total_quantity (int).
+    businessman, price_list (without the 'R' prefix, as
+    OrderPreview.priceList) and customer (the customer code) are
+    categorical: each row stores an index into the column's list of
+    distinct values.
+    """
+
+    NUMERIC_COLUMNS = ('total_amount', 'total_quantity')
+    CATEGORY_COLUMNS = ('businessman', 'price_list', 'customer')
+
+    def __init__(self, ids, values, codes, categories, use_numpy):
+        self.ids = ids
+        self._values = values
+        self._codes = codes
+        self._categories = categories
+        self.use_numpy = use_numpy
+
+    @classmethod
+    def NewFromJsonList(cls, data, use_numpy=None):
+        """Create a new batch from the JSON returned by
+        Api.GetPendingOrders(return_json=True).
+
+        Args:
+            data (list): The JSON:API resource objects of the orders.
+            use_numpy (bool, optional): Store columns as NumPy arrays. By
+                default NumPy is used if it is installed.
+
+        Raises:
+            (ValueError): if use_numpy is True and NumPy is not installed.
+        """
+        if use_numpy is None:
+            use_numpy = numpy is not None
+        elif use_numpy and numpy is None:
+            raise ValueError('NumPy is not installed')
+
+        ids = []
+        amounts = []
+        quantities = []
+        codes = dict((name, []) for name in cls.CATEGORY_COLUMNS)
+        indexes = dict((name, {}) for name in cls.CATEGORY_COLUMNS)
+
+        def encode(name, value):
+            index = indexes[name]
+            code = index.get(value)
+            if code is None:
+                code = index[value] = len(index)
+            codes[name].append(code)
+
+        for order in data:
+            attributes = order.get('attributes') or {}
+            customer = attributes.get('customer') or {}
+            ids.append(order.get('id'))
+            amounts.append(float(attributes.get('total-amount') or 0))
+            quantities.append(int(attributes.get('total-quantity') or 0))
+            encode('businessman', attributes.get('businessman', ''))
+            encode('price_list', (attributes.get('price-list') or '').replace('R', ''))
+            encode('customer', customer.get('code', ''))
+
+        categories = {}
+        for name, index in indexes.items():
+            values = [None] * len(index)
+            for value, code in index.items():
+                values[code] = value
+            categories[name] = values
+
+        if use_numpy:
+            values = {
+                'total_amount': numpy.array(amounts, dtype=numpy.float64),
+                'total_quantity': numpy.array(quantities, dtype=numpy.int64),
+            }
+            codes = dict((name, numpy.array(c, dtype=numpy.intp))
+                         for name, c in codes.items())
+        else:
+            values = {
+                'total_amount': array('d', amounts),
+                'total_quantity': array('l', quantities),
+            }
+            codes = dict((name, array('l', c)) for name, c in codes.items())
+        return cls(ids, values, codes, categories, use_numpy)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __repr__(self):
+        return "OrderPreviewBatch(Orders={0})".format(len(self))
+
+    def Column(self, name):
+        """Returns the values of a column: an array for numeric columns, a
+        list of str for categorical ones."""
+        if name in self._values:
+            return self._values[name]
+        categories = self._CategoriesOf(name)
+        return [categories[code] for code in self._codes[name]]
+
+    def Sum(self, column='total_amount'):
+        """Returns the sum of a numeric column."""
+        values = self._ValuesOf(column)
+        if self.use_numpy:
+            return values.sum().item()
+        return sum(values)
+
+    def GroupBy(self, key, column='total_amount'):
+        """Returns a dict mapping each value of the categorical column key
+        found in the batch to the sum of column over its orders."""
+        categories = self._CategoriesOf(key)
+        codes = self._codes[key]
+        values = self._ValuesOf(column)
+
+        if self.use_numpy:
+            counts = numpy.bincount(codes, minlength=len(categories))
+            sums = numpy.bincount(codes, weights=values, minlength=len(categories))
+            if values.dtype.kind == 'i':
+                sums = sums.round().astype(values.dtype)
+            return dict((categories[code], sums[code].item())
+                        for code in numpy.flatnonzero(counts))
+
+        sums = {}
+        for code, value in zip(codes, values):
+            sums[code] = sums.get(code, 0) + value
+        return dict((categories[code], total) for code, total in sums.items())
+
+    def Count(self, key):
+        """Returns a dict mapping each value of the categorical column key
+        found in the batch to its number of orders."""
+        categories = self._CategoriesOf(key)
+        codes = self._codes[key]
+
+        if self.use_numpy:
+            counts = numpy.bincount(codes, minlength=len(categories))
+            return dict((categories[code], counts[code].item())
+                        for code in numpy.flatnonzero(counts))
+
+        counts = {}
+        for code in codes:
+            counts[code] = counts.get(code, 0) + 1
+        return dict((categories[code], count) for code, count in counts.items())
+
+    def Filter(self, mask=None, **equals):
+        """Returns a new batch holding the orders that match every condition.
+
+        Args:
+            mask (sequence of bool, optional): Keep the orders whose entry is
+                true, e.g. batch.Column('total_amount') > 500 with NumPy.
+            **equals: Categorical column names mapped to the value to keep,
+                e.g. Filter(businessman='13008624').
+
+        Raises:
+            (ValueError): if a keyword is not a categorical column.
+        """
+        if self.use_numpy:
+            keep = numpy.ones(len(self), dtype=bool)
+            if mask is not None:
+                keep &= numpy.asarray(mask, dtype=bool)
+            for name, value in equals.items():
+                code = self._CodeOf(name, value)
+                keep &= self._codes[name] == code
+            rows = numpy.flatnonzero(keep)
+            ids = [self.ids[row] for row in rows]
+            values = dict((name, v[rows]) for name, v in self._values.items())
+            codes = dict((name, c[rows]) for name, c in self._codes.items())
+        else:
+            wanted = [(self._CodeOf(name, value), self._codes[name])
+                      for name, value in equals.items()]
+            rows = [row for row in range(len(self))
+                    if (mask is None or mask[row]) and
+                    all(codes[row] == code for code, codes in wanted)]
+            ids = [self.ids[row] for row in rows]
+            values = dict((name, array(v.typecode, (v[row] for row in rows)))
+                          for name, v in self._values.items())
+            codes = dict((name, array(c.typecode, (c[row] for row in rows)))
+                         for name, c in self._codes.items())
+        return type(self)(ids, values, codes, self._categories, self.use_numpy)
+
+    def _ValuesOf(self, column):
+        try:
+            return self._values[column]
+        except KeyError:
+            raise ValueError('Not a numeric column: {0}'.format(column))
+
+    def _CategoriesOf(self, column):
+        try:
+            return self._categories[column]
+        except KeyError:
+            raise ValueError('Not a categorical column: {0}'.format(column))
+
+    def _CodeOf(self, column, value):
+        """Returns the code of value in a categorical column, -1 (matching no
+        row) if it does not appear in the batch."""
+        categories = self._CategoriesOf(column)
+        if value in categories:
+            return categories.index(value)
+        return -1
@@ -0,0 +1,155 @@
+#!/usr/bin/env python
+
+"""Builds large numbers of models from raw JSON using every core.
+
+Items are split into chunks that worker processes decode (for NDJSON lines)
+and turn into models with NewFromJsonDict; the models are pickled back to
+the calling process. The pickling round trip is only worth it for large
+inputs, benchmarks/bench_bulk.py compares it against the serial path.
+"""
+
+import itertools
+import multiprocessing
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from tienda_mobil.jsonlib import GetJsonBackend
+from tienda_mobil.models import Order, OrderPreview, _CustomerFromAttributes
+
+# NDJSON lines: bytes or text (str on Python 2 is bytes, unicode is text)
+_LINE_TYPES = (bytes, type(u''))
+
+
+def _HydrateChunk(model, backend_name, nested, chunk):
+    """Returns the models built from a chunk of JSON dicts or NDJSON lines.
+    Runs in the worker processes, so it must stay a module level function."""
+    loads = None
+    models = []
+    for item in chunk:
+        if isinstance(item, _LINE_TYPES):
+            if loads is None:
+                loads = GetJsonBackend(backend_name).loads
+            item = loads(item)
+        obj = model.NewFromJsonDict(item)
+        if nested:
+            # build the lazy nested models here instead of in the caller
+            getattr(obj, 'customer', None)
+            getattr(obj, 'items', None)
+        models.append(obj)
+    return models
+
+
+def _Chunks(items, chunk_size):
+    items = iter(items)
+    while True:
+        chunk = list(itertools.islice(items, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def IterHydrateModels(items, model=Order, workers=None, chunk_size=1000,
+                      ordered=True, nested=False, json_backend='auto',
+                      customer_registry=None):
+    """Yields the models built from items, spreading the work over a pool of
+    processes.
+
+    Only 2 chunks per worker are read ahead of the consumer, so items can be
+    an arbitrarily long generator, such as the lines of an NDJSON file.
+
+    Args:
+        items (iterable): JSON dicts, or NDJSON lines as str or bytes.
+        model (class, optional): The TiendaMobilModel subclass to build, e.g.
+            tienda_mobil.Order (the default) or tienda_mobil.OrderPreview.
+        workers (int, optional): Number of worker processes, by default one
+            per core. 0 builds every model in the calling process.
+        chunk_size (int, optional): Number of items sent to a worker at once.
+        ordered (bool, optional): If False chunks are yielded as soon as they
+            are ready instead of in input order.
+        nested (bool, optional): If True the workers also build the nested
+            Customer and OrderItem models.
+        json_backend (str, optional): Name of the JSON library decoding
+            NDJSON lines, see tienda_mobil.jsonlib.GetJsonBackend.
+        customer_registry (tienda_mobil.CustomerRegistry, optional): The
+            registry the orders' customers are interned in. Interning happens
+            in the calling process, as workers cannot share a registry.
+            Only supported for Order and OrderPreview models.
+
+    Raises:
+        (ValueError): if a line is not valid JSON, json_backend is unknown or
+            customer_registry is given for a model without customers.
+    """
+    if customer_registry is not None and \
+            not issubclass(model, (Order, OrderPreview)):
+        raise ValueError('customer_registry requires Order or OrderPreview '
+                         'models, not {0}'.format(model.__name__))
+    models = _IterHydrateModels(items, model, workers, chunk_size, ordered,
+                                nested, json_backend)
+    if customer_registry is None:
+        return models
+    return _Intern(models, nested, customer_registry)
+
+
+def _Intern(models, nested, registry):
+    for obj in models:
+        obj._registry = registry
+        if nested:
+            # replace the customer the worker built with the shared one
+            try:
+                obj.customer = _CustomerFromAttributes(obj.attributes, registry)
+            except AttributeError:
+                # an order without a customer
+                pass
+        yield obj
+
+
+def _IterHydrateModels(items, model, workers, chunk_size, ordered, nested,
+                       json_backend):
+    backend_name = GetJsonBackend(json_backend).name
+    chunks = _Chunks(items, chunk_size)
+
+    if workers == 0:
+        for chunk in chunks:
+            for obj in _HydrateChunk(model, backend_name, nested, chunk):
+                yield obj
+        return
+
+    workers = workers or multiprocessing.cpu_count()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        try:
+            for chunk in chunks:
+                pending.append(executor.submit(
+                    _HydrateChunk, model, backend_name, nested, chunk))
+                if len(pending) < 2 * workers:
+                    continue
+                for obj in _NextResults(pending, ordered):
+                    yield obj
+            while pending:
+                for obj in _NextResults(pending, ordered):
+                    yield obj
+        finally:
+            # the consumer stopped early or a chunk failed
+            for future in pending:
+                future.cancel()
+
+
+def _NextResults(pending, ordered):
+    """Removes a finished future from pending and returns its models: the
+    oldest one if ordered, otherwise the first one to complete."""
+    if ordered:
+        return pending.popleft().result()
+    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+    future = next(iter(done))
+    pending.remove(future)
+    return future.result()
+
+
+def HydrateModels(items, model=Order, workers=None, chunk_size=1000,
+                  nested=False, json_backend='auto', customer_registry=None):
+    """Returns a list with the models built from items, in input order. See
+    IterHydrateModels() for the arguments."""
+    return list(IterHydrateModels(items, model, workers, chunk_size,
+                                  ordered=True, nested=nested,
+                                  json_backend=json_backend,
+                                  customer_registry=customer_registry))
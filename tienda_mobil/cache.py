@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+_monotonic = getattr(time, 'monotonic', time.time)
+
+
+class OrderCache(object):
+    """A thread-safe, size-bounded LRU cache whose entries expire after a
+    fixed time to live.
+
+    Keys are normalized with str(), so an order id can be looked up either
+    as int or as str. Values are deep copied when stored and when returned,
+    so callers mutating them never alter the cached entry.
+
+    To keep a slow read from storing data older than a concurrent update,
+    take Generation() before the read and pass it to Set(): the value is
+    dropped if the key was invalidated in the meantime.
+    """
+
+    def __init__(self, max_entries=1000, ttl=300, clock=_monotonic):
+        """Instantiate a new tienda_mobil.OrderCache object.
+
+        Args:
+          max_entries (int, optional):
+            Maximum number of entries kept. The least recently used entry is
+            evicted once the cache is full.
+          ttl (int, float, optional):
+            Seconds an entry stays valid after being stored, None to keep
+            entries until they are evicted or invalidated.
+          clock (callable, optional):
+            Function returning the current time in seconds.
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        # generation of the latest invalidation of the most recently
+        # invalidated keys; older ones are forgotten, and keys missing here
+        # are assumed to have been invalidated at _forgotten
+        self._generation = 0
+        self._invalidations = OrderedDict()
+        self._forgotten = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def Get(self, key):
+        """Returns the value stored for key, or None if it is missing or
+        expired."""
+        key = str(key)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires, value = entry
+                del self._entries[key]
+                if expires is None or expires > self._clock():
+                    # re-insert to mark it as the most recently used
+                    self._entries[key] = entry
+                    self.hits += 1
+                    return copy.deepcopy(value)
+            self.misses += 1
+            return None
+
+    def Generation(self):
+        """Returns the current generation, to be passed to Set() after
+        reading the value to store."""
+        with self._lock:
+            return self._generation
+
+    def Set(self, key, value, generation=None):
+        """Stores value under key, evicting the least recently used entries
+        if the cache is full.
+
+        Args:
+          key (int, str):
+            The order id.
+          value:
+            The value to store, usually the order's JSON dict.
+          generation (int, optional):
+            The Generation() taken before value was read. If key was
+            invalidated since, value is stale and is not stored.
+        """
+        key = str(key)
+        value = copy.deepcopy(value)
+        expires = None if self.ttl is None else self._clock() + self.ttl
+        with self._lock:
+            if generation is not None and \
+                    self._invalidations.get(key, self._forgotten) > generation:
+                return
+            self._entries.pop(key, None)
+            self._entries[key] = (expires, value)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def Invalidate(self, key):
+        """Drops the entry stored under key, if any."""
+        key = str(key)
+        with self._lock:
+            self._entries.pop(key, None)
+            self._generation += 1
+            self._invalidations.pop(key, None)
+            self._invalidations[key] = self._generation
+            while len(self._invalidations) > self.max_entries:
+                _, self._forgotten = self._invalidations.popitem(last=False)
+
+    def Clear(self):
+        """Drops every entry. Statistics are kept."""
+        with self._lock:
+            self._entries.clear()
+            self._generation += 1
+            self._invalidations.clear()
+            self._forgotten = self._generation
+
+    def Stats(self):
+        """Returns a dict with the hits, misses, evictions and current size
+        of the cache."""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'size': len(self._entries),
+            }
+
+    def __len__(self):
+        return len(self._entries)
@@ -9,3 +9,7 @@ class TiendaMobilError(Exception):
         '''Returns the first argument used to construct this error.'''
         return self.args[0]
 
+
+
+class TiendaMobilValidationError(TiendaMobilError):
+    """Raised when the API rejects a record as unprocessable (HTTP 422)"""
@@ -0,0 +1,216 @@
+#!/usr/bin/env python
+
+"""Interchangeable JSON encoders/decoders.
+
+The stdlib json module is always available; orjson and ujson are used when
+installed and requested by name, or picked automatically with 'auto'.
+IterDocument() decodes large documents incrementally.
+"""
+
+import codecs
+import json
+
+# Preference order used by GetJsonBackend('auto')
+_PREFERENCE = ('orjson', 'ujson', 'json')
+
+# Decoded JSON strings: unicode on Python 2, str on Python 3
+_TEXT_TYPE = type(u'')
+
+
+class JsonBackend(object):
+    """A named pair of dumps/loads functions.
+
+    dumps(obj, sort_keys=False) always returns text and loads(data) accepts
+    both text and bytes, whatever the underlying library does.
+    """
+
+    def __init__(self, name, dumps, loads):
+        self.name = name
+        self.dumps = dumps
+        self.loads = loads
+
+    def __repr__(self):
+        return "JsonBackend(Name='{0}')".format(self.name)
+
+
+def _StdlibBackend():
+    def dumps(obj, sort_keys=False):
+        return json.dumps(obj, sort_keys=sort_keys)
+
+    def loads(data):
+        if isinstance(data, bytes):
+            data = data.decode('utf-8')
+        return json.loads(data)
+
+    return JsonBackend('json', dumps, loads)
+
+
+def _OrjsonBackend():
+    import orjson
+
+    def dumps(obj, sort_keys=False):
+        option = orjson.OPT_SORT_KEYS if sort_keys else 0
+        return orjson.dumps(obj, option=option).decode('utf-8')
+
+    return JsonBackend('orjson', dumps, orjson.loads)
+
+
+def _UjsonBackend():
+    import ujson
+
+    def dumps(obj, sort_keys=False):
+        return ujson.dumps(obj, sort_keys=sort_keys, escape_forward_slashes=False)
+
+    return JsonBackend('ujson', dumps, ujson.loads)
+
+
+_FACTORIES = {
+    'json': _StdlibBackend,
+    'orjson': _OrjsonBackend,
+    'ujson': _UjsonBackend,
+}
+_BACKENDS = {}
+
+
+def GetJsonBackend(name='auto'):
+    """Returns the JsonBackend registered as name.
+
+    Args:
+        name (str, JsonBackend, optional):
+            One of 'json', 'orjson', 'ujson', or 'auto' for the fastest one
+            installed. A JsonBackend instance is returned unchanged.
+
+    Raises:
+        (ValueError): if name is unknown or its library is not installed.
+    """
+    if isinstance(name, JsonBackend):
+        return name
+    if name == 'auto':
+        return GetJsonBackend(AvailableBackends()[0])
+
+    backend = _BACKENDS.get(name)
+    if backend is None:
+        if name not in _FACTORIES:
+            raise ValueError('Unknown JSON backend: {0}'.format(name))
+        try:
+            backend = _BACKENDS[name] = _FACTORIES[name]()
+        except ImportError:
+            raise ValueError('JSON backend {0} is not installed'.format(name))
+    return backend
+
+
+def AvailableBackends():
+    """Returns the names of the installed backends, fastest first."""
+    available = []
+    for name in _PREFERENCE:
+        try:
+            GetJsonBackend(name)
+        except ValueError:
+            continue
+        available.append(name)
+    return available
+
+
+class _Stream(object):
+    """Text decoded from an iterable of byte chunks, buffered just enough
+    to decode the next JSON value."""
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._decoder = codecs.getincrementaldecoder('utf-8')()
+        self._raw_decode = json.JSONDecoder().raw_decode
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+
+    def Read(self):
+        """Appends the next chunk to the buffer, dropping what was already
+        consumed. Returns False once the input is exhausted."""
+        if self.eof:
+            return False
+        self.buffer = self.buffer[self.pos:]
+        self.pos = 0
+        for chunk in self._chunks:
+            text = self._decoder.decode(chunk)
+            if text:
+                self.buffer += text
+                return True
+        self.buffer += self._decoder.decode(b'', final=True)
+        self.eof = True
+        return True
+
+    def Peek(self):
+        """Skips whitespace and returns the next character, '' at the end
+        of the input."""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in ' \t\n\r':
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self.Read():
+                return ''
+
+    def Expect(self, chars):
+        char = self.Peek()
+        if not char or char not in chars:
+            raise ValueError('Expecting {0!r} at char {1}, found {2!r}'.format(
+                chars, self.pos, char))
+        self.pos += 1
+        return char
+
+    def Value(self):
+        """Decodes the next JSON value, reading as many chunks as needed."""
+        self.Peek()
+        while True:
+            # only retry once the buffer doubled, so a value spanning many
+            # chunks is not decoded again after every one of them
+            size = 2 * (len(self.buffer) - self.pos)
+            try:
+                value, end = self._raw_decode(self.buffer, self.pos)
+            except ValueError:
+                if self.eof:
+                    raise
+            else:
+                # a number may go on in the next chunk
+                if end < len(self.buffer) or self.eof:
+                    self.pos = end
+                    return value
+            while not self.eof and len(self.buffer) - self.pos < size:
+                self.Read()
+
+
+def IterDocument(chunks, array_member='data'):
+    """Decodes a JSON object incrementally from an iterable of UTF-8 byte
+    chunks, such as requests' Response.iter_content().
+
+    Every member is yielded as a (name, value) tuple as soon as it has been
+    read. If array_member holds an array, its elements are yielded one by
+    one as (array_member, element) tuples instead, so only a single element
+    is kept in memory at a time.
+
+    Raises:
+        (ValueError): if the input is not a JSON object.
+    """
+    stream = _Stream(chunks)
+    stream.Expect('{')
+    if stream.Peek() == '}':
+        stream.pos += 1
+        return
+    while True:
+        name = stream.Value()
+        if not isinstance(name, _TEXT_TYPE):
+            raise ValueError('Expecting property name at char {0}'.format(stream.pos))
+        stream.Expect(':')
+        if name == array_member and stream.Peek() == '[':
+            stream.pos += 1
+            if stream.Peek() == ']':
+                stream.pos += 1
+            else:
+                while True:
+                    yield name, stream.Value()
+                    if stream.Expect(',]') == ']':
+                        break
+        else:
+            yield name, stream.Value()
+        if stream.Expect(',}') == '}':
+            break
@@ -0,0 +1,197 @@
+#!/usr/bin/env python
+
+import bisect
+import threading
+
+# Upper bounds, in seconds, of the request latency histogram buckets
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+class Metrics(object):
+    """Interface of the collectors accepted by tienda_mobil.Api.
+
+    Every HTTP request sent, including retries, is reported through these
+    hooks. endpoint is the URL path relative to the Api base_url, with
+    numeric ids replaced by {id} (e.g. /orders/{id}). The default
+    implementations do nothing, subclasses override the ones they need.
+    Hooks are called from every thread using the Api and must be
+    thread-safe.
+    """
+
+    def RequestStarted(self, endpoint, verb):
+        """Called right before a request is sent."""
+
+    def RequestFinished(self, endpoint, verb, status, seconds,
+                        request_bytes, response_bytes):
+        """Called once a request completed or failed.
+
+        Args:
+            status (int): HTTP status code, None if no response was received.
+            seconds (float): Time elapsed since RequestStarted.
+            request_bytes (int): Size of the request body.
+            response_bytes (int): Size of the response body.
+        """
+
+    def RequestFailed(self, endpoint, verb, error_type):
+        """Called for every error detected while handling a request.
+
+        Args:
+            error_type (str): The requests exception name for connection
+                errors, 'HTTPError' for 4xx/5xx responses, 'ParseError' for
+                bodies that are not JSON and 'ApiError' for JSON:API error
+                documents.
+        """
+
+
+class InMemoryMetrics(Metrics):
+    """A thread-safe collector keeping every metric in memory.
+
+    Histograms, counters and gauges are keyed by (endpoint, verb); Snapshot()
+    returns a copy of them.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        """Instantiate a new tienda_mobil.InMemoryMetrics object.
+
+        Args:
+          buckets (tuple, optional):
+            Sorted upper bounds, in seconds, of the latency histogram
+            buckets. An implicit +Inf bucket is always added.
+        """
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self.Reset()
+
+    def Reset(self):
+        """Drops every recorded value."""
+        with self._lock:
+            self._latency = {}
+            self._request_bytes = {}
+            self._response_bytes = {}
+            self._statuses = {}
+            self._errors = {}
+            self._in_flight = {}
+
+    def RequestStarted(self, endpoint, verb):
+        key = (endpoint, verb)
+        with self._lock:
+            self._in_flight[key] = self._in_flight.get(key, 0) + 1
+
+    def RequestFinished(self, endpoint, verb, status, seconds,
+                        request_bytes, response_bytes):
+        key = (endpoint, verb)
+        with self._lock:
+            self._in_flight[key] = self._in_flight.get(key, 0) - 1
+
+            histogram = self._latency.get(key)
+            if histogram is None:
+                histogram = self._latency[key] = {
+                    'buckets': [0] * (len(self.buckets) + 1),
+                    'sum': 0.,
+                    'count': 0,
+                }
+            histogram['buckets'][bisect.bisect_left(self.buckets, seconds)] += 1
+            histogram['sum'] += seconds
+            histogram['count'] += 1
+
+            self._request_bytes[key] = self._request_bytes.get(key, 0) + request_bytes
+            self._response_bytes[key] = self._response_bytes.get(key, 0) + response_bytes
+            if status is not None:
+                key = (endpoint, verb, status)
+                self._statuses[key] = self._statuses.get(key, 0) + 1
+
+    def RequestFailed(self, endpoint, verb, error_type):
+        key = (endpoint, verb, error_type)
+        with self._lock:
+            self._errors[key] = self._errors.get(key, 0) + 1
+
+    def Snapshot(self):
+        """Returns a dict with a copy of the recorded metrics:
+
+            latency: {(endpoint, verb): {'buckets': [...], 'sum', 'count'}},
+              buckets holding the non-cumulative count of each bucket, the
+              last one being +Inf.
+            request_bytes, response_bytes: {(endpoint, verb): total bytes}
+            statuses: {(endpoint, verb, status): count}
+            errors: {(endpoint, verb, error_type): count}
+            in_flight: {(endpoint, verb): requests currently being sent}
+        """
+        with self._lock:
+            return {
+                'latency': dict((key, {'buckets': list(h['buckets']),
+                                       'sum': h['sum'],
+                                       'count': h['count']})
+                                for key, h in self._latency.items()),
+                'request_bytes': dict(self._request_bytes),
+                'response_bytes': dict(self._response_bytes),
+                'statuses': dict(self._statuses),
+                'errors': dict(self._errors),
+                'in_flight': dict(self._in_flight),
+            }
+
+
+def PrometheusText(metrics, namespace='tienda_mobil'):
+    """Renders an InMemoryMetrics in the Prometheus text exposition format
+    (version 0.0.4), ready to be served from a /metrics endpoint.
+
+    Args:
+        metrics (tienda_mobil.InMemoryMetrics): The collector to render.
+        namespace (str, optional): Prefix of every metric name.
+
+    Returns:
+        The exposition as a str.
+    """
+    snapshot = metrics.Snapshot()
+    lines = []
+
+    def family(name, kind, help_text):
+        lines.append('# HELP {0}_{1} {2}'.format(namespace, name, help_text))
+        lines.append('# TYPE {0}_{1} {2}'.format(namespace, name, kind))
+
+    def sample(name, labels, value):
+        lines.append('{0}_{1}{{{2}}} {3}'.format(
+            namespace, name,
+            ','.join('{0}="{1}"'.format(k, _EscapeLabel(v)) for k, v in labels),
+            value))
+
+    family('request_duration_seconds', 'histogram',
+           'Latency of the requests sent to the Tienda Mobil API.')
+    for (endpoint, verb), histogram in sorted(snapshot['latency'].items()):
+        labels = [('endpoint', endpoint), ('verb', verb)]
+        cumulative = 0
+        bounds = [str(b) for b in metrics.buckets] + ['+Inf']
+        for bound, count in zip(bounds, histogram['buckets']):
+            cumulative += count
+            sample('request_duration_seconds_bucket', labels + [('le', bound)],
+                   cumulative)
+        sample('request_duration_seconds_sum', labels, histogram['sum'])
+        sample('request_duration_seconds_count', labels, histogram['count'])
+
+    for name, help_text in (
+            ('request_bytes', 'Bytes sent in request bodies.'),
+            ('response_bytes', 'Bytes received in response bodies.')):
+        family(name + '_total', 'counter', help_text)
+        for (endpoint, verb), value in sorted(snapshot[name].items()):
+            sample(name + '_total', [('endpoint', endpoint), ('verb', verb)], value)
+
+    family('responses_total', 'counter', 'Responses received by status code.')
+    for (endpoint, verb, status), value in sorted(snapshot['statuses'].items()):
+        sample('responses_total',
+               [('endpoint', endpoint), ('verb', verb), ('status', status)], value)
+
+    family('errors_total', 'counter', 'Request errors by type.')
+    for (endpoint, verb, error_type), value in sorted(snapshot['errors'].items()):
+        sample('errors_total',
+               [('endpoint', endpoint), ('verb', verb), ('type', error_type)], value)
+
+    family('requests_in_flight', 'gauge', 'Requests currently being sent.')
+    for (endpoint, verb), value in sorted(snapshot['in_flight'].items()):
+        sample('requests_in_flight', [('endpoint', endpoint), ('verb', verb)], value)
+
+    return '\n'.join(lines) + '\n'
+
+
+def _EscapeLabel(value):
+    return (str(value).replace('\\', '\\\\')
+                      .replace('"', '\\"')
+                      .replace('\n', '\\n'))
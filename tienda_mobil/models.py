@@ -1,13 +1,121 @@
 #encoding: utf-8
 
-import json
+import copy
+import keyword
+import re
+import sys
+import threading
+from collections import OrderedDict
+
+from tienda_mobil.jsonlib import GetJsonBackend
+
+# Values of these exact types never need converting in AsDict()
+_PLAIN_TYPES = frozenset([str, int, float, bool, dict, type(None)])
+
+# Field names that can be read as plain attributes (str.isidentifier() is
+# Python 3 only)
+_IDENTIFIER = re.compile(r'[A-Za-z_][A-Za-z0-9_]*$')
+
+# One serializer per model class, generated on first use by _Serializer()
+_SERIALIZERS = {}
+
+_SERIALIZER_TEMPLATE = """\
+def AsDict(self):
+    data = {{}}
+{fields}
+    return data
+"""
+
+_FIELD_TEMPLATE = """\
+    try:
+        value = self.{attr}
+    except AttributeError:
+        value = None
+    if value.__class__ in _PLAIN_TYPES:
+        if value:
+            data[{key!r}] = value
+    else:
+        _SerializeValue(data, {key!r}, value)
+"""
+
+
+def _SerializeValue(data, key, value):
+    """ Adds value to data, converting TiendaMobilModels (or lists of them)
+    with their AsDict() method. """
+
+    # If the value is a list, we need to create a list to hold the
+    # dicts created by an object supporting the AsDict() method,
+    # i.e., if it inherits from TiendaMobilModel. If the item in the list
+    # doesn't support the AsDict() method, then we assign the value
+    # directly.
+    if isinstance(value, (list, tuple, set)):
+        data[key] = list()
+        for subobj in value:
+            if getattr(subobj, 'AsDict', None):
+                data[key].append(subobj.AsDict())
+            else:
+                data[key].append(subobj)
+
+    # Not a list, *but still a subclass of TiendaMobilModel* and
+    # and we can assign the data[key] directly with the AsDict()
+    # method of the object.
+    elif getattr(value, 'AsDict', None):
+        data[key] = value.AsDict()
+
+    # If the value doesn't have an AsDict() method, i.e., it's not
+    # something that subclasses TiendaMobilModel, then we can use direct
+    # assigment.
+    elif value:
+        data[key] = value
+
+
+def _Serializer(cls):
+    """ Returns the AsDict() implementation of cls, generating it from the
+    class field schema the first time. The generated function reads every
+    field once and only inspects values that are not plain JSON types. """
+    serializer = _SERIALIZERS.get(cls)
+    if serializer is None:
+        fields = []
+        for key in cls.param_defaults:
+            if _IDENTIFIER.match(key) and not keyword.iskeyword(key):
+                fields.append(_FIELD_TEMPLATE.format(attr=key, key=key))
+            else:
+                fields.append(_FIELD_TEMPLATE.replace(
+                    'self.{attr}', 'getattr(self, {key!r})').format(key=key))
+        namespace = {
+            '_PLAIN_TYPES': _PLAIN_TYPES,
+            '_SerializeValue': _SerializeValue,
+        }
+        source = _SERIALIZER_TEMPLATE.format(fields=''.join(fields))
+        exec(compile(source, '<{0}.AsDict>'.format(cls.__name__), 'exec'),
+             namespace)
+        serializer = _SERIALIZERS[cls] = namespace['AsDict']
+    return serializer
+
 
 class TiendaMobilModel(object):
 
     """ Base class from which all models will inherit. """
 
+    __slots__ = ('_json',)
+
+    # The field schema of a model, mapping each field to its default value,
+    # is shared by every instance. Subclasses list those same fields in
+    # __slots__ so instances don't need a __dict__.
+    param_defaults = {}
+
+    json_backend = GetJsonBackend('json')
+
     def __init__(self, **kwargs):
-        self.param_defaults = {}
+        for (param, default) in self.param_defaults.items():
+            if param in kwargs:
+                value = kwargs[param]
+            elif isinstance(default, (dict, list)):
+                # never hand out the class level default itself
+                value = copy.deepcopy(default)
+            else:
+                value = default
+            setattr(self, param, value)
 
     def __str__(self):
         """ Returns a string representation of TiendaMobilModel. By default
@@ -15,11 +123,28 @@ class TiendaMobilModel(object):
         return self.AsJsonString()
 
     def __eq__(self, other):
+        if self is other:
+            return True
         return other and self.AsDict() == other.AsDict()
 
     def __ne__(self, other):
         return not self.__eq__(other)
 
+    def __getstate__(self):
+        # Python 2 refuses to pickle slotted instances without it
+        state = {}
+        for cls in type(self).__mro__:
+            for name in getattr(cls, '__slots__', ()):
+                try:
+                    state[name] = object.__getattribute__(self, name)
+                except AttributeError:
+                    pass
+        return state
+
+    def __setstate__(self, state):
+        for name, value in state.items():
+            setattr(self, name, value)
+
     def __hash__(self):
         if hasattr(self, 'id'):
             return hash(self.id)
@@ -30,40 +155,25 @@ class TiendaMobilModel(object):
     def AsJsonString(self):
         """ Returns the TiendaMobilModel as a JSON string based on key/value
         pairs returned from the AsDict() method. """
-        return json.dumps(self.AsDict(), sort_keys=True)
+        return self.json_backend.dumps(self.AsDict(), sort_keys=True)
 
     def AsDict(self):
-        """ Create a dictionary representation of the object. Please see inline
-        comments on construction when dictionaries contain TiendaMobilModels. """
-        data = {}
-
-        for (key, value) in self.param_defaults.items():
-
-            # If the value is a list, we need to create a list to hold the
-            # dicts created by an object supporting the AsDict() method,
-            # i.e., if it inherits from TiendaMobilModel. If the item in the list
-            # doesn't support the AsDict() method, then we assign the value
-            # directly.
-            if isinstance(getattr(self, key, None), (list, tuple, set)):
-                data[key] = list()
-                for subobj in getattr(self, key, None):
-                    if getattr(subobj, 'AsDict', None):
-                        data[key].append(subobj.AsDict())
-                    else:
-                        data[key].append(subobj)
-
-            # Not a list, *but still a subclass of TiendaMobilModel* and
-            # and we can assign the data[key] directly with the AsDict()
-            # method of the object.
-            elif getattr(getattr(self, key, None), 'AsDict', None):
-                data[key] = getattr(self, key).AsDict()
-
-            # If the value doesn't have an AsDict() method, i.e., it's not
-            # something that subclasses TiendaMobilModel, then we can use direct
-            # assigment.
-            elif getattr(self, key, None):
-                data[key] = getattr(self, key, None)
-        return data
+        """ Create a dictionary representation of the object. Values that are
+        TiendaMobilModels, or lists of them, are converted with their own
+        AsDict() method; empty values are left out. """
+        return _Serializer(type(self))(self)
+
+    @classmethod
+    def SetJsonBackend(cls, name):
+        """ Selects the JSON encoder used by AsJsonString() for this model
+        class and its subclasses.
+
+        Args:
+            name: 'json' (the default), 'orjson', 'ujson', 'auto' or a
+            tienda_mobil.jsonlib.JsonBackend instance. Only 'json' output
+            matches json.dumps byte for byte.
+        """
+        cls.json_backend = GetJsonBackend(name)
 
     @classmethod
     def NewFromJsonDict(cls, data, **kwargs):
@@ -84,32 +194,250 @@ class TiendaMobilModel(object):
         return c
 
     def __getattr__(self, attr):
-        if hasattr(self, 'attributes') and attr in self.attributes:
-            return self.attributes[attr]
+        # Only reached for names that are not set; guard against recursing
+        # when the attributes field itself is missing.
+        if attr != 'attributes':
+            attributes = getattr(self, 'attributes', None)
+            if attributes and attr in attributes:
+                return attributes[attr]
         raise AttributeError(attr)
 
+
+def _CustomerFromAttributes(attributes, registry=None):
+    """Returns the Customer held in an order's attributes field, building it
+    from its JSON dict, or interning it in registry, if needed."""
+    try:
+        customer = attributes['customer']
+    except (KeyError, TypeError):
+        raise AttributeError('customer')
+    if isinstance(customer, Customer):
+        return customer
+    if registry is not None:
+        return registry.Intern(customer)
+    return Customer.NewFromJsonDict(customer)
+
+
+class Customer(TiendaMobilModel):
+    """A class representing a Customer."""
+
+    __slots__ = (
+        "email",
+        "commercial_origin",
+        "address",
+        "locality",
+        "telephone",
+        "gender",
+        "name",
+        "city",
+        "province",
+        "cellphone",
+        "code",
+        "businessman_code",
+        "associate_code",
+        "zip_code",
+        "charge_date",
+        "birthdate"
+    )
+
+    param_defaults = {
+        "email": "",
+        "commercial_origin": "",
+        "address": "",
+        "locality": "",
+        "telephone": "",
+        "gender": "female",
+        "name": "",
+        "city": "",
+        "province": "",
+        "cellphone": "",
+        "code": "",
+        "businessman_code": "",
+        "associate_code": "",
+        "zip_code": "",
+        "charge_date": "",
+        "birthdate": ""
+    }
+
+    def __repr__(self):
+        return "Customer(Code='{i}', Name='{c}')".format(i=self.code, c=self.name)
+
+    @property
+    def sex(self):
+        return 1 if self.gender == 'female' else 0
+
+
+class _InternedCustomer(Customer):
+    """A Customer shared through a CustomerRegistry, whose fields can no
+    longer be assigned."""
+
+    __slots__ = ()
+
+    def __setattr__(self, name, value):
+        raise AttributeError('Interned customers are immutable')
+
+    def __reduce__(self):
+        # pickling and copying restore slots with setattr, so they build a
+        # plain, mutable Customer instead
+        return (_NewCustomer, (self._json,))
+
+
+def _NewCustomer(data):
+    # a module level function, as Python 2 cannot pickle bound classmethods
+    return Customer.NewFromJsonDict(data)
+
+
+class CustomerRegistry(object):
+    """A thread-safe registry sharing a single, immutable Customer between
+    every order of the same customer.
+
+    Customers are keyed by code and businessman_code. An entry is only
+    reused when the customer JSON dict is equal to the one it was built
+    from; otherwise the newer data replaces it. Orders and previews intern
+    their customer here when built with NewFromJsonDict(data,
+    customer_registry=registry), or retrieved through an Api created with
+    customer_registry=registry.
+
+    Registries are not shared across processes: an unpickled order gets an
+    empty registry, shared with the orders unpickled along with it.
+    """
+
+    def __init__(self, max_entries=10000):
+        """Instantiate a new tienda_mobil.CustomerRegistry object.
+
+        Args:
+          max_entries (int, optional):
+            Maximum number of customers kept. The least recently used one is
+            evicted once the registry is full; orders already holding it keep
+            it. None keeps every customer until Clear() is called.
+        """
+        self.max_entries = max_entries
+        self._customers = OrderedDict()
+        self._lock = threading.Lock()
+        self.lookups = 0
+        self.hits = 0
+        self.evictions = 0
+
+    def __reduce__(self):
+        return (CustomerRegistry, (self.max_entries,))
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        # copied orders keep interning through the same registry
+        return self
+
+    def Intern(self, data):
+        """Returns the shared Customer for a customer JSON dict, building it
+        on first use."""
+        key = (data.get('code'), data.get('businessman_code'))
+        with self._lock:
+            self.lookups += 1
+            customer = self._customers.pop(key, None)
+            if customer is not None and customer._json == data:
+                self.hits += 1
+                # re-insert to mark it as the most recently used
+                self._customers[key] = customer
+                return customer
+            customer = Customer.NewFromJsonDict(data)
+            # Switching the class, rather than setting a flag on Customer,
+            # keeps plain customers free of the __setattr__ check and of an
+            # extra slot, and lets pickling and copying turn an interned
+            # customer back into a plain one through __reduce__.
+            customer.__class__ = _InternedCustomer
+            self._customers[key] = customer
+            while self.max_entries is not None and \
+                    len(self._customers) > self.max_entries:
+                self._customers.popitem(last=False)
+                self.evictions += 1
+            return customer
+
+    def Clear(self):
+        """Drops every interned customer. Statistics are kept."""
+        with self._lock:
+            self._customers.clear()
+
+    def Stats(self):
+        """Returns a dict with the number of lookups, of hits (lookups served
+        by an existing instance) and of evictions, the current number of
+        unique customers, the deduplication ratio (lookups per instance
+        built) and an estimate of the bytes saved by not building an
+        instance on every hit."""
+        with self._lock:
+            built = self.lookups - self.hits
+            return {
+                'lookups': self.lookups,
+                'hits': self.hits,
+                'evictions': self.evictions,
+                'size': len(self._customers),
+                'dedup_ratio': float(self.lookups) / built if built else 0.,
+                'bytes_saved': self.hits * sys.getsizeof(Customer()),
+            }
+
+    def __len__(self):
+        return len(self._customers)
+
+class OrderItem(TiendaMobilModel):
+    """A class representing an item of an Order, an order-item"""
+
+    __slots__ = ('code', 'quantity')
+
+    param_defaults = {
+        'code': '',
+        'quantity': ''
+    }
+
+    def __repr__(self):
+        return "OrderItem(Code='{c}', Quantity={q})".format(
+          c=self.code,
+          q=self.quantity)
+
 class OrderPreview(TiendaMobilModel):
 
     """A class representing the preview of an order. """
 
-    def __init__(self, **kwargs):
-        self.param_defaults = {
-            'id': None,
-            'type': None,
-            'attributes': {
-                'businessman': '',
-                'price-list': '',
-                'total-quantity': 0,
-                'customer': Customer(),
-                'comment': '',
-                'total-amount': 0.
-            }
+    __slots__ = ('id', 'type', 'attributes', '_customer', '_registry')
+
+    param_defaults = {
+        'id': None,
+        'type': None,
+        'attributes': {
+            'businessman': '',
+            'price-list': '',
+            'total-quantity': 0,
+            'customer': Customer(),
+            'comment': '',
+            'total-amount': 0.
         }
+    }
 
-        for (param, default) in self.param_defaults.items():
-            setattr(self, param, kwargs.get(param, default))
-        if 'attributes' in kwargs and 'customer' in kwargs['attributes']:
-            self.customer = Customer.NewFromJsonDict(kwargs['attributes']['customer'])
+    @classmethod
+    def NewFromJsonDict(cls, data, customer_registry=None, **kwargs):
+        """ Create a new instance based on a JSON dict.
+
+        Args:
+            data: A JSON dict, as converted from the JSON in the API.
+            customer_registry (tienda_mobil.CustomerRegistry, optional): The
+                registry the order's customer is interned in.
+        """
+        order = super(OrderPreview, cls).NewFromJsonDict(data, **kwargs)
+        if customer_registry is not None:
+            order._registry = customer_registry
+        return order
+
+    @property
+    def customer(self):
+        """The order's tienda_mobil.Customer, built on first access."""
+        try:
+            return self._customer
+        except AttributeError:
+            self._customer = _CustomerFromAttributes(
+                self.attributes, getattr(self, '_registry', None))
+            return self._customer
+
+    @customer.setter
+    def customer(self, value):
+        self._customer = value
 
     def __repr__(self):
         return "OrderPreview(ID={i}, Customer='{c}', TotalAmount='{a}')".format(
@@ -133,28 +461,64 @@ class OrderPreview(TiendaMobilModel):
 class Order(TiendaMobilModel):
     """A class representing an order. """
 
-    def __init__(self, **kwargs):
-        self.param_defaults = {
-            'id': None,
-            'type': None,
-            'attributes': {
-                'comment': '',
-                'price-list': '',
-                'order-items': [],
-                'customer': Customer()
-            }
+    __slots__ = ('id', 'type', 'attributes', '_customer', '_items', '_registry')
+
+    param_defaults = {
+        'id': None,
+        'type': None,
+        'attributes': {
+            'comment': '',
+            'price-list': '',
+            'order-items': [],
+            'customer': Customer()
         }
+    }
 
-        for (param, default) in self.param_defaults.items():
-            setattr(self, param, kwargs.get(param, default))
-        if 'attributes' in kwargs:
-            attr = kwargs['attributes']
-            if 'customer' in attr:
-                self.customer = Customer.NewFromJsonDict(attr['customer'])
-            if 'order-items' in attr:
-                self.items = []
-                for oi in attr['order-items']:
-                    self.items.append(OrderItem.NewFromJsonDict(oi))
+    @classmethod
+    def NewFromJsonDict(cls, data, customer_registry=None, **kwargs):
+        """ Create a new instance based on a JSON dict.
+
+        Args:
+            data: A JSON dict, as converted from the JSON in the API.
+            customer_registry (tienda_mobil.CustomerRegistry, optional): The
+                registry the order's customer is interned in.
+        """
+        order = super(Order, cls).NewFromJsonDict(data, **kwargs)
+        if customer_registry is not None:
+            order._registry = customer_registry
+        return order
+
+    @property
+    def customer(self):
+        """The order's tienda_mobil.Customer, built on first access."""
+        try:
+            return self._customer
+        except AttributeError:
+            self._customer = _CustomerFromAttributes(
+                self.attributes, getattr(self, '_registry', None))
+            return self._customer
+
+    @customer.setter
+    def customer(self, value):
+        self._customer = value
+
+    @property
+    def items(self):
+        """The order's tienda_mobil.OrderItem list, built on first access."""
+        try:
+            return self._items
+        except AttributeError:
+            pass
+        try:
+            order_items = self.attributes['order-items']
+        except (KeyError, TypeError):
+            raise AttributeError('items')
+        self._items = [OrderItem.NewFromJsonDict(oi) for oi in order_items]
+        return self._items
+
+    @items.setter
+    def items(self, value):
+        self._items = value
 
     def __repr__(self):
         return "Order(ID={i}, Customer={c})".format(
@@ -164,53 +528,3 @@ class Order(TiendaMobilModel):
     @property
     def priceList(self):
         return self.attributes['price-list']
-
-class OrderItem(TiendaMobilModel):
-    """A class representing an item of an Order, an order-item"""
-
-    def __init__(self, **kwargs):
-        self.param_defaults = {
-            'code': '',
-            'quantity': ''
-        }
-
-        for (param, default) in self.param_defaults.items():
-            setattr(self, param, kwargs.get(param, default))
-
-    def __repr__(self):
-        return "OrderItem(Code='{c}', Quantity={q})".format(
-          c=self.code,
-          q=self.quantity)
-
-class Customer(TiendaMobilModel):
-    """A class representing a Customer."""
-
-    def __init__(self, **kwargs):
-        self.param_defaults = {
-            "email": "",
-            "commercial_origin": "",
-            "address": "",
-            "locality": "",
-            "telephone": "",
-            "gender": "female",
-            "name": "",
-            "city": "",
-            "province": "",
-            "cellphone": "",
-            "code": "",
-            "businessman_code": "",
-            "associate_code": "",
-            "zip_code": "",
-            "charge_date": "",
-            "birthdate": ""
-        }
-
-        for (param, default) in self.param_defaults.items():
-            setattr(self, param, kwargs.get(param, default))
-
-    def __repr__(self):
-        return "Customer(Code='{i}', Name='{c}')".format(i=self.code, c=self.name)
-
-    @property
-    def sex(self):
-        return 1 if self.gender == 'female' else 0
@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+
+import heapq
+import threading
+
+from tienda_mobil.models import TiendaMobilModel
+
+
+class OrderBook(object):
+    """A thread-safe index of the quantities ordered across pending orders.
+
+    Running totals are kept per item code, customer code and price list,
+    and updated as orders are added and removed, so lookups never walk the
+    orders. Attach it to tienda_mobil.Api as order_book to index every order
+    retrieved with GetOrder and drop it once UpdateOrderStatus succeeds.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._orders = {}
+        self._items = {}
+        self._customers = {}
+        self._price_lists = {}
+
+    def Add(self, order):
+        """Indexes an order, replacing a previous version of it.
+
+        Args:
+            order (tienda_mobil.Order, dict): The order, or its JSON dict.
+        """
+        if isinstance(order, TiendaMobilModel):
+            order_id = order.id
+            customer = getattr(order, 'customer', None)
+            entry = (
+                customer.code if customer is not None else '',
+                (order.attributes or {}).get('price-list', ''),
+                [(str(item.code), int(item.quantity or 0))
+                 for item in getattr(order, 'items', None) or []],
+            )
+        else:
+            order_id = order.get('id')
+            attributes = order.get('attributes') or {}
+            entry = (
+                (attributes.get('customer') or {}).get('code', ''),
+                attributes.get('price-list', ''),
+                [(str(item.get('code', '')), int(item.get('quantity') or 0))
+                 for item in attributes.get('order-items') or []],
+            )
+
+        order_id = str(order_id)
+        with self._lock:
+            previous = self._orders.get(order_id)
+            if previous is not None:
+                self._Apply(previous, -1)
+            self._orders[order_id] = entry
+            self._Apply(entry, 1)
+
+    def Remove(self, order_id):
+        """Drops an order from the index. Returns False if it was not
+        indexed."""
+        with self._lock:
+            entry = self._orders.pop(str(order_id), None)
+            if entry is None:
+                return False
+            self._Apply(entry, -1)
+            return True
+
+    def Clear(self):
+        """Drops every order."""
+        with self._lock:
+            self._orders.clear()
+            self._items.clear()
+            self._customers.clear()
+            self._price_lists.clear()
+
+    def _Apply(self, entry, sign):
+        customer_code, price_list, items = entry
+        for code, quantity in items:
+            delta = sign * quantity
+            _Increment(self._items, code, delta)
+            _Increment(self._customers, customer_code, delta)
+            _Increment(self._price_lists, price_list, delta)
+
+    def ItemQuantity(self, code):
+        """Returns the pending quantity of an item code."""
+        return self._items.get(str(code), 0)
+
+    def CustomerQuantity(self, code):
+        """Returns the quantity pending across the orders of a customer."""
+        return self._customers.get(str(code), 0)
+
+    def PriceListQuantity(self, price_list):
+        """Returns the quantity pending across the orders of a price list."""
+        return self._price_lists.get(price_list, 0)
+
+    def TopItems(self, n=10):
+        """Returns the n (item code, quantity) pairs with the largest
+        pending quantity, largest first."""
+        return self._Top(self._items, n)
+
+    def TopCustomers(self, n=10):
+        """Returns the n (customer code, quantity) pairs with the largest
+        pending quantity, largest first."""
+        return self._Top(self._customers, n)
+
+    def TopPriceLists(self, n=10):
+        """Returns the n (price list, quantity) pairs with the largest
+        pending quantity, largest first."""
+        return self._Top(self._price_lists, n)
+
+    def _Top(self, totals, n):
+        with self._lock:
+            return heapq.nlargest(n, totals.items(), key=lambda x: x[1])
+
+    def __contains__(self, order_id):
+        return str(order_id) in self._orders
+
+    def __len__(self):
+        return len(self._orders)
+
+
+def _Increment(totals, key, delta):
+    total = totals.get(key, 0) + delta
+    if total:
+        totals[key] = total
+    else:
+        # keep the totals free of entries for keys without pending orders
+        totals.pop(key, None)
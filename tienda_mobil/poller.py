@@ -0,0 +1,163 @@
+#!/usr/bin/env python
+
+import logging
+import random
+import threading
+
+from tienda_mobil.error import TiendaMobilError
+
+logger = logging.getLogger(__name__)
+
+
+class Poller(object):
+    """Polls GetPendingOrders at an interval that follows the traffic.
+
+    The interval drops to min_interval as soon as a poll finds new orders,
+    and grows by backoff (up to max_interval) whenever the pending list is
+    empty or the request fails. Polls that only find known orders keep the
+    current interval. Every delay is jittered, so that several pollers do
+    not hit the API in lockstep.
+    """
+
+    def __init__(self, api, handler, min_interval=1., max_interval=300.,
+                 backoff=2., jitter=0.5, sleep=None, random=random.random):
+        """Instantiate a new tienda_mobil.Poller object.
+
+        Args:
+          api (tienda_mobil.Api):
+            The client used to poll the pending orders.
+          handler (callable):
+            Called with the list of tienda_mobil.OrderPreview of the orders
+            that were not pending on the previous poll. If it raises, the
+            error is logged and those orders are handed again on the next
+            poll.
+          min_interval (float, optional):
+            Seconds between polls while new orders keep appearing.
+          max_interval (float, optional):
+            Longest number of seconds between polls.
+          backoff (float, optional):
+            Factor the interval grows by after an empty or failed poll.
+          jitter (float, optional):
+            Fraction of the interval that is randomly taken off each delay,
+            between 0 (no jitter) and 1.
+          sleep (callable, optional):
+            Function used to wait. By default waits can be cut short by
+            Stop().
+          random (callable, optional):
+            Function returning a random float in [0, 1).
+        """
+        if not 0 < min_interval <= max_interval:
+            raise ValueError('min_interval must be positive and not above max_interval')
+        if backoff < 1:
+            raise ValueError('backoff must be at least 1')
+        if not 0 <= jitter <= 1:
+            raise ValueError('jitter must be between 0 and 1')
+        self.api = api
+        self.handler = handler
+        self.min_interval = float(min_interval)
+        self.max_interval = float(max_interval)
+        self.backoff = backoff
+        self.jitter = jitter
+        self._stopped = threading.Event()
+        self._sleep = sleep or self._stopped.wait
+        self._random = random
+        self._lock = threading.Lock()
+        self._interval = self.min_interval
+        self._known = set()
+        self._thread = None
+        self._stats = dict.fromkeys(('polls', 'errors', 'new_orders'), 0)
+
+    @property
+    def interval(self):
+        """The current number of seconds between polls, before jitter."""
+        return self._interval
+
+    @property
+    def rate(self):
+        """The current number of polls per second, before jitter."""
+        return 1. / self._interval
+
+    def Poll(self):
+        """Polls the pending orders once, hands the new ones to the handler
+        and adjusts the interval.
+
+        Returns:
+          The number of seconds to wait before the next poll.
+        """
+        try:
+            previews = self.api.GetPendingOrders()
+        except TiendaMobilError as e:
+            logger.warning('Polling pending orders failed: %s', e)
+            return self._Failed()
+        except Exception:
+            # e.g. a malformed response; keep polling instead of letting the
+            # thread die
+            logger.exception('Polling pending orders failed')
+            return self._Failed()
+
+        ids = set(str(preview.id) for preview in previews)
+        new = [preview for preview in previews if str(preview.id) not in self._known]
+        if new:
+            try:
+                self.handler(new)
+            except Exception:
+                logger.exception('Poller handler failed for %d orders', len(new))
+                # forget them, so they are handed again next time
+                ids.difference_update(str(preview.id) for preview in new)
+
+        with self._lock:
+            self._known = ids
+            self._stats['polls'] += 1
+            self._stats['new_orders'] += len(new)
+            if new:
+                self._interval = self.min_interval
+            elif not previews:
+                self._interval = min(self.max_interval, self._interval * self.backoff)
+        return self._Delay()
+
+    def _Failed(self):
+        with self._lock:
+            self._stats['polls'] += 1
+            self._stats['errors'] += 1
+            self._interval = min(self.max_interval, self._interval * self.backoff)
+        return self._Delay()
+
+    def _Delay(self):
+        return self._interval * (1 - self.jitter * self._random())
+
+    def Run(self):
+        """Polls until Stop() is called."""
+        while not self._stopped.is_set():
+            delay = self.Poll()
+            if not self._stopped.is_set():
+                self._sleep(delay)
+
+    def Start(self):
+        """Runs the poller in a background thread."""
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self.Run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def Stop(self):
+        """Stops polling, waiting for a poll in progress to finish."""
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self):
+        self.Start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.Stop()
+
+    def Stats(self):
+        """Returns a dict counting the polls, the failed polls and the new
+        orders found, along with the current interval and rate."""
+        with self._lock:
+            stats = dict(self._stats)
+        stats['interval'] = self.interval
+        stats['rate'] = self.rate
+        return stats
@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+
+import threading
+import time
+from email.utils import mktime_tz, parsedate_tz
+
+_monotonic = getattr(time, 'monotonic', time.time)
+
+# X-RateLimit-Reset values above this are epoch timestamps, not a number of
+# seconds to wait
+_EPOCH_THRESHOLD = 10 ** 9
+
+# Fractions of a token below this are float rounding errors
+_EPSILON = 1e-9
+
+
+class RateLimit(object):
+    """A thread-safe token bucket shared by every request of an Api instance.
+
+    Besides the configured rate, the bucket pauses all callers whenever the
+    server reports that the quota is exhausted (X-RateLimit-Remaining: 0) or
+    asks clients to back off (Retry-After). Those pauses are capped at
+    max_pause, so a bogus header cannot block every caller indefinitely.
+    """
+
+    def __init__(self, rate=None, burst=None, max_pause=300, clock=_monotonic,
+                 sleep=time.sleep):
+        """Instantiate a new tienda_mobil.RateLimit object.
+
+        Args:
+          rate (float, optional):
+            Sustained number of requests per second, None for no limit.
+          burst (int, optional):
+            Maximum number of requests allowed back to back after an idle
+            period. Defaults to max(1, rate).
+          max_pause (float, optional):
+            Longest number of seconds a single Pause() holds requests back.
+          clock (callable, optional):
+            Function returning the current time in seconds.
+          sleep (callable, optional):
+            Function used to wait.
+        """
+        if rate is not None and rate <= 0:
+            raise ValueError('rate must be positive, or None for no limit')
+        if burst is not None and burst < 1:
+            raise ValueError('burst must be at least 1')
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1, rate or 1)
+        self.max_pause = max_pause
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._tokens = float(self.burst)
+        self._updated = clock()
+        self._paused_until = 0
+
+    def Acquire(self):
+        """Blocks until a request is allowed to be sent."""
+        while True:
+            with self._lock:
+                now = self._clock()
+                wait = self._paused_until - now
+                if wait <= 0 and self.rate is None:
+                    return
+                if wait <= 0:
+                    self._tokens = min(
+                        self.burst,
+                        self._tokens + (now - self._updated) * self.rate)
+                    self._updated = now
+                    # after sleeping the computed wait the refill may fall
+                    # short of a whole token by a rounding error only
+                    if self._tokens >= 1 - _EPSILON:
+                        self._tokens = max(0., self._tokens - 1)
+                        return
+                    wait = (1 - self._tokens) / self.rate
+            self._sleep(wait)
+
+    def Pause(self, seconds):
+        """Holds every request back for the given number of seconds, up to
+        max_pause, and returns the number of seconds actually paused."""
+        seconds = min(seconds, self.max_pause)
+        with self._lock:
+            self._paused_until = max(self._paused_until, self._clock() + seconds)
+        return seconds
+
+    def UpdateFromHeaders(self, headers):
+        """Pauses the bucket according to the rate limit headers of a
+        response.
+
+        Args:
+            headers (dict):
+                Case-insensitive mapping of response headers.
+
+        Returns:
+            The number of seconds requests are held back, 0 if none.
+        """
+        delay = RetryAfter(headers)
+        if delay is None and headers.get('X-RateLimit-Remaining') == '0':
+            delay = _ParseReset(headers.get('X-RateLimit-Reset'))
+        if not delay:
+            return 0
+        return self.Pause(delay)
+
+
+def RetryAfter(headers):
+    """Returns the number of seconds requested by a Retry-After header, or None
+    if the header is missing or invalid."""
+    value = headers.get('Retry-After')
+    if not value:
+        return None
+    try:
+        return max(0, float(value))
+    except ValueError:
+        pass
+    date = parsedate_tz(value)
+    if date is None:
+        return None
+    return max(0, mktime_tz(date) - time.time())
+
+
+def _ParseReset(value):
+    try:
+        reset = float(value)
+    except (TypeError, ValueError):
+        return None
+    if reset > _EPOCH_THRESHOLD:
+        reset -= time.time()
+    return max(0, reset)
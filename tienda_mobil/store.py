@@ -0,0 +1,292 @@
+#!/usr/bin/env python
+
+import sqlite3
+
+from tienda_mobil.error import TiendaMobilError
+from tienda_mobil.models import Customer, Order, OrderPreview, TiendaMobilModel
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS customers (
+    code TEXT PRIMARY KEY,
+    name TEXT,
+    businessman_code TEXT,
+    associate_code TEXT,
+    data TEXT
+);
+CREATE TABLE IF NOT EXISTS orders (
+    id TEXT PRIMARY KEY,
+    customer_code TEXT,
+    businessman TEXT,
+    price_list TEXT,
+    comment TEXT,
+    total_amount REAL,
+    total_quantity INTEGER,
+    processed INTEGER NOT NULL DEFAULT 0,
+    data TEXT
+);
+CREATE TABLE IF NOT EXISTS order_items (
+    order_id TEXT NOT NULL,
+    code TEXT NOT NULL,
+    quantity INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS customers_businessman ON customers (businessman_code);
+CREATE INDEX IF NOT EXISTS orders_customer ON orders (customer_code);
+CREATE INDEX IF NOT EXISTS orders_businessman ON orders (businessman);
+CREATE INDEX IF NOT EXISTS order_items_order ON order_items (order_id);
+CREATE INDEX IF NOT EXISTS order_items_code ON order_items (code);
+"""
+
+# Columns left NULL by one kind of model (e.g. the totals of an Order, or
+# the full JSON of an OrderPreview) keep the value stored by the other.
+_UPSERT_ORDER = """
+INSERT INTO orders (id, customer_code, businessman, price_list, comment,
+                    total_amount, total_quantity, data)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (id) DO UPDATE SET
+    customer_code = COALESCE(excluded.customer_code, customer_code),
+    businessman = COALESCE(excluded.businessman, businessman),
+    price_list = COALESCE(excluded.price_list, price_list),
+    comment = COALESCE(excluded.comment, comment),
+    total_amount = COALESCE(excluded.total_amount, total_amount),
+    total_quantity = COALESCE(excluded.total_quantity, total_quantity),
+    data = COALESCE(excluded.data, data)
+"""
+
+_UPSERT_CUSTOMER = """
+INSERT OR REPLACE INTO customers (code, name, businessman_code, associate_code, data)
+VALUES (?, ?, ?, ?, ?)
+"""
+
+# Previews only carry the code and name of their customer, which must not
+# replace a complete record
+_INSERT_PARTIAL_CUSTOMER = """
+INSERT OR IGNORE INTO customers (code, name, businessman_code, associate_code, data)
+VALUES (?, ?, ?, ?, ?)
+"""
+
+
+class OrderStore(object):
+    """A local SQLite mirror of orders, their customers and items.
+
+    Models are upserted in batches, one transaction per batch, and indexed
+    by order id, customer code, businessman code and item code so
+    analytical queries run without calling the API. Requires SQLite 3.24 or
+    newer. Like the sqlite3 connection it wraps, an OrderStore must only be
+    used from the thread that created it.
+    """
+
+    def __init__(self, path=':memory:', batch_size=500):
+        """Instantiate a new tienda_mobil.OrderStore object.
+
+        Args:
+          path (str, optional):
+            The SQLite database file, created if missing. By default the
+            store lives in memory.
+          batch_size (int, optional):
+            Number of models written per transaction by Upsert().
+        """
+        self.path = path
+        self.batch_size = batch_size
+        self._conn = sqlite3.connect(path)
+        self._conn.executescript(_SCHEMA)
+
+    def Close(self):
+        """Closes the underlying database connection."""
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.Close()
+
+    def Upsert(self, models):
+        """Inserts or updates many models.
+
+        An Order stores its customer and replaces its items, an OrderPreview
+        stores its customer and totals, a Customer is stored on its own.
+        New orders are stored as pending; upserting an existing order keeps
+        its processed flag.
+
+        Args:
+            models (iterable): tienda_mobil.Order, tienda_mobil.OrderPreview
+                and tienda_mobil.Customer instances.
+
+        Returns:
+            The number of models stored.
+
+        Raises:
+            (tiendaMobil.TiendaMobilError): if a model of another type is
+            given. Batches written before it are kept.
+        """
+        count = 0
+        batch = []
+        for model in models:
+            batch.append(model)
+            if len(batch) >= self.batch_size:
+                count += self._WriteBatch(batch)
+                batch = []
+        if batch:
+            count += self._WriteBatch(batch)
+        return count
+
+    def _WriteBatch(self, models):
+        orders = []
+        customers = []
+        partial_customers = []
+        item_orders = []
+        items = []
+        for model in models:
+            if isinstance(model, Customer):
+                customers.append(self._CustomerRow(model))
+            elif isinstance(model, (Order, OrderPreview)):
+                orders.append(self._OrderRow(model))
+                customer = self._OrderCustomer(model)
+                if customer is None:
+                    pass
+                elif isinstance(model, Order):
+                    customers.append(self._CustomerRow(customer))
+                else:
+                    partial_customers.append(self._CustomerRow(customer))
+                if isinstance(model, Order):
+                    order_id = str(model.id)
+                    item_orders.append((order_id,))
+                    try:
+                        order_items = model.items
+                    except AttributeError:
+                        order_items = []
+                    items.extend((order_id, str(item.code), int(item.quantity or 0))
+                                 for item in order_items)
+            else:
+                raise TiendaMobilError(
+                    'Cannot store {0} in an OrderStore'.format(type(model).__name__))
+
+        with self._conn:
+            self._conn.executemany(_UPSERT_CUSTOMER, customers)
+            self._conn.executemany(_INSERT_PARTIAL_CUSTOMER, partial_customers)
+            self._conn.executemany(_UPSERT_ORDER, orders)
+            self._conn.executemany(
+                'DELETE FROM order_items WHERE order_id = ?', item_orders)
+            self._conn.executemany(
+                'INSERT INTO order_items (order_id, code, quantity) VALUES (?, ?, ?)',
+                items)
+        return len(models)
+
+    @staticmethod
+    def _OrderCustomer(order):
+        try:
+            customer = order.customer
+        except AttributeError:
+            return None
+        return customer if customer.code else None
+
+    def _OrderRow(self, order):
+        attributes = order.attributes or {}
+        customer = self._OrderCustomer(order)
+        businessman = attributes.get('businessman')
+        if not businessman and customer is not None:
+            businessman = customer.businessman_code or None
+
+        if isinstance(order, Order):
+            total_amount = total_quantity = None
+            data = TiendaMobilModel.json_backend.dumps(order.AsDict())
+        else:
+            total_amount = float(attributes.get('total-amount') or 0)
+            total_quantity = int(attributes.get('total-quantity') or 0)
+            data = None
+
+        return (
+            str(order.id),
+            customer.code if customer is not None else None,
+            businessman,
+            attributes.get('price-list'),
+            attributes.get('comment'),
+            total_amount,
+            total_quantity,
+            data,
+        )
+
+    @staticmethod
+    def _CustomerRow(customer):
+        return (
+            customer.code,
+            customer.name,
+            customer.businessman_code or None,
+            customer.associate_code or None,
+            customer.AsJsonString(),
+        )
+
+    def MarkProcessed(self, order_ids, processed=True):
+        """Flags orders as processed, so pending queries skip them."""
+        with self._conn:
+            self._conn.executemany(
+                'UPDATE orders SET processed = ? WHERE id = ?',
+                [(int(processed), str(order_id)) for order_id in order_ids])
+
+    def Delete(self, order_ids):
+        """Removes orders and their items. Customers are kept."""
+        rows = [(str(order_id),) for order_id in order_ids]
+        with self._conn:
+            self._conn.executemany('DELETE FROM order_items WHERE order_id = ?', rows)
+            self._conn.executemany('DELETE FROM orders WHERE id = ?', rows)
+
+    def GetOrder(self, order_id):
+        """Returns the tienda_mobil.Order stored for order_id, or None if no
+        full order (as opposed to a preview) was stored for it."""
+        row = self._conn.execute(
+            'SELECT data FROM orders WHERE id = ?', (str(order_id),)).fetchone()
+        if row is None or row[0] is None:
+            return None
+        return Order.NewFromJsonDict(TiendaMobilModel.json_backend.loads(row[0]))
+
+    def GetCustomer(self, code):
+        """Returns the tienda_mobil.Customer stored for code, or None."""
+        row = self._conn.execute(
+            'SELECT data FROM customers WHERE code = ?', (str(code),)).fetchone()
+        if row is None:
+            return None
+        return Customer.NewFromJsonDict(TiendaMobilModel.json_backend.loads(row[0]))
+
+    def OrderIdsByCustomer(self, customer_code, pending_only=False):
+        """Returns the sorted ids of the orders placed by a customer."""
+        return self._Column(
+            'SELECT id FROM orders WHERE customer_code = ?' +
+            (' AND processed = 0' if pending_only else '') + ' ORDER BY id',
+            (str(customer_code),))
+
+    def OrderIdsByBusinessman(self, businessman_code, pending_only=False):
+        """Returns the sorted ids of the orders of a businessman."""
+        return self._Column(
+            'SELECT id FROM orders WHERE businessman = ?' +
+            (' AND processed = 0' if pending_only else '') + ' ORDER BY id',
+            (str(businessman_code),))
+
+    def OrderIdsByItem(self, item_code, pending_only=False):
+        """Returns the sorted ids of the orders including an item code."""
+        return self._Column(
+            'SELECT DISTINCT o.id FROM order_items i JOIN orders o ON o.id = i.order_id'
+            ' WHERE i.code = ?' +
+            (' AND o.processed = 0' if pending_only else '') + ' ORDER BY o.id',
+            (str(item_code),))
+
+    def OrderCountByCustomer(self, pending_only=True):
+        """Returns a dict mapping customer codes to their number of orders."""
+        return dict(self._conn.execute(
+            'SELECT customer_code, COUNT(*) FROM orders'
+            ' WHERE customer_code IS NOT NULL' +
+            (' AND processed = 0' if pending_only else '') +
+            ' GROUP BY customer_code'))
+
+    def PendingQuantityByItem(self):
+        """Returns a dict mapping item codes to the quantity ordered across
+        the pending orders."""
+        return dict(self._conn.execute(
+            'SELECT i.code, SUM(i.quantity) FROM order_items i'
+            ' JOIN orders o ON o.id = i.order_id'
+            ' WHERE o.processed = 0 GROUP BY i.code'))
+
+    def __len__(self):
+        return self._conn.execute('SELECT COUNT(*) FROM orders').fetchone()[0]
+
+    def _Column(self, query, params):
+        return [row[0] for row in self._conn.execute(query, params)]
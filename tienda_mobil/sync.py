@@ -0,0 +1,177 @@
+#!/usr/bin/env python
+
+import hashlib
+import json
+import logging
+import os
+import threading
+
+from tienda_mobil.error import TiendaMobilError
+
+logger = logging.getLogger(__name__)
+
+# Bumped whenever the layout of the state file changes
+_STATE_VERSION = 1
+
+# Python 2 has no os.replace; its os.rename only replaces an existing file
+# (atomically) on POSIX
+_replace = getattr(os, 'replace', os.rename)
+
+
+def _Fingerprint(preview):
+    """Returns a digest of an order preview's attributes, which changes
+    whenever any of them does."""
+    attributes = json.dumps(preview.get('attributes'), sort_keys=True)
+    return hashlib.sha1(attributes.encode('utf-8')).hexdigest()
+
+
+class OrderSync(object):
+    """Keeps a local view of the pending orders up to date, fetching the
+    details of new and changed orders only.
+
+    Each Sync() polls GetPendingOrders, compares every preview against the
+    fingerprint recorded for its id on the previous poll, and calls GetOrder
+    for the orders that are new or whose preview changed. The known
+    fingerprints are saved to state_file after every poll, so a restarted
+    process picks up where it left off.
+    """
+
+    def __init__(self, api, state_file=None, max_workers=8,
+                 on_added=None, on_changed=None, on_removed=None):
+        """Instantiate a new tienda_mobil.OrderSync object.
+
+        Args:
+          api (tienda_mobil.Api):
+            The client used to poll and fetch orders.
+          state_file (str, optional):
+            Path of the JSON file holding the known orders. If None the state
+            only lives in memory.
+          max_workers (int, optional):
+            Maximum number of GetOrder requests in flight at the same time.
+          on_added (callable, optional):
+            Called with the tienda_mobil.Order of every new order.
+          on_changed (callable, optional):
+            Called with the tienda_mobil.Order of every known order whose
+            preview changed.
+          on_removed (callable, optional):
+            Called with the id of every known order no longer pending.
+
+        An exception raised by a callback is logged and the order is left
+        unrecorded, so the event is delivered again on the next Sync().
+        """
+        self.api = api
+        self.state_file = state_file
+        self.max_workers = max_workers
+        self.on_added = on_added
+        self.on_changed = on_changed
+        self.on_removed = on_removed
+        self._lock = threading.RLock()
+        self._known = self._LoadState()
+
+    def Sync(self):
+        """Polls the pending orders once and fetches the new and changed
+        ones. The callbacks are called before an order is recorded: orders
+        whose details could not be fetched, or whose callback raised, are
+        not recorded, so they are reported again on the next call.
+
+        Returns:
+          A dict with four keys:
+            added: list of the tienda_mobil.Order of new orders.
+            changed: list of the tienda_mobil.Order of changed orders.
+            removed: list of the ids of orders no longer pending.
+            failed: dict mapping the order ids that could not be fetched to
+              the exception raised for them, usually a
+              tienda_mobil.TiendaMobilError (see Api.GetOrders).
+
+        Raises:
+            (tiendaMobil.TiendaMobilError): if the pending orders could not
+            be retrieved. The saved state is left untouched.
+        """
+        with self._lock:
+            previews = self.api.GetPendingOrders(return_json=True)
+
+            current = {}
+            for preview in previews:
+                current[str(preview['id'])] = _Fingerprint(preview)
+
+            stale = [order_id for order_id, fingerprint in current.items()
+                     if self._known.get(order_id) != fingerprint]
+            removed = [order_id for order_id in self._known
+                       if order_id not in current]
+
+            order_cache = self.api.order_cache
+            if order_cache is not None:
+                for order_id in stale:
+                    if order_id in self._known:
+                        order_cache.Invalidate(order_id)
+
+            orders, errors = self.api.GetOrders(stale, max_workers=self.max_workers)
+
+            report = {'added': [], 'changed': [], 'removed': removed, 'failed': errors}
+            for order_id, order in zip(stale, orders):
+                if order is None:
+                    continue
+                if order_id in self._known:
+                    report['changed'].append(order)
+                    callback = self.on_changed
+                else:
+                    report['added'].append(order)
+                    callback = self.on_added
+                if self._Deliver(callback, order, order_id):
+                    self._known[order_id] = current[order_id]
+            for order_id in removed:
+                if self._Deliver(self.on_removed, order_id, order_id):
+                    del self._known[order_id]
+
+            self._SaveState()
+
+        return report
+
+    def _Deliver(self, callback, event, order_id):
+        """Calls callback with event, returning whether it succeeded. A
+        failure is logged, and the caller leaves order_id unrecorded so the
+        event is delivered again on the next poll."""
+        if callback is None:
+            return True
+        try:
+            callback(event)
+        except Exception:
+            logger.exception('OrderSync callback failed for order %s', order_id)
+            return False
+        return True
+
+    def KnownOrderIds(self):
+        """Returns the ids of the orders seen pending on the last poll."""
+        with self._lock:
+            return sorted(self._known)
+
+    def Reset(self):
+        """Forgets every known order, so the next Sync() fetches them all
+        again."""
+        with self._lock:
+            self._known = {}
+            self._SaveState()
+
+    def _LoadState(self):
+        if self.state_file is None or not os.path.exists(self.state_file):
+            return {}
+        try:
+            with open(self.state_file) as f:
+                state = json.load(f)
+        except (IOError, OSError, ValueError) as e:
+            raise TiendaMobilError('Invalid sync state file {0}: {1}'.format(
+                self.state_file, e))
+        if state.get('version') != _STATE_VERSION:
+            # written by an incompatible release, start from scratch
+            return {}
+        return state.get('orders') or {}
+
+    def _SaveState(self):
+        """Writes the known orders to state_file, replacing it atomically so
+        a crash never leaves a truncated file behind."""
+        if self.state_file is None:
+            return
+        tmp_file = '{0}.tmp'.format(self.state_file)
+        with open(tmp_file, 'w') as f:
+            json.dump({'version': _STATE_VERSION, 'orders': self._known}, f)
+        _replace(tmp_file, self.state_file)
@@ -0,0 +1,132 @@
+# encoding: utf8
+
+"""The AsyncApi test cases. They use async syntax and
+unittest.IsolatedAsyncioTestCase, so test_async_api only imports them on
+Python 3.8 and above."""
+
+import asyncio
+import json
+import os
+import unittest
+
+import tienda_mobil
+from tienda_mobil import TiendaMobilError
+from tienda_mobil.async_api import aiohttp
+
+if aiohttp is not None:
+    from aiohttp import web
+    from aiohttp.test_utils import TestServer
+
+
+def readJSONFile(fname):
+    cwd = os.path.abspath(os.path.dirname(__file__))
+    with open(os.path.join(cwd, 'data', fname)) as f:
+        data = json.loads(f.read())
+    return data
+
+
+@unittest.skipIf(aiohttp is None, 'aiohttp is not installed')
+class AsyncApiTest(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.requests = []
+        self.user_agents = []
+        app = web.Application()
+        app.router.add_get('/api/orders/', self.pendingOrders)
+        app.router.add_get('/api/orders/{id}', self.order)
+        app.router.add_patch('/api/{resource}/{id}', self.update)
+        app.router.add_post('/api/{resource}', self.update)
+        self.server = TestServer(app)
+        await self.server.start_server()
+        self.base_url = str(self.server.make_url('/api'))
+        self.api = tienda_mobil.AsyncApi(self.base_url, 'test', max_concurrency=4)
+
+    async def asyncTearDown(self):
+        await self.api.Close()
+        await self.server.close()
+
+    async def pendingOrders(self, request):
+        self.requests.append(request.headers['authorization'])
+        self.user_agents.append(request.headers['User-Agent'])
+        return web.json_response(readJSONFile('pending_orders.json'))
+
+    async def order(self, request):
+        if request.match_info['id'] == '99999999':
+            return web.Response(status=400)
+        if request.match_info['id'] == 'garbage':
+            return web.Response(status=200, text='<html>')
+        await asyncio.sleep(0.01)
+        return web.json_response(readJSONFile('order.json'))
+
+    async def update(self, request):
+        body = await request.json()
+        if request.match_info['resource'] == 'invalid-resource':
+            return web.Response(status=404)
+        if not body:
+            return web.json_response(
+                {'errors': ['Order cannot be empty', 'Items cannot be empty']},
+                status=422)
+        return web.Response(status=200)
+
+    async def testGetPendingOrders(self):
+        resp = await self.api.GetPendingOrders()
+        self.assertEqual(3, len(resp))
+        self.assertIs(type(resp[0]), tienda_mobil.OrderPreview)
+        self.assertEqual(['Token token=test'], self.requests)
+
+        json_resp = await self.api.GetPendingOrders(return_json=True)
+        self.assertIs(type(json_resp), list)
+
+        raw_resp = await self.api.GetPendingOrders(return_raw=True)
+        self.assertIs(type(raw_resp), bytes)
+        self.assertEqual(json_resp, json.loads(raw_resp.decode('utf-8'))['data'])
+
+    async def testSetUserAgent(self):
+        await self.api.GetPendingOrders()
+        self.api.SetUserAgent('python-tiendamobil/test')
+        await self.api.GetPendingOrders()
+        self.assertEqual('python-tiendamobil/test', self.user_agents[-1])
+        self.assertNotEqual(self.user_agents[0], self.user_agents[-1])
+
+    async def testGetOrder(self):
+        resp = await self.api.GetOrder(6746749258)
+        self.assertIs(type(resp), tienda_mobil.Order)
+        self.assertEqual('6746749258', resp.id)
+
+        with self.assertRaisesRegex(TiendaMobilError, 'Bad Request'):
+            await self.api.GetOrder(99999999)
+
+        with self.assertRaisesRegex(TiendaMobilError, 'JSON parse error'):
+            await self.api.GetOrder('garbage')
+
+    async def testConcurrentGetOrder(self):
+        orders = await asyncio.gather(
+            *[self.api.GetOrder(i) for i in range(20)])
+        self.assertEqual(20, len(orders))
+        self.assertEqual(4, self.api._semaphore._value)
+
+    async def testUpdateResource(self):
+        self.assertTrue(await self.api.UpdateOrderStatus(123456))
+
+        with self.assertRaisesRegex(TiendaMobilError, 'Not Found for url'):
+            await self.api.UpdateResource('invalid-resource', 1, {'a': 1})
+
+        with self.assertRaisesRegex(TiendaMobilError, 'Errors: '):
+            await self.api.UpdateResource('orders', 1, {})
+
+    async def testCreateResource(self):
+        self.assertTrue(await self.api.CreateResource('orders', {'a': 1}))
+
+        with self.assertRaisesRegex(TiendaMobilError, 'Not Found for url'):
+            await self.api.CreateResource('invalid-resource', {'a': 1})
+
+        with self.assertRaisesRegex(TiendaMobilError, 'Errors: '):
+            await self.api.CreateResource('orders', {})
+
+    async def testConnectionError(self):
+        api = tienda_mobil.AsyncApi('http://127.0.0.1:1/api', 'test')
+        try:
+            with self.assertRaises(TiendaMobilError):
+                await api.GetPendingOrders()
+        finally:
+            await api.Close()
@@ -1,3 +1,4 @@
+import json
 import re
 import unittest
 import responses
@@ -8,7 +9,6 @@ DEFAULT_URL = re.compile(r'https?://tiendamobil\.com\.ar/api/.*')
 
 def readJSONFile(fname):
     import os
-    import json
     cwd = os.path.abspath(os.path.dirname(__file__))
     with open(os.path.join(cwd, 'data', fname)) as f:
         data = json.loads(f.read())
@@ -33,6 +33,28 @@ class ApiTest(unittest.TestCase):
         self.api.SetUserAgent(new)
         self.assertEqual(new, self.api._request_headers['User-Agent'])
 
+    def testConnectionPool(self):
+        api = tienda_mobil.Api(base_url=self.base_url, api_key='test',
+                               pool_connections=2, pool_maxsize=20)
+        adapter = api._session.get_adapter(self.base_url)
+        self.assertEqual(adapter._pool_connections, 2)
+        self.assertEqual(adapter._pool_maxsize, 20)
+        self.assertNotIn('Connection', api._request_headers)
+
+        api = tienda_mobil.Api(base_url=self.base_url, api_key='test',
+                               keep_alive=False)
+        self.assertEqual(api._request_headers['Connection'], 'close')
+
+    @responses.activate
+    def testContextManager(self):
+        responses.add(responses.GET, DEFAULT_URL, json={}, status=200)
+        with tienda_mobil.Api(base_url=self.base_url, api_key='test') as api:
+            self.assertEqual(api.GetPendingOrders(), [])
+            adapter = api._session.get_adapter(self.base_url)
+            adapter.poolmanager.connection_from_url(self.base_url)
+            self.assertEqual(len(adapter.poolmanager.pools), 1)
+        self.assertEqual(len(adapter.poolmanager.pools), 0)
+
     @responses.activate
     def testGetPendingOrders(self):
         json_data = readJSONFile('pending_orders.json')
@@ -49,6 +71,84 @@ class ApiTest(unittest.TestCase):
         self.assertIs(type(resp), list)
         self.assertEqual(0, len(resp))
 
+    @responses.activate
+    def testGetPendingOrdersStream(self):
+        json_data = readJSONFile('pending_orders.json')
+        responses.add(responses.GET, DEFAULT_URL, json=json_data, status=200)
+
+        resp = self.api.GetPendingOrders(stream=True)
+        self.assertNotIsInstance(resp, list)
+        self.assertEqual([x.id for x in self.api.GetPendingOrders()],
+                         [x.id for x in resp])
+        self.assertEqual(json_data['data'],
+                         list(self.api.GetPendingOrders(return_json=True, stream=True)))
+
+        responses.replace(responses.GET, DEFAULT_URL, json={'data': []}, status=200)
+        self.assertEqual([], list(self.api.GetPendingOrders(stream=True)))
+
+        responses.replace(responses.GET, DEFAULT_URL,
+                          json={'errors': ['Invalid token']}, status=200)
+        with self.assertRaisesRegexp(TiendaMobilError, 'Invalid token'):
+            list(self.api.GetPendingOrders(stream=True))
+
+        responses.replace(responses.GET, DEFAULT_URL,
+                          body='{"data": [{"id": "1"}, <html>', status=200)
+        resp = self.api.GetPendingOrders(stream=True)
+        self.assertEqual('1', next(resp).id)
+        with self.assertRaisesRegexp(TiendaMobilError, 'JSON parse error'):
+            next(resp)
+
+        # errors after the data array are raised once the data is consumed
+        responses.replace(responses.GET, DEFAULT_URL, status=200,
+                          json={'data': [{'id': '1'}], 'errors': ['Timeout']})
+        resp = self.api.GetPendingOrders(stream=True)
+        self.assertEqual('1', next(resp).id)
+        with self.assertRaisesRegexp(TiendaMobilError, 'Timeout'):
+            next(resp)
+
+        # nothing is requested until iteration starts
+        responses.replace(responses.GET, DEFAULT_URL, status=502)
+        responses.calls.reset()
+        resp = self.api.GetPendingOrders(stream=True)
+        self.assertEqual(0, len(responses.calls))
+        with self.assertRaisesRegexp(TiendaMobilError, 'Bad Gateway'):
+            next(resp)
+
+    @responses.activate
+    def testIterPendingOrders(self):
+        json_data = readJSONFile('pending_orders.json')
+        first_page = {
+            'data': json_data['data'][:2],
+            'links': {'next': '/api/orders/?page%5Bnumber%5D=2&page%5Bsize%5D=2'}
+        }
+        last_page = {'data': json_data['data'][2:], 'links': {'next': None}}
+        url = '{0}/orders/'.format(self.base_url)
+
+        for prefetch in (True, False):
+            responses.reset()
+            responses.add(responses.GET, url, json=first_page, status=200,
+                match=[responses.matchers.query_param_matcher(
+                    {'page[number]': '1', 'page[size]': '2'})])
+            responses.add(responses.GET, url, json=last_page, status=200,
+                match=[responses.matchers.query_param_matcher(
+                    {'page[number]': '2', 'page[size]': '2'})])
+
+            orders = self.api.IterPendingOrders(page_size=2, prefetch=prefetch)
+            self.assertIs(type(next(orders)), tienda_mobil.OrderPreview)
+            self.assertEqual(['20492', '20493'], [x.id for x in orders])
+            self.assertEqual(2, len(responses.calls))
+
+        # unpaginated response
+        responses.reset()
+        responses.add(responses.GET, DEFAULT_URL, json=json_data, status=200)
+        self.assertEqual(3, len(list(self.api.IterPendingOrders())))
+
+        # errors are raised while iterating
+        responses.reset()
+        responses.add(responses.GET, DEFAULT_URL, json={'error': 'oops'})
+        with self.assertRaisesRegexp(TiendaMobilError, 'oops'):
+            list(self.api.IterPendingOrders())
+
     @responses.activate
     def testGetOrder(self):
         json_data = readJSONFile('order.json')
@@ -78,6 +178,111 @@ class ApiTest(unittest.TestCase):
             resp = self.api.GetOrder(99999999)
         self.assertRegexpMatches(cm.exception.message, 'Bad Request')
 
+    @responses.activate
+    def testGetOrderCache(self):
+        json_data = readJSONFile('order.json')
+        order_id = json_data['data']['id']
+        url = '{0}/orders/{1}'.format(self.base_url, order_id)
+        responses.add(responses.GET, url, json=json_data, status=200)
+        responses.add(responses.PATCH, DEFAULT_URL, status=200)
+
+        api = tienda_mobil.Api(base_url=self.base_url, api_key='test',
+                               order_cache=tienda_mobil.OrderCache())
+        self.assertEqual(order_id, api.GetOrder(order_id).id)
+        self.assertEqual(order_id, api.GetOrder(int(order_id)).id)
+        self.assertEqual(order_id, api.GetOrder(order_id, return_json=True)['id'])
+        self.assertEqual(1, len(responses.calls))
+        self.assertEqual(2, api.order_cache.hits)
+        self.assertEqual(1, api.order_cache.misses)
+
+        # updates invalidate the cached order
+        api.UpdateOrderStatus(order_id)
+        api.GetOrder(order_id)
+        self.assertEqual(3, len(responses.calls))
+
+        api.UpdateResource('customers', order_id, {})
+        api.GetOrder(order_id)
+        self.assertEqual(4, len(responses.calls))
+
+        # callers changing an order do not change the cached one
+        api.GetOrder(order_id).attributes['comment'] = 'changed'
+        api.GetOrder(order_id, return_json=True)['attributes']['comment'] = 'changed'
+        self.assertNotEqual('changed', api.GetOrder(order_id).attributes['comment'])
+        self.assertEqual(4, len(responses.calls))
+
+    @responses.activate
+    def testGetOrderCacheConcurrentUpdate(self):
+        json_data = readJSONFile('order.json')
+        order_id = json_data['data']['id']
+        api = tienda_mobil.Api(base_url=self.base_url, api_key='test',
+                               order_cache=tienda_mobil.OrderCache())
+
+        def update_while_reading(request):
+            # an update of the order completes before this response arrives
+            api.order_cache.Invalidate(order_id)
+            return 200, {}, json.dumps(json_data)
+
+        responses.add_callback(
+            responses.GET, '{0}/orders/{1}'.format(self.base_url, order_id),
+            callback=update_while_reading)
+        api.GetOrder(order_id)
+        self.assertIsNone(api.order_cache.Get(order_id))
+
+    @responses.activate
+    def testGetOrders(self):
+        json_data = readJSONFile('order.json')
+        order_id = json_data['data']['id']
+
+        responses.add(
+            responses.GET,
+            '{0}/orders/{1}'.format(self.base_url, order_id),
+            json=json_data,
+            status=200)
+        responses.add(
+            responses.GET,
+            '{0}/orders/99999999'.format(self.base_url),
+            status=400)
+
+        order_ids = [order_id, 99999999, order_id]
+        orders, errors = self.api.GetOrders(order_ids, max_workers=2)
+        self.assertEqual(3, len(orders))
+        self.assertIs(type(orders[0]), tienda_mobil.Order)
+        self.assertEqual(order_id, orders[0].id)
+        self.assertIsNone(orders[1])
+        self.assertEqual(order_id, orders[2].id)
+        self.assertEqual([99999999], list(errors))
+        self.assertRegexpMatches(errors[99999999].message, 'Bad Request')
+
+        # test raw json response
+        orders, errors = self.api.GetOrders([order_id], return_json=True)
+        self.assertIs(type(orders[0]), dict)
+        self.assertEqual({}, errors)
+
+        # empty batch
+        self.assertEqual(([], {}), self.api.GetOrders([]))
+
+        # ids given as a generator
+        orders, errors = self.api.GetOrders(x for x in [order_id, 99999999])
+        self.assertEqual(order_id, orders[0].id)
+        self.assertIsNone(orders[1])
+        self.assertEqual([99999999], list(errors))
+
+    @responses.activate
+    def testGetOrdersUnexpectedErrors(self):
+        responses.add(responses.GET, DEFAULT_URL, json=readJSONFile('order.json'),
+                      status=200)
+
+        class BrokenOrderBook(object):
+            def Add(self, data):
+                raise ValueError('broken')
+
+        api = tienda_mobil.Api(base_url=self.base_url, api_key='test',
+                               order_book=BrokenOrderBook())
+        orders, errors = api.GetOrders([1, 2])
+        self.assertEqual([None, None], orders)
+        self.assertEqual([1, 2], sorted(errors))
+        self.assertIsInstance(errors[1], ValueError)
+
     @responses.activate
     def testUpdateOrderStatus(self):
         responses.add(responses.PATCH, DEFAULT_URL, status=200)
@@ -93,6 +298,29 @@ class ApiTest(unittest.TestCase):
         with self.assertRaisesRegexp(TiendaMobilError, 'some error'):
             self.api.UpdateOrderStatus(123456)
 
+    @responses.activate
+    def testUpdateOrderStatuses(self):
+        url = '{0}/orders/{{0}}'.format(self.base_url)
+        responses.add(responses.PATCH, url.format(1), status=200)
+        responses.add(responses.PATCH, url.format(2), status=422,
+            json={'errors': ['Order already processed']})
+        responses.add(responses.PATCH, url.format(3), status=502)
+        responses.add(responses.PATCH, url.format(4), status=200)
+
+        report = self.api.UpdateOrderStatuses([1, 2, 3, 4, 5], max_concurrency=3)
+        self.assertEqual([1, 4], report['updated'])
+        self.assertEqual([2], list(report['invalid']))
+        self.assertIsInstance(report['invalid'][2],
+                              tienda_mobil.TiendaMobilValidationError)
+        self.assertRegexpMatches(report['invalid'][2].message, 'already processed')
+        self.assertEqual([3, 5], sorted(report['failed']))
+        self.assertRegexpMatches(report['failed'][3].message, 'Bad Gateway')
+        self.assertRegexpMatches(report['failed'][5].message, 'Connection refused')
+
+        # ids given as a generator
+        report = self.api.UpdateOrderStatuses(x for x in [1, 4])
+        self.assertEqual([1, 4], report['updated'])
+
     @responses.activate
     def testUpdateResource(self):
         responses.add(responses.PATCH, DEFAULT_URL, status=200)
@@ -121,6 +349,100 @@ class ApiTest(unittest.TestCase):
         with self.assertRaisesRegexp(TiendaMobilError, 'Errors: '):
             self.api.UpdateResource('orders', 1, {})
 
+    @responses.activate
+    def testCreateResources(self):
+        def create(request):
+            name = json.loads(request.body)['customer']['name']
+            if not name:
+                return 422, {}, json.dumps({'errors': ['Name cannot be empty']})
+            if name == 'down':
+                return 502, {}, ''
+            return 200, {}, ''
+
+        responses.add_callback(
+            responses.POST, '{0}/customers'.format(self.base_url), callback=create)
+
+        records = [{'customer': {'name': name}}
+                   for name in ('foo', '', 'bar', 'down', 'baz')]
+        created, errors = self.api.CreateResources('customers', records,
+                                                   max_concurrency=3)
+        self.assertEqual([True, False, True, False, True], created)
+        self.assertEqual([1, 3], sorted(errors))
+        self.assertIsInstance(errors[1], tienda_mobil.TiendaMobilValidationError)
+        self.assertRegexpMatches(errors[1].message, 'cannot be empty')
+        self.assertRegexpMatches(errors[3].message, 'Bad Gateway')
+
+        # empty batch
+        self.assertEqual(([], {}), self.api.CreateResources('customers', []))
+
+    @responses.activate
+    def testJsonBackend(self):
+        json_data = readJSONFile('order.json')
+        responses.add(responses.GET, DEFAULT_URL, json=json_data, status=200)
+        responses.add(responses.PATCH, DEFAULT_URL, status=200)
+
+        for name in tienda_mobil.jsonlib.AvailableBackends():
+            api = tienda_mobil.Api(base_url=self.base_url, api_key='test',
+                                   json_backend=name)
+            self.assertEqual(name, api.json_backend.name)
+            self.assertEqual(json_data['data'], api.GetOrder(1, return_json=True))
+
+            responses.calls.reset()
+            api.UpdateOrderStatus(1)
+            request = responses.calls[0].request
+            self.assertEqual('application/json', request.headers['Content-Type'])
+            self.assertEqual({'order': {'processed': True}}, json.loads(request.body))
+
+        with self.assertRaises(ValueError):
+            tienda_mobil.Api(base_url=self.base_url, api_key='test',
+                             json_backend='unknown')
+
+    @responses.activate
+    def testResponseCharset(self):
+        document = {'data': {'id': '1', 'type': 'orders',
+                             'attributes': {'comment': u'Caja ñandú'}}}
+        for charset in ('latin-1', 'utf-16', 'utf-8'):
+            responses.reset()
+            responses.add(
+                responses.GET, DEFAULT_URL, status=200,
+                body=json.dumps(document, ensure_ascii=False).encode(charset),
+                content_type='application/json; charset={0}'.format(charset))
+            for name in tienda_mobil.jsonlib.AvailableBackends():
+                api = tienda_mobil.Api(base_url=self.base_url, api_key='test',
+                                       json_backend=name)
+                self.assertEqual(document['data'], api.GetOrder(1, return_json=True))
+
+    @responses.activate
+    def testCustomerRegistry(self):
+        json_data = readJSONFile('order.json')
+        responses.add(responses.GET, DEFAULT_URL, json=json_data, status=200)
+        registry = tienda_mobil.CustomerRegistry()
+        api = tienda_mobil.Api(base_url=self.base_url, api_key='test',
+                               customer_registry=registry)
+
+        first = api.GetOrder(1)
+        second = api.GetOrder(2)
+        self.assertIs(first.customer, second.customer)
+        self.assertEqual(1, len(registry))
+
+        # other instances are not affected
+        self.assertIsNot(first.customer, self.api.GetOrder(1).customer)
+        self.assertEqual(1, len(registry))
+
+    @responses.activate
+    def testReturnRaw(self):
+        body = b'{"data": {"id": "1", "type": "orders"}}'
+        responses.add(responses.GET, DEFAULT_URL, body=body, status=200)
+
+        self.assertEqual(body, self.api.GetOrder(1, return_raw=True))
+        self.assertEqual(body, self.api.GetPendingOrders(return_raw=True))
+        self.assertEqual(body, b''.join(
+            self.api.GetPendingOrders(stream=True, return_raw=True)))
+
+        responses.replace(responses.GET, DEFAULT_URL, status=502)
+        with self.assertRaisesRegexp(TiendaMobilError, 'Bad Gateway'):
+            self.api.GetOrder(1, return_raw=True)
+
     @responses.activate
     def testCreateResource(self):
         responses.add(responses.POST, DEFAULT_URL, status=200)
@@ -0,0 +1,6 @@
+# encoding: utf8
+
+import sys
+
+if sys.version_info >= (3, 8):
+    from tienda_mobil.tests.async_api_cases import AsyncApiTest  # noqa
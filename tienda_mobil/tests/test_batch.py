@@ -0,0 +1,79 @@
+import os
+import json
+import unittest
+from tienda_mobil import OrderPreview, OrderPreviewBatch
+from tienda_mobil import batch
+
+def loadJSON(fname):
+    cwd = os.path.abspath(os.path.dirname(__file__))
+    with open(os.path.join(cwd, 'data', fname), 'rb') as f:
+        data = json.loads(f.read())
+    return data
+
+
+class OrderPreviewBatchTest(unittest.TestCase):
+
+    PENDING_ORDERS = loadJSON('pending_orders.json')['data']
+    use_numpy = False
+
+    def setUp(self):
+        self.batch = OrderPreviewBatch.NewFromJsonList(
+            self.PENDING_ORDERS, use_numpy=self.use_numpy)
+        self.previews = [OrderPreview.NewFromJsonDict(x)
+                         for x in self.PENDING_ORDERS]
+
+    def testColumns(self):
+        self.assertEqual(len(self.previews), len(self.batch))
+        self.assertEqual([p.id for p in self.previews], self.batch.ids)
+        self.assertEqual([p.totalAmount for p in self.previews],
+                         list(self.batch.Column('total_amount')))
+        self.assertEqual([p.priceList for p in self.previews],
+                         self.batch.Column('price_list'))
+        self.assertEqual([p.customer.code for p in self.previews],
+                         self.batch.Column('customer'))
+
+    def testSum(self):
+        self.assertAlmostEqual(sum(p.totalAmount for p in self.previews),
+                               self.batch.Sum())
+        self.assertEqual(sum(p.totalQuantity for p in self.previews),
+                         self.batch.Sum('total_quantity'))
+        with self.assertRaises(ValueError):
+            self.batch.Sum('businessman')
+
+    def testGroupBy(self):
+        amounts = {}
+        quantities = {}
+        counts = {}
+        for p in self.previews:
+            amounts[p.businessman] = amounts.get(p.businessman, 0) + p.totalAmount
+            quantities[p.businessman] = quantities.get(p.businessman, 0) + p.totalQuantity
+            counts[p.businessman] = counts.get(p.businessman, 0) + 1
+
+        result = self.batch.GroupBy('businessman')
+        self.assertEqual(sorted(amounts), sorted(result))
+        for key, total in amounts.items():
+            self.assertAlmostEqual(total, result[key])
+        self.assertEqual(quantities, self.batch.GroupBy('businessman', 'total_quantity'))
+        self.assertEqual(counts, self.batch.Count('businessman'))
+
+    def testFilter(self):
+        businessman = self.previews[0].businessman
+        filtered = self.batch.Filter(businessman=businessman)
+        self.assertEqual([p.id for p in self.previews if p.businessman == businessman],
+                         filtered.ids)
+        self.assertEqual({businessman: len(filtered)}, filtered.Count('businessman'))
+
+        mask = [amount > 500 for amount in self.batch.Column('total_amount')]
+        self.assertEqual([p.id for p in self.previews if p.totalAmount > 500],
+                         self.batch.Filter(mask).ids)
+
+        self.assertEqual(0, len(self.batch.Filter(customer='unknown')))
+        self.assertEqual({}, self.batch.Filter(customer='unknown').GroupBy('customer'))
+        with self.assertRaises(ValueError):
+            self.batch.Filter(comment='')
+
+
+@unittest.skipIf(batch.numpy is None, 'numpy is not installed')
+class NumpyOrderPreviewBatchTest(OrderPreviewBatchTest):
+
+    use_numpy = True
@@ -0,0 +1,75 @@
+import os
+import json
+import unittest
+import tienda_mobil
+
+def loadJSON(fname):
+    cwd = os.path.abspath(os.path.dirname(__file__))
+    with open(os.path.join(cwd, 'data', fname), 'rb') as f:
+        data = json.loads(f.read())
+    return data
+
+
+class HydrateModelsTest(unittest.TestCase):
+
+    PENDING_ORDERS = loadJSON('pending_orders.json')['data']
+    ORDER = loadJSON('order.json')['data']
+
+    def setUp(self):
+        self.orders = [dict(self.ORDER, id=str(i)) for i in range(25)]
+        self.lines = [json.dumps(x) for x in self.orders]
+
+    def testSerial(self):
+        previews = tienda_mobil.HydrateModels(
+            self.PENDING_ORDERS, tienda_mobil.OrderPreview, workers=0)
+        self.assertEqual([tienda_mobil.OrderPreview.NewFromJsonDict(x)
+                          for x in self.PENDING_ORDERS], previews)
+
+        # text lines, unicode on Python 2
+        lines = [json.dumps(x).encode('utf-8').decode('utf-8') for x in self.orders]
+        self.assertEqual([tienda_mobil.Order.NewFromJsonDict(x) for x in self.orders],
+                         tienda_mobil.HydrateModels(lines, workers=0))
+
+    def testProcessPool(self):
+        expected = [tienda_mobil.Order.NewFromJsonDict(x) for x in self.orders]
+        self.assertEqual(expected, tienda_mobil.HydrateModels(
+            self.lines, workers=2, chunk_size=4))
+        self.assertEqual(expected, tienda_mobil.HydrateModels(
+            [line.encode('utf-8') for line in self.lines], workers=2,
+            chunk_size=4, json_backend='json'))
+
+        orders = tienda_mobil.HydrateModels(self.orders, workers=2, nested=True)
+        self.assertEqual('24624348', orders[0]._customer.code)
+        self.assertEqual(2, len(orders[0]._items))
+
+    def testCustomerRegistry(self):
+        registry = tienda_mobil.CustomerRegistry()
+        orders = tienda_mobil.HydrateModels(self.orders, workers=2, nested=True,
+                                            customer_registry=registry)
+        self.assertEqual(25, len(orders))
+        self.assertEqual('24624348', orders[0].customer.code)
+        self.assertIs(orders[0].customer, orders[-1].customer)
+
+        orders = tienda_mobil.HydrateModels(self.lines, workers=2,
+                                            customer_registry=registry)
+        self.assertIs(orders[0].customer, orders[-1].customer)
+        self.assertEqual(1, len(registry))
+
+        no_customer = {'id': '1', 'type': 'orders', 'attributes': {}}
+        orders = tienda_mobil.HydrateModels([no_customer], workers=0, nested=True,
+                                            customer_registry=registry)
+        self.assertFalse(hasattr(orders[0], 'customer'))
+
+        with self.assertRaises(ValueError):
+            tienda_mobil.HydrateModels([], model=tienda_mobil.Customer,
+                                       customer_registry=registry)
+
+    def testUnordered(self):
+        orders = tienda_mobil.IterHydrateModels(
+            self.lines, workers=2, chunk_size=3, ordered=False)
+        self.assertEqual(sorted(x['id'] for x in self.orders),
+                         sorted(o.id for o in orders))
+
+    def testInvalidLine(self):
+        with self.assertRaises(ValueError):
+            tienda_mobil.HydrateModels(self.lines + ['{bad'], workers=2)
@@ -0,0 +1,114 @@
+import threading
+import unittest
+from tienda_mobil import OrderCache
+
+
+class FakeClock(object):
+
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+
+class OrderCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.cache = OrderCache(max_entries=2, ttl=10, clock=self.clock)
+
+    def testGetSet(self):
+        self.assertIsNone(self.cache.Get(1))
+        self.cache.Set(1, {'id': '1'})
+        self.assertEqual({'id': '1'}, self.cache.Get(1))
+        self.assertEqual({'id': '1'}, self.cache.Get('1'))
+        self.assertEqual({'hits': 2, 'misses': 1, 'evictions': 0, 'size': 1},
+                         self.cache.Stats())
+
+    def testExpiration(self):
+        self.cache.Set(1, {'id': '1'})
+        self.clock.now = 9
+        self.assertIsNotNone(self.cache.Get(1))
+        self.clock.now = 10
+        self.assertIsNone(self.cache.Get(1))
+        self.assertEqual(0, len(self.cache))
+
+        cache = OrderCache(ttl=None, clock=self.clock)
+        cache.Set(1, {'id': '1'})
+        self.clock.now = 10 ** 9
+        self.assertIsNotNone(cache.Get(1))
+
+    def testLeastRecentlyUsedEviction(self):
+        self.cache.Set(1, {'id': '1'})
+        self.cache.Set(2, {'id': '2'})
+        self.cache.Get(1)
+        self.cache.Set(3, {'id': '3'})
+        self.assertIsNone(self.cache.Get(2))
+        self.assertIsNotNone(self.cache.Get(1))
+        self.assertIsNotNone(self.cache.Get(3))
+        self.assertEqual(1, self.cache.Stats()['evictions'])
+
+    def testInvalidate(self):
+        self.cache.Set(1, {'id': '1'})
+        self.cache.Invalidate('1')
+        self.cache.Invalidate(2)
+        self.assertIsNone(self.cache.Get(1))
+
+        self.cache.Set(1, {'id': '1'})
+        self.cache.Clear()
+        self.assertEqual(0, len(self.cache))
+
+    def testCopies(self):
+        order = {'id': '1', 'attributes': {'comment': ''}}
+        self.cache.Set(1, order)
+        order['attributes']['comment'] = 'changed'
+        cached = self.cache.Get(1)
+        self.assertEqual('', cached['attributes']['comment'])
+        cached['attributes']['comment'] = 'changed'
+        self.assertEqual('', self.cache.Get(1)['attributes']['comment'])
+
+    def testGeneration(self):
+        generation = self.cache.Generation()
+        self.cache.Invalidate(1)
+        # a read started before the invalidation is stale
+        self.cache.Set(1, {'id': '1'}, generation)
+        self.assertIsNone(self.cache.Get(1))
+        # other keys are not affected
+        self.cache.Set(2, {'id': '2'}, generation)
+        self.assertIsNotNone(self.cache.Get(2))
+
+        generation = self.cache.Generation()
+        self.cache.Set(1, {'id': '1'}, generation)
+        self.assertIsNotNone(self.cache.Get(1))
+
+        # once the invalidation of a key is forgotten, older reads of any
+        # key are dropped
+        generation = self.cache.Generation()
+        for key in (3, 4, 5):
+            self.cache.Invalidate(key)
+        self.cache.Set(6, {'id': '6'}, generation)
+        self.assertIsNone(self.cache.Get(6))
+
+        generation = self.cache.Generation()
+        self.cache.Clear()
+        self.cache.Set(7, {'id': '7'}, generation)
+        self.assertIsNone(self.cache.Get(7))
+
+    def testThreadSafety(self):
+        cache = OrderCache(max_entries=50)
+
+        def worker(offset):
+            for i in range(1000):
+                cache.Set(offset + i % 100, i)
+                cache.Get(offset + i % 100)
+
+        threads = [threading.Thread(target=worker, args=(n * 100,))
+                   for n in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(50, len(cache))
+        self.assertEqual(8000, cache.hits + cache.misses)
@@ -6,7 +6,7 @@ import re
 import unittest
 import responses
 import tienda_mobil
-from tienda_mobil import TiendaMobilError
+from tienda_mobil import TiendaMobilError, TiendaMobilValidationError
 
 DEFAULT_URL = re.compile(r'https?://tiendamobil\.com\.ar/api/.*')
 
@@ -83,6 +83,14 @@ class ApiTest(unittest.TestCase):
         with self.assertRaisesRegexp(TiendaMobilError, 'cannot be empty'):
             self.api.CreateResource('orders', {})
 
+    @responses.activate
+    def testValidationError(self):
+        responses.add(responses.PATCH, DEFAULT_URL, status=422,
+            json={'error': 'Customer cannot be empty'})
+        with self.assertRaisesRegexp(TiendaMobilValidationError, 'cannot be empty'):
+            self.api.UpdateResource('orders', 99999, {})
+        self.assertTrue(issubclass(TiendaMobilValidationError, TiendaMobilError))
+
     @responses.activate
     def testJSONParsingError(self):
         responses.add(responses.GET, DEFAULT_URL, status=200, body='')
@@ -108,3 +116,86 @@ class ApiTest(unittest.TestCase):
             self.api.UpdateResource('orders', 99999, {})
         self.assertRegexpMatches(cm.exception.message, 'ó ú ü')
 
+    @responses.activate
+    def testRetries(self):
+        api = tienda_mobil.Api(base_url=self.base_url, api_key='test',
+                               max_retries=2, retry_backoff=0)
+
+        # transient errors on idempotent requests
+        responses.add(responses.GET, DEFAULT_URL, status=503)
+        responses.add(responses.GET, DEFAULT_URL, status=502)
+        responses.add(responses.GET, DEFAULT_URL, json={}, status=200)
+        self.assertEqual([], api.GetPendingOrders())
+        self.assertEqual(3, len(responses.calls))
+
+        # retries are exhausted
+        responses.reset()
+        responses.add(responses.GET, DEFAULT_URL, status=502)
+        with self.assertRaisesRegexp(TiendaMobilError, 'Bad Gateway'):
+            api.GetPendingOrders()
+        self.assertEqual(3, len(responses.calls))
+
+        # non idempotent requests are not retried on server errors
+        responses.reset()
+        responses.add(responses.PATCH, DEFAULT_URL, status=502)
+        with self.assertRaisesRegexp(TiendaMobilError, 'Bad Gateway'):
+            api.UpdateOrderStatus(99999)
+        self.assertEqual(1, len(responses.calls))
+
+        # ... but are retried when throttled
+        responses.reset()
+        responses.add(responses.POST, DEFAULT_URL, status=429,
+                      headers={'Retry-After': '0'})
+        responses.add(responses.POST, DEFAULT_URL, status=200)
+        self.assertTrue(api.CreateResource('orders', {}))
+        self.assertEqual(2, len(responses.calls))
+
+    @responses.activate
+    def testRetryAfterTooLong(self):
+        api = tienda_mobil.Api(base_url=self.base_url, api_key='test',
+                               max_retries=2, retry_backoff=0)
+        responses.add(responses.GET, DEFAULT_URL, status=429,
+                      headers={'Retry-After': '86400'})
+        with self.assertRaisesRegexp(TiendaMobilError, 'Too Many Requests'):
+            api.GetPendingOrders()
+        self.assertEqual(1, len(responses.calls))
+
+    @responses.activate
+    def testRetryConnectionError(self):
+        api = tienda_mobil.Api(base_url=self.base_url, api_key='test',
+                               max_retries=2, retry_backoff=0)
+        with self.assertRaisesRegexp(TiendaMobilError, 'Connection refused'):
+            api.GetPendingOrders()
+        self.assertEqual(3, len(responses.calls))
+
+    @responses.activate
+    def testTooManyRequestsWithoutRetries(self):
+        responses.add(responses.GET, DEFAULT_URL, status=429)
+        with self.assertRaisesRegexp(TiendaMobilError, 'Too Many Requests'):
+            self.api.GetPendingOrders()
+
+    @responses.activate
+    def testRateLimitHeadersIgnoredByDefault(self):
+        def sleep(seconds):
+            self.fail('a default Api should not wait')
+        self.api.rate_limit._sleep = sleep
+
+        responses.add(responses.GET, DEFAULT_URL, status=429,
+                      headers={'Retry-After': '60'})
+        with self.assertRaisesRegexp(TiendaMobilError, 'Too Many Requests'):
+            self.api.GetPendingOrders()
+        responses.replace(responses.GET, DEFAULT_URL, json={}, status=200,
+                          headers={'X-RateLimit-Remaining': '0',
+                                   'X-RateLimit-Reset': '60'})
+        self.assertEqual([], self.api.GetPendingOrders())
+        self.assertEqual([], self.api.GetPendingOrders())
+
+    @responses.activate
+    def testRetryAfterTooLongDoesNotPause(self):
+        api = tienda_mobil.Api(base_url=self.base_url, api_key='test',
+                               rate_limit=100)
+        responses.add(responses.GET, DEFAULT_URL, status=429,
+                      headers={'Retry-After': '86400'})
+        with self.assertRaisesRegexp(TiendaMobilError, 'Too Many Requests'):
+            api.GetPendingOrders()
+        self.assertEqual(0, api.rate_limit._paused_until)
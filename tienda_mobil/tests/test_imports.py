@@ -0,0 +1,36 @@
+import os
+import subprocess
+import sys
+import unittest
+import tienda_mobil
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class LazyImportsTest(unittest.TestCase):
+
+    def loadedModules(self, statement):
+        code = '{0}\nimport sys\nprint(" ".join(sys.modules))'.format(statement)
+        output = subprocess.check_output([sys.executable, '-c', code], cwd=ROOT)
+        return set(output.decode('utf-8').split())
+
+    def testModelsOnly(self):
+        for statement in ('import tienda_mobil', 'from tienda_mobil import Order'):
+            modules = self.loadedModules(statement)
+            self.assertIn('tienda_mobil.models', modules)
+            self.assertNotIn('tienda_mobil.api', modules)
+            self.assertNotIn('requests', modules)
+
+    def testLazyAttributes(self):
+        from tienda_mobil.cache import OrderCache
+        self.assertIs(OrderCache, tienda_mobil.OrderCache)
+        self.assertIn('Api', dir(tienda_mobil))
+        with self.assertRaises(AttributeError):
+            tienda_mobil.Unknown
+
+    def testStarImport(self):
+        namespace = {}
+        exec('from tienda_mobil import *', namespace)
+        self.assertIs(tienda_mobil.Api, namespace['Api'])
+        self.assertIs(tienda_mobil.Order, namespace['Order'])
+        self.assertNotIn('sys', namespace)
@@ -0,0 +1,43 @@
+# encoding: utf8
+
+from __future__ import unicode_literals
+
+import json
+import unittest
+from tienda_mobil.jsonlib import IterDocument
+
+
+def chunked(data, size):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+class IterDocumentTest(unittest.TestCase):
+
+    DOCUMENT = {
+        'meta': {'count': 123456},
+        'data': [{'id': str(i), 'name': 'ñandú ' * i} for i in range(20)],
+        'links': {'next': None},
+    }
+
+    def testChunks(self):
+        data = json.dumps(self.DOCUMENT).encode('utf-8')
+        expected = ([('meta', self.DOCUMENT['meta'])] +
+                    [('data', x) for x in self.DOCUMENT['data']] +
+                    [('links', self.DOCUMENT['links'])])
+        for size in (1, 2, 7, 64, len(data)):
+            self.assertEqual(expected, list(IterDocument(chunked(data, size))))
+
+    def testTrailingNumber(self):
+        self.assertEqual([('total', 123456)],
+                         list(IterDocument(chunked(b'{"total": 123456}', 3))))
+
+    def testEmpty(self):
+        self.assertEqual([], list(IterDocument([b'{}'])))
+        self.assertEqual([], list(IterDocument([b'{"data": [ ]}'])))
+        self.assertEqual([('data', {'id': '1'})],
+                         list(IterDocument([b'{"data": {"id": "1"}}'])))
+
+    def testInvalid(self):
+        for data in (b'', b'<html>', b'[]', b'{"data": [1,', b'{"data": [1 2]}'):
+            with self.assertRaises(ValueError):
+                list(IterDocument([data]))
@@ -0,0 +1,96 @@
+# encoding: utf8
+
+from __future__ import unicode_literals
+
+import re
+import unittest
+import responses
+import tienda_mobil
+from tienda_mobil import InMemoryMetrics, PrometheusText, TiendaMobilError
+
+DEFAULT_URL = re.compile(r'https?://tiendamobil\.com\.ar/api/.*')
+
+
+class InMemoryMetricsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.metrics = InMemoryMetrics(buckets=(0.1, 1))
+
+    def testRequestFinished(self):
+        self.metrics.RequestStarted('/orders/{id}', 'GET')
+        self.assertEqual({('/orders/{id}', 'GET'): 1},
+                         self.metrics.Snapshot()['in_flight'])
+
+        self.metrics.RequestFinished('/orders/{id}', 'GET', 200, 0.5, 0, 120)
+        self.metrics.RequestStarted('/orders/{id}', 'GET')
+        self.metrics.RequestFinished('/orders/{id}', 'GET', 404, 5, 0, 30)
+
+        snapshot = self.metrics.Snapshot()
+        self.assertEqual({('/orders/{id}', 'GET'): 0}, snapshot['in_flight'])
+        self.assertEqual({'buckets': [0, 1, 1], 'sum': 5.5, 'count': 2},
+                         snapshot['latency'][('/orders/{id}', 'GET')])
+        self.assertEqual({('/orders/{id}', 'GET'): 150}, snapshot['response_bytes'])
+        self.assertEqual({('/orders/{id}', 'GET', 200): 1,
+                          ('/orders/{id}', 'GET', 404): 1},
+                         snapshot['statuses'])
+
+    def testReset(self):
+        self.metrics.RequestFailed('/orders/', 'GET', 'ConnectionError')
+        self.assertEqual({('/orders/', 'GET', 'ConnectionError'): 1},
+                         self.metrics.Snapshot()['errors'])
+        self.metrics.Reset()
+        self.assertEqual({}, self.metrics.Snapshot()['errors'])
+
+    def testPrometheusText(self):
+        self.metrics.RequestStarted('/orders/', 'GET')
+        self.metrics.RequestFinished('/orders/', 'GET', 200, 0.05, 0, 10)
+        self.metrics.RequestFailed('/orders/', 'GET', 'ParseError')
+
+        text = PrometheusText(self.metrics)
+        self.assertIn('# TYPE tienda_mobil_request_duration_seconds histogram', text)
+        self.assertIn('tienda_mobil_request_duration_seconds_bucket'
+                      '{endpoint="/orders/",verb="GET",le="0.1"} 1', text)
+        self.assertIn('tienda_mobil_request_duration_seconds_bucket'
+                      '{endpoint="/orders/",verb="GET",le="+Inf"} 1', text)
+        self.assertIn('tienda_mobil_responses_total'
+                      '{endpoint="/orders/",verb="GET",status="200"} 1', text)
+        self.assertIn('tienda_mobil_errors_total'
+                      '{endpoint="/orders/",verb="GET",type="ParseError"} 1', text)
+        self.assertIn('tienda_mobil_requests_in_flight'
+                      '{endpoint="/orders/",verb="GET"} 0', text)
+
+
+class ApiMetricsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.metrics = InMemoryMetrics()
+        self.api = tienda_mobil.Api(base_url='https://tiendamobil.com.ar/api',
+                                    api_key='test', metrics=self.metrics)
+
+    @responses.activate
+    def testRequests(self):
+        responses.add(responses.GET, DEFAULT_URL, json={'data': {}}, status=200)
+        self.api.GetOrder(99999)
+        responses.add(responses.PATCH, DEFAULT_URL, status=502)
+        with self.assertRaises(TiendaMobilError):
+            self.api.UpdateOrderStatus(99999)
+
+        snapshot = self.metrics.Snapshot()
+        self.assertEqual({('/orders/{id}', 'GET', 200): 1,
+                          ('/orders/{id}', 'PATCH', 502): 1},
+                         snapshot['statuses'])
+        self.assertEqual({('/orders/{id}', 'PATCH', 'HTTPError'): 1},
+                         snapshot['errors'])
+        self.assertEqual(0, snapshot['in_flight'][('/orders/{id}', 'GET')])
+        self.assertEqual(1, snapshot['latency'][('/orders/{id}', 'PATCH')]['count'])
+        self.assertGreater(snapshot['request_bytes'][('/orders/{id}', 'PATCH')], 0)
+
+    @responses.activate
+    def testConnectionError(self):
+        with self.assertRaises(TiendaMobilError):
+            self.api.GetPendingOrders()
+
+        snapshot = self.metrics.Snapshot()
+        self.assertEqual({('/orders/', 'GET', 'ConnectionError'): 1},
+                         snapshot['errors'])
+        self.assertEqual({}, snapshot['statuses'])
@@ -1,7 +1,10 @@
+import copy
 import os
 import json
+import pickle
 import unittest
 import tienda_mobil
+from tienda_mobil import jsonlib
 
 def loadJSON(fname):
     cwd = os.path.abspath(os.path.dirname(__file__))
@@ -95,3 +98,186 @@ class ModelsTest(unittest.TestCase):
         order_item = tienda_mobil.OrderItem(code='47633002', quantity='2')
         self.assertEqual(order_item.code, '47633002')
         self.assertEqual(order_item.quantity, '2')
+
+    def test_slots(self):
+        """ Test models keep their fields in slots """
+        for model in (tienda_mobil.Order, tienda_mobil.OrderPreview,
+                      tienda_mobil.OrderItem, tienda_mobil.Customer):
+            obj = model()
+            self.assertFalse(hasattr(obj, '__dict__'))
+            with self.assertRaises(AttributeError):
+                obj.undefined_field = None
+
+    def test_pickle(self):
+        """ Test slotted models pickle with every protocol """
+        order = tienda_mobil.Order.NewFromJsonDict(self.ORDER_SAMPLE)
+        order.items
+        for protocol in range(pickle.HIGHEST_PROTOCOL + 1):
+            clone = pickle.loads(pickle.dumps(order, protocol))
+            self.assertEqual(order, clone)
+            self.assertEqual(order._json, clone._json)
+            self.assertEqual(order.items, clone.items)
+
+    def test_mutable_defaults(self):
+        """ Test instances do not share the class level defaults """
+        first = tienda_mobil.Order()
+        second = tienda_mobil.Order()
+        first.attributes['order-items'].append('47633002')
+        self.assertEqual(second.attributes['order-items'], [])
+        self.assertEqual(tienda_mobil.Order.param_defaults['attributes']['order-items'], [])
+
+    def test_lazy_hydration(self):
+        """ Test nested models are built on first access and memoized """
+        order = tienda_mobil.Order.NewFromJsonDict(self.ORDER_SAMPLE)
+        self.assertFalse(hasattr(order, '_customer'))
+        self.assertFalse(hasattr(order, '_items'))
+        self.assertIs(order.customer, order.customer)
+        self.assertIs(order.items, order.items)
+        self.assertEqual(order.customer.code,
+            self.ORDER_SAMPLE['attributes']['customer']['code'])
+
+        preview = tienda_mobil.OrderPreview.NewFromJsonDict(
+            self.ORDER_PREVIEW_SAMPLE)
+        self.assertFalse(hasattr(preview, '_customer'))
+        self.assertIs(preview.customer, preview.customer)
+
+        customer = tienda_mobil.Customer(code='1')
+        preview.customer = customer
+        self.assertIs(preview.customer, customer)
+
+        # models built without attributes
+        self.assertEqual(tienda_mobil.Order().items, [])
+        self.assertIs(type(tienda_mobil.Order().customer), tienda_mobil.Customer)
+        with self.assertRaises(AttributeError):
+            tienda_mobil.Order(attributes={}).customer
+
+    def test_as_dict(self):
+        """ Test AsDict() converts nested models and skips empty values """
+        order = tienda_mobil.Order.NewFromJsonDict(self.ORDER_SAMPLE)
+        self.assertEqual(order.AsDict(), {
+            'id': self.ORDER_SAMPLE['id'],
+            'type': self.ORDER_SAMPLE['type'],
+            'attributes': self.ORDER_SAMPLE['attributes'],
+        })
+        self.assertEqual(tienda_mobil.OrderItem(code='1', quantity=0).AsDict(),
+                         {'code': '1'})
+
+        customer = tienda_mobil.Customer(code='1')
+        items = [tienda_mobil.OrderItem(code='2', quantity=1), 'raw']
+        order = tienda_mobil.Order(id=customer, type=items)
+        self.assertEqual(order.AsDict()['id'], customer.AsDict())
+        self.assertEqual(order.AsDict()['type'], [items[0].AsDict(), 'raw'])
+
+    def test_equality(self):
+        """ Test models compare by their AsDict() representation """
+        order = tienda_mobil.Order.NewFromJsonDict(self.ORDER_SAMPLE)
+        same = tienda_mobil.Order.NewFromJsonDict(self.ORDER_SAMPLE)
+        self.assertEqual(order, order)
+        self.assertEqual(order, same)
+        self.assertEqual(hash(order), hash(same))
+        same.id = '1'
+        self.assertNotEqual(order, same)
+
+    def test_json_backend(self):
+        """ Test AsJsonString() with every installed JSON backend """
+        customer = tienda_mobil.Customer.NewFromJsonDict(self.CUSTOMER_SAMPLE)
+        expected = json.dumps(customer.AsDict(), sort_keys=True)
+        self.assertEqual(customer.AsJsonString(), expected)
+        try:
+            for name in jsonlib.AvailableBackends():
+                tienda_mobil.TiendaMobilModel.SetJsonBackend(name)
+                self.assertEqual(json.loads(customer.AsJsonString()),
+                                 customer.AsDict())
+        finally:
+            tienda_mobil.TiendaMobilModel.SetJsonBackend('json')
+        with self.assertRaises(ValueError):
+            tienda_mobil.TiendaMobilModel.SetJsonBackend('unknown')
+
+    def test_customer_registry(self):
+        """ Test orders of the same customer share an interned Customer """
+        other = dict(self.ORDER_SAMPLE, id='1')
+        changed = dict(self.ORDER_SAMPLE, attributes=dict(
+            self.ORDER_SAMPLE['attributes'],
+            customer=dict(self.ORDER_SAMPLE['attributes']['customer'], name='Foo')))
+
+        registry = tienda_mobil.CustomerRegistry()
+        first = tienda_mobil.Order.NewFromJsonDict(
+            self.ORDER_SAMPLE, customer_registry=registry).customer
+        second = tienda_mobil.OrderPreview.NewFromJsonDict(
+            other, customer_registry=registry).customer
+        third = tienda_mobil.Order.NewFromJsonDict(
+            changed, customer_registry=registry).customer
+
+        self.assertIs(first, second)
+        self.assertIsInstance(first, tienda_mobil.Customer)
+        self.assertEqual(first, tienda_mobil.Customer.NewFromJsonDict(
+            self.ORDER_SAMPLE['attributes']['customer']))
+        with self.assertRaises(AttributeError):
+            first.name = 'Bar'
+
+        # customers whose data changed are not shared
+        self.assertIsNot(first, third)
+        self.assertEqual('Foo', third.name)
+
+        stats = registry.Stats()
+        self.assertEqual(3, stats['lookups'])
+        self.assertEqual(1, stats['hits'])
+        self.assertEqual(1, stats['size'])
+        self.assertEqual(1.5, stats['dedup_ratio'])
+        self.assertGreater(stats['bytes_saved'], 0)
+
+        # without a registry every order builds its own customer
+        self.assertIsNot(
+            tienda_mobil.Order.NewFromJsonDict(self.ORDER_SAMPLE).customer,
+            tienda_mobil.Order.NewFromJsonDict(other).customer)
+
+        # registries are independent of each other
+        self.assertIsNot(first, tienda_mobil.Order.NewFromJsonDict(
+            self.ORDER_SAMPLE,
+            customer_registry=tienda_mobil.CustomerRegistry()).customer)
+
+    def test_customer_registry_max_entries(self):
+        """ Test the least recently used customers are evicted """
+        registry = tienda_mobil.CustomerRegistry(max_entries=2)
+        first = registry.Intern({'code': '1'})
+        registry.Intern({'code': '2'})
+        self.assertIs(first, registry.Intern({'code': '1'}))
+        registry.Intern({'code': '3'})
+        self.assertEqual(2, len(registry))
+        self.assertEqual(1, registry.Stats()['evictions'])
+        # '2' was the least recently used
+        self.assertIs(first, registry.Intern({'code': '1'}))
+        self.assertEqual(2, registry.Stats()['hits'])
+
+        registry = tienda_mobil.CustomerRegistry(max_entries=None)
+        for code in range(20000):
+            registry.Intern({'code': str(code)})
+        self.assertEqual(20000, len(registry))
+
+    def test_customer_registry_copies(self):
+        """ Test interned customers can be pickled and copied """
+        registry = tienda_mobil.CustomerRegistry()
+        order = tienda_mobil.Order.NewFromJsonDict(
+            self.ORDER_SAMPLE, customer_registry=registry)
+        customer = order.customer
+
+        for clone in (pickle.loads(pickle.dumps(customer)),
+                      copy.copy(customer), copy.deepcopy(customer)):
+            self.assertIs(type(clone), tienda_mobil.Customer)
+            self.assertEqual(customer, clone)
+            clone.name = 'Bar'
+
+        for clone in (pickle.loads(pickle.dumps(order)), copy.deepcopy(order)):
+            self.assertEqual(order, clone)
+            self.assertIs(type(clone.customer), tienda_mobil.Customer)
+            self.assertEqual(customer, clone.customer)
+        # a shallow copy keeps sharing the interned customer
+        self.assertIs(customer, copy.copy(order).customer)
+
+        # copies keep interning through the same registry
+        clone = copy.deepcopy(order)
+        del clone._customer
+        self.assertIs(customer, clone.customer)
+        clone = pickle.loads(pickle.dumps(order))
+        del clone._customer
+        self.assertIsInstance(clone.customer, tienda_mobil.Customer)
@@ -0,0 +1,100 @@
+import os
+import json
+import unittest
+import responses
+import tienda_mobil
+from tienda_mobil import OrderBook, TiendaMobilError
+
+def loadJSON(fname):
+    cwd = os.path.abspath(os.path.dirname(__file__))
+    with open(os.path.join(cwd, 'data', fname), 'rb') as f:
+        data = json.loads(f.read())
+    return data
+
+
+def makeOrder(order_id, customer, price_list, items):
+    return {
+        'id': order_id,
+        'type': 'orders',
+        'attributes': {
+            'price-list': price_list,
+            'customer': {'code': customer},
+            'order-items': [{'code': code, 'quantity': quantity}
+                            for code, quantity in items],
+        }
+    }
+
+
+class OrderBookTest(unittest.TestCase):
+
+    def setUp(self):
+        self.book = OrderBook()
+        self.book.Add(makeOrder('1', 'A', 'R01', [('X', 2), ('Y', 1)]))
+        self.book.Add(makeOrder('2', 'B', 'R02', [('X', 5)]))
+        self.book.Add(tienda_mobil.Order.NewFromJsonDict(
+            makeOrder('3', 'A', 'R02', [('Z', 4)])))
+
+    def testLookups(self):
+        self.assertEqual(3, len(self.book))
+        self.assertIn('1', self.book)
+        self.assertIn(3, self.book)
+        self.assertEqual(7, self.book.ItemQuantity('X'))
+        self.assertEqual(4, self.book.ItemQuantity('Z'))
+        self.assertEqual(0, self.book.ItemQuantity('unknown'))
+        self.assertEqual(7, self.book.CustomerQuantity('A'))
+        self.assertEqual(9, self.book.PriceListQuantity('R02'))
+
+    def testMissingCustomer(self):
+        order = makeOrder('4', None, 'R01', [('X', 1)])
+        del order['attributes']['customer']
+        self.book.Add(tienda_mobil.Order.NewFromJsonDict(order))
+        self.book.Add(dict(order, id='5'))
+        self.assertEqual(9, self.book.ItemQuantity('X'))
+        self.assertEqual(2, self.book.CustomerQuantity(''))
+
+    def testTop(self):
+        self.assertEqual([('X', 7), ('Z', 4)], self.book.TopItems(2))
+        self.assertEqual([('A', 7), ('B', 5)], self.book.TopCustomers())
+        self.assertEqual([('R02', 9)], self.book.TopPriceLists(1))
+
+    def testUpdates(self):
+        # a new version of an order replaces the previous one
+        self.book.Add(makeOrder('1', 'A', 'R01', [('X', 1)]))
+        self.assertEqual(6, self.book.ItemQuantity('X'))
+        self.assertEqual(0, self.book.ItemQuantity('Y'))
+        self.assertEqual(3, len(self.book))
+
+        self.assertTrue(self.book.Remove('2'))
+        self.assertFalse(self.book.Remove('2'))
+        self.assertEqual(1, self.book.ItemQuantity('X'))
+        self.assertEqual(0, self.book.CustomerQuantity('B'))
+        self.assertEqual([('Z', 4), ('X', 1)], self.book.TopItems())
+
+        self.book.Clear()
+        self.assertEqual(0, len(self.book))
+        self.assertEqual([], self.book.TopItems())
+
+    @responses.activate
+    def testApi(self):
+        base_url = 'https://tiendamobil.com.ar/api'
+        json_data = loadJSON('order.json')
+        order_id = json_data['data']['id']
+        url = '{0}/orders/{1}'.format(base_url, order_id)
+        responses.add(responses.GET, url, json=json_data, status=200)
+        responses.add(responses.PATCH, url, status=502)
+        responses.add(responses.PATCH, url, status=200)
+
+        api = tienda_mobil.Api(base_url=base_url, api_key='test',
+                               order_book=self.book)
+        api.GetOrder(order_id)
+        self.assertIn(order_id, self.book)
+        self.assertEqual(1, self.book.ItemQuantity('47633002'))
+
+        # failed updates leave the order in the book
+        with self.assertRaises(TiendaMobilError):
+            api.UpdateOrderStatus(order_id)
+        self.assertIn(order_id, self.book)
+
+        api.UpdateOrderStatus(order_id)
+        self.assertNotIn(order_id, self.book)
+        self.assertEqual(0, self.book.ItemQuantity('47633002'))
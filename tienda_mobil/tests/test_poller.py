@@ -0,0 +1,103 @@
+import os
+import json
+import unittest
+from tienda_mobil import OrderPreview, Poller, TiendaMobilError
+
+def loadJSON(fname):
+    cwd = os.path.abspath(os.path.dirname(__file__))
+    with open(os.path.join(cwd, 'data', fname)) as f:
+        data = json.loads(f.read())
+    return data
+
+
+class FakeApi(object):
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+
+    def GetPendingOrders(self):
+        response = self.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+class PollerTest(unittest.TestCase):
+
+    PENDING_ORDERS = loadJSON('pending_orders.json')
+
+    def setUp(self):
+        self.previews = [OrderPreview.NewFromJsonDict(x)
+                         for x in self.PENDING_ORDERS['data']]
+        self.handled = []
+
+    def poller(self, responses, **kwargs):
+        kwargs.setdefault('jitter', 0)
+        return Poller(FakeApi(responses), self.handled.append,
+                      min_interval=1, max_interval=10, **kwargs)
+
+    def testAdaptiveInterval(self):
+        error = TiendaMobilError('Service Unavailable')
+        poller = self.poller([[], [], error, self.previews[:1], self.previews[:1],
+                              self.previews[:2], [], [], [], []])
+        delays = [poller.Poll() for _ in range(10)]
+        self.assertEqual([2, 4, 8, 1, 1, 1, 2, 4, 8, 10], delays)
+        self.assertEqual([self.previews[:1], self.previews[1:2]], self.handled)
+        self.assertEqual(10, poller.interval)
+        self.assertEqual(0.1, poller.rate)
+        self.assertEqual({'polls': 10, 'errors': 1, 'new_orders': 2,
+                          'interval': 10, 'rate': 0.1}, poller.Stats())
+
+    def testJitter(self):
+        poller = self.poller([[]] * 3, jitter=0.5, random=lambda: 0.5)
+        self.assertEqual([1.5, 3, 6], [poller.Poll() for _ in range(3)])
+        self.assertEqual(8, poller.interval)
+
+    def testHandlerErrors(self):
+        def handler(previews):
+            self.handled.append(previews)
+            if len(self.handled) == 1:
+                raise ValueError('boom')
+
+        poller = Poller(FakeApi([self.previews] * 2), handler, jitter=0)
+        poller.Poll()
+        poller.Poll()
+        self.assertEqual([self.previews, self.previews], self.handled)
+
+    def testRun(self):
+        sleeps = []
+
+        def sleep(seconds):
+            sleeps.append(seconds)
+            if len(sleeps) == 3:
+                poller.Stop()
+
+        poller = self.poller([[]] * 3, sleep=sleep)
+        poller.Run()
+        self.assertEqual([2, 4, 8], sleeps)
+
+    def testUnexpectedErrors(self):
+        sleeps = []
+
+        def sleep(seconds):
+            sleeps.append(seconds)
+            if len(sleeps) == 3:
+                poller.Stop()
+
+        poller = self.poller([[], TypeError('boom'), self.previews[:1]], sleep=sleep)
+        poller.Run()
+        self.assertEqual([2, 4, 1], sleeps)
+        self.assertEqual([self.previews[:1]], self.handled)
+        self.assertEqual(1, poller.Stats()['errors'])
+
+    def testStartStop(self):
+        with self.poller([self.previews] * 100):
+            pass
+        self.assertEqual([self.previews], self.handled)
+
+    def testInvalidArguments(self):
+        self.assertRaises(ValueError, Poller, None, None, min_interval=0)
+        self.assertRaises(ValueError, Poller, None, None, min_interval=5,
+                          max_interval=1)
+        self.assertRaises(ValueError, Poller, None, None, backoff=0.5)
+        self.assertRaises(ValueError, Poller, None, None, jitter=2)
@@ -0,0 +1,94 @@
+import time
+import unittest
+from email.utils import formatdate
+
+from tienda_mobil import RateLimit
+from tienda_mobil.ratelimit import RetryAfter
+
+
+class FakeClock(object):
+
+    def __init__(self):
+        self.now = 0.
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class RateLimitTest(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+
+    def testUnlimited(self):
+        limit = RateLimit(clock=self.clock, sleep=self.clock.sleep)
+        for _ in range(100):
+            limit.Acquire()
+        self.assertEqual([], self.clock.sleeps)
+
+    def testTokenBucket(self):
+        limit = RateLimit(rate=10, burst=5, clock=self.clock, sleep=self.clock.sleep)
+        for _ in range(5):
+            limit.Acquire()
+        self.assertEqual([], self.clock.sleeps)
+
+        for _ in range(10):
+            limit.Acquire()
+        self.assertAlmostEqual(1.0, self.clock.now)
+
+        # tokens refill while idle, up to burst
+        self.clock.now += 60
+        self.clock.sleeps = []
+        for _ in range(5):
+            limit.Acquire()
+        self.assertEqual([], self.clock.sleeps)
+
+    def testPause(self):
+        limit = RateLimit(clock=self.clock, sleep=self.clock.sleep)
+        limit.Pause(3)
+        limit.Acquire()
+        self.assertAlmostEqual(3, self.clock.now)
+
+    def testMaxPause(self):
+        limit = RateLimit(max_pause=10, clock=self.clock, sleep=self.clock.sleep)
+        self.assertEqual(10, limit.UpdateFromHeaders({'Retry-After': '86400'}))
+        # a reset given in epoch milliseconds
+        reset = str(int(time.time() * 1000))
+        self.assertEqual(10, limit.UpdateFromHeaders(
+            {'X-RateLimit-Remaining': '0', 'X-RateLimit-Reset': reset}))
+        limit.Acquire()
+        self.assertAlmostEqual(10, self.clock.now)
+
+    def testInvalidArguments(self):
+        self.assertRaises(ValueError, RateLimit, 0)
+        self.assertRaises(ValueError, RateLimit, -1)
+        self.assertRaises(ValueError, RateLimit, 1, burst=0)
+
+    def testUpdateFromHeaders(self):
+        limit = RateLimit(clock=self.clock, sleep=self.clock.sleep)
+        self.assertEqual(0, limit.UpdateFromHeaders({}))
+        self.assertEqual(0, limit.UpdateFromHeaders(
+            {'X-RateLimit-Remaining': '5', 'X-RateLimit-Reset': '60'}))
+        self.assertEqual(60, limit.UpdateFromHeaders(
+            {'X-RateLimit-Remaining': '0', 'X-RateLimit-Reset': '60'}))
+        reset = str(int(time.time()) + 30)
+        self.assertAlmostEqual(30, limit.UpdateFromHeaders(
+            {'X-RateLimit-Remaining': '0', 'X-RateLimit-Reset': reset}), delta=2)
+        self.assertEqual(7, limit.UpdateFromHeaders({'Retry-After': '7'}))
+
+        limit.Acquire()
+        self.assertAlmostEqual(60, self.clock.now)
+
+    def testRetryAfter(self):
+        self.assertIsNone(RetryAfter({}))
+        self.assertIsNone(RetryAfter({'Retry-After': 'soon'}))
+        self.assertEqual(120, RetryAfter({'Retry-After': '120'}))
+        date = formatdate(time.time() + 60, usegmt=True)
+        self.assertAlmostEqual(60, RetryAfter({'Retry-After': date}), delta=2)
+        date = formatdate(time.time() - 60, usegmt=True)
+        self.assertEqual(0, RetryAfter({'Retry-After': date}))
@@ -0,0 +1,85 @@
+import os
+import json
+import unittest
+import tienda_mobil
+from tienda_mobil import OrderStore, TiendaMobilError
+
+def loadJSON(*path):
+    cwd = os.path.abspath(os.path.dirname(__file__))
+    with open(os.path.join(cwd, 'data', *path), 'rb') as f:
+        data = json.loads(f.read())
+    return data
+
+
+class OrderStoreTest(unittest.TestCase):
+
+    ORDER_SAMPLE = loadJSON('models', 'order.json')
+    PENDING_ORDERS = loadJSON('pending_orders.json')['data']
+
+    def setUp(self):
+        self.store = OrderStore(batch_size=2)
+        self.order = tienda_mobil.Order.NewFromJsonDict(self.ORDER_SAMPLE)
+        self.previews = [tienda_mobil.OrderPreview.NewFromJsonDict(x)
+                         for x in self.PENDING_ORDERS]
+
+    def tearDown(self):
+        self.store.Close()
+
+    def testUpsert(self):
+        self.assertEqual(4, self.store.Upsert([self.order] + self.previews))
+        self.assertEqual(4, len(self.store))
+        self.assertEqual(self.order, self.store.GetOrder(self.order.id))
+        self.assertIsNone(self.store.GetOrder(self.previews[0].id))
+        self.assertIsNone(self.store.GetOrder('99999999'))
+
+        # upserting again replaces the order items instead of adding them
+        self.store.Upsert([self.order])
+        self.assertEqual(4, len(self.store))
+        self.assertEqual({'47633002': 1, '47633003': 1},
+                         self.store.PendingQuantityByItem())
+
+        with self.assertRaises(TiendaMobilError):
+            self.store.Upsert([self.order.items[0]])
+
+    def testCustomers(self):
+        customer = self.order.customer
+        self.store.Upsert([self.order])
+        self.assertEqual(customer, self.store.GetCustomer(customer.code))
+
+        # the partial customer of a preview does not replace a complete one
+        preview = tienda_mobil.OrderPreview.NewFromJsonDict(
+            dict(self.PENDING_ORDERS[0], attributes=dict(
+                self.PENDING_ORDERS[0]['attributes'],
+                customer={'code': customer.code, 'name': customer.name})))
+        self.store.Upsert([preview])
+        self.assertEqual(customer, self.store.GetCustomer(customer.code))
+        self.assertEqual([preview.id, self.order.id],
+                         self.store.OrderIdsByCustomer(customer.code))
+
+        self.store.Upsert([tienda_mobil.Customer(code='1', name='Foo')])
+        self.assertEqual('Foo', self.store.GetCustomer('1').name)
+        self.assertIsNone(self.store.GetCustomer('2'))
+
+    def testQueries(self):
+        self.store.Upsert([self.order] + self.previews)
+        self.assertEqual([self.order.id],
+                         self.store.OrderIdsByBusinessman('18642624'))
+        self.assertEqual(['20492', '20493'],
+                         self.store.OrderIdsByBusinessman('14076370'))
+        self.assertEqual([self.order.id], self.store.OrderIdsByItem('47633002'))
+        self.assertEqual({'24624348': 1, '24899348': 1, '31202377': 1, '05003446': 1},
+                         self.store.OrderCountByCustomer())
+
+        self.store.MarkProcessed([self.order.id])
+        self.assertEqual({}, self.store.PendingQuantityByItem())
+        self.assertEqual([], self.store.OrderIdsByItem('47633002', pending_only=True))
+        self.assertNotIn('24624348', self.store.OrderCountByCustomer())
+        self.assertIn('24624348', self.store.OrderCountByCustomer(pending_only=False))
+
+        # upserting keeps the processed flag
+        self.store.Upsert([self.order])
+        self.assertEqual({}, self.store.PendingQuantityByItem())
+
+        self.store.Delete([self.order.id])
+        self.assertEqual(3, len(self.store))
+        self.assertEqual([], self.store.OrderIdsByItem('47633002'))
@@ -0,0 +1,126 @@
+import copy
+import os
+import re
+import shutil
+import tempfile
+import unittest
+import responses
+import tienda_mobil
+from tienda_mobil import OrderSync, TiendaMobilError
+
+ORDER_URL = re.compile(r'https?://tiendamobil\.com\.ar/api/orders/\d+')
+
+def readJSONFile(fname):
+    import json
+    cwd = os.path.abspath(os.path.dirname(__file__))
+    with open(os.path.join(cwd, 'data', fname)) as f:
+        data = json.loads(f.read())
+    return data
+
+
+class OrderSyncTest(unittest.TestCase):
+
+    PENDING_ORDERS = readJSONFile('pending_orders.json')
+    ORDER = readJSONFile('order.json')
+
+    def setUp(self):
+        self.base_url = 'https://tiendamobil.com.ar/api'
+        self.api = tienda_mobil.Api(base_url=self.base_url, api_key='test')
+        self.tmp_dir = tempfile.mkdtemp()
+        self.state_file = os.path.join(self.tmp_dir, 'sync.json')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def addPending(self, pending):
+        responses.add(responses.GET, '{0}/orders/'.format(self.base_url),
+                      json=pending, status=200)
+
+    def orderCalls(self):
+        return [c for c in responses.calls if ORDER_URL.match(c.request.url)]
+
+    @responses.activate
+    def testSync(self):
+        responses.add(responses.GET, ORDER_URL, json=self.ORDER, status=200)
+        removed = []
+        sync = OrderSync(self.api, self.state_file, on_removed=removed.append)
+
+        self.addPending(self.PENDING_ORDERS)
+        report = sync.Sync()
+        self.assertEqual(3, len(report['added']))
+        self.assertIs(type(report['added'][0]), tienda_mobil.Order)
+        self.assertEqual(3, len(self.orderCalls()))
+        self.assertEqual(['20488', '20492', '20493'], sync.KnownOrderIds())
+
+        # nothing changed
+        report = sync.Sync()
+        self.assertEqual({'added': [], 'changed': [], 'removed': [], 'failed': {}},
+                         report)
+        self.assertEqual(3, len(self.orderCalls()))
+
+        # one order changed, another one is no longer pending
+        pending = copy.deepcopy(self.PENDING_ORDERS)
+        pending['data'][0]['attributes']['total-quantity'] = 13
+        del pending['data'][2]
+        responses.replace(responses.GET, '{0}/orders/'.format(self.base_url),
+                          json=pending, status=200)
+        report = sync.Sync()
+        self.assertEqual(1, len(report['changed']))
+        self.assertEqual(['20493'], report['removed'])
+        self.assertEqual(['20493'], removed)
+        self.assertEqual(4, len(self.orderCalls()))
+
+        # a restarted sync only fetches what changed while it was down
+        sync = OrderSync(self.api, self.state_file)
+        self.assertEqual(['20488', '20492'], sync.KnownOrderIds())
+        self.assertEqual([], sync.Sync()['added'])
+        self.assertEqual(4, len(self.orderCalls()))
+
+    @responses.activate
+    def testFailedOrdersAreRetried(self):
+        self.addPending(self.PENDING_ORDERS)
+        responses.add(responses.GET, ORDER_URL, status=502)
+        sync = OrderSync(self.api, self.state_file)
+
+        report = sync.Sync()
+        self.assertEqual(3, len(report['failed']))
+        self.assertEqual([], sync.KnownOrderIds())
+
+        responses.replace(responses.GET, ORDER_URL, json=self.ORDER, status=200)
+        self.assertEqual(3, len(sync.Sync()['added']))
+
+    @responses.activate
+    def testFailedCallbacksAreRetried(self):
+        self.addPending(self.PENDING_ORDERS)
+        responses.add(responses.GET, ORDER_URL, json=self.ORDER, status=200)
+        added = []
+
+        def on_added(order):
+            if not added:
+                added.append(None)
+                raise RuntimeError('boom')
+            added.append(order)
+
+        sync = OrderSync(self.api, self.state_file, on_added=on_added)
+        self.assertEqual(3, len(sync.Sync()['added']))
+        # the first order was not recorded, but the others were delivered
+        self.assertEqual(2, len(sync.KnownOrderIds()))
+        self.assertEqual(3, len(added))
+
+        self.assertEqual(1, len(sync.Sync()['added']))
+        self.assertEqual(3, len(sync.KnownOrderIds()))
+        self.assertEqual(4, len(added))
+
+    @responses.activate
+    def testPollError(self):
+        responses.add(responses.GET, '{0}/orders/'.format(self.base_url), status=502)
+        sync = OrderSync(self.api, self.state_file)
+        with self.assertRaises(TiendaMobilError):
+            sync.Sync()
+        self.assertFalse(os.path.exists(self.state_file))
+
+    def testInvalidStateFile(self):
+        with open(self.state_file, 'w') as f:
+            f.write('not json')
+        with self.assertRaises(TiendaMobilError):
+            OrderSync(self.api, self.state_file)
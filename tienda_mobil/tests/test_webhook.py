@@ -0,0 +1,110 @@
+import os
+import json
+import threading
+import unittest
+import tienda_mobil
+from tienda_mobil.webhook import Sign, SIGNATURE_HEADER
+
+try:
+    from urllib.request import Request, urlopen
+    from urllib.error import HTTPError
+except ImportError:  # Python 2
+    from urllib2 import Request, urlopen, HTTPError
+
+def loadJSON(fname):
+    cwd = os.path.abspath(os.path.dirname(__file__))
+    with open(os.path.join(cwd, 'data', fname), 'rb') as f:
+        data = json.loads(f.read())
+    return data
+
+
+class WebhookReceiverTest(unittest.TestCase):
+
+    PENDING_ORDERS = loadJSON('pending_orders.json')
+    ORDER = loadJSON('order.json')
+
+    def setUp(self):
+        self.received = []
+        self.done = threading.Event()
+        self.gate = threading.Event()
+        self.receiver = tienda_mobil.WebhookReceiver('test', self.handle,
+                                                     workers=2, queue_size=3)
+        self.receiver.Start()
+        self.url = 'http://{0}:{1}/webhooks/orders'.format(*self.receiver.address)
+
+    def tearDown(self):
+        self.gate.set()
+        self.receiver.Stop()
+
+    def handle(self, order):
+        self.received.append(order)
+        if order.id == 'block':
+            self.gate.wait()
+        if order.id == 'boom':
+            raise ValueError(order.id)
+
+    def post(self, document, headers=None, body=None):
+        if body is None:
+            body = json.dumps(document).encode('utf-8')
+        if headers is None:
+            headers = {SIGNATURE_HEADER: Sign('test', body)}
+        try:
+            return urlopen(Request(self.url, body, headers)).getcode()
+        except HTTPError as e:
+            return e.code
+
+    def testNotifications(self):
+        self.assertEqual(202, self.post(self.ORDER))
+        self.assertEqual(202, self.post(
+            {'data': self.PENDING_ORDERS['data'][:2]},
+            headers={'Authorization': 'Token token=test'}))
+        self.receiver.Stop()
+
+        self.assertEqual(3, len(self.received))
+        self.assertEqual({tienda_mobil.Order, tienda_mobil.OrderPreview},
+                         set(type(x) for x in self.received))
+        order = [x for x in self.received if type(x) is tienda_mobil.Order][0]
+        self.assertEqual(tienda_mobil.Order.NewFromJsonDict(self.ORDER['data']), order)
+        self.assertEqual({'received': 3, 'processed': 3, 'failed': 0,
+                          'rejected': 0, 'dropped': 0}, self.receiver.Stats())
+
+    def testRejected(self):
+        body = json.dumps(self.ORDER).encode('utf-8')
+        self.assertEqual(401, self.post(None, body=body, headers={}))
+        self.assertEqual(401, self.post(None, body=body, headers={
+            SIGNATURE_HEADER: Sign('other', body)}))
+        self.assertEqual(401, self.post(self.ORDER, headers={
+            'Authorization': 'Token token=other'}))
+        self.assertEqual(400, self.post(None, body=b'<html>'))
+        self.assertEqual(400, self.post({'errors': ['oops']}))
+        self.assertEqual(5, self.receiver.Stats()['rejected'])
+        self.assertEqual([], self.received)
+
+    def testQueueFull(self):
+        blocking = dict(self.ORDER['data'], id='block')
+        self.assertEqual(202, self.post({'data': [blocking] * 3}))
+        # the workers hold at most two of them, so three more do not fit
+        self.assertEqual(503, self.post({'data': [self.ORDER['data']] * 3}))
+        self.assertEqual(3, self.receiver.Stats()['dropped'])
+        self.gate.set()
+
+    def testTooManyOrders(self):
+        self.assertEqual(413, self.post({'data': [self.ORDER['data']] * 4}))
+        stats = self.receiver.Stats()
+        self.assertEqual(1, stats['rejected'])
+        self.assertEqual(0, stats['dropped'])
+
+    def testStopBeforeStart(self):
+        receiver = tienda_mobil.WebhookReceiver('test', self.handle)
+        self.assertIsNone(receiver.address)
+        receiver.Stop()
+
+        with receiver:
+            self.assertIsNotNone(receiver.address)
+        self.assertIsNone(receiver.address)
+        receiver.Stop()
+
+    def testHandlerErrors(self):
+        self.assertEqual(202, self.post({'data': dict(self.ORDER['data'], id='boom')}))
+        self.receiver.Stop()
+        self.assertEqual(1, self.receiver.Stats()['failed'])
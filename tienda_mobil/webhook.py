@@ -0,0 +1,272 @@
+#!/usr/bin/env python
+
+"""A small HTTP server receiving order notifications pushed to us.
+
+Notifications are POSTed as JSON:API documents whose data member holds an
+order resource, or a list of them. Each request must be authenticated with
+the account's api_key, either with an X-TiendaMobil-Signature header holding
+'sha256=' followed by the hex HMAC-SHA256 of the body, or with the same
+Authorization header tienda_mobil.Api sends.
+"""
+
+import hashlib
+import hmac
+import logging
+import threading
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+    import queue
+except ImportError:  # Python 2
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+    import Queue as queue
+
+from tienda_mobil.jsonlib import GetJsonBackend
+from tienda_mobil.models import Order, OrderPreview
+
+logger = logging.getLogger(__name__)
+
+SIGNATURE_HEADER = 'X-TiendaMobil-Signature'
+
+# Seconds a sender is asked to wait when the queue is full
+RETRY_AFTER = 5
+
+
+def Sign(api_key, body):
+    """Returns the X-TiendaMobil-Signature header value of a request body."""
+    digest = hmac.new(api_key.encode('utf-8'), body, hashlib.sha256).hexdigest()
+    return 'sha256=' + digest
+
+
+class _Server(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class _Handler(BaseHTTPRequestHandler):
+
+    def do_POST(self):
+        receiver = self.server.receiver
+        if self.path.split('?')[0] != receiver.path:
+            self._Reply(404)
+            return
+
+        try:
+            length = int(self.headers.get('Content-Length') or 0)
+        except ValueError:
+            length = -1
+        if length < 0 or length > receiver.max_body_size:
+            receiver._Count('rejected')
+            self._Reply(413)
+            return
+        body = self.rfile.read(length)
+
+        if not receiver._Authenticate(self.headers, body):
+            receiver._Count('rejected')
+            self._Reply(401)
+            return
+
+        try:
+            orders = receiver._Parse(body)
+        except ValueError:
+            receiver._Count('rejected')
+            self._Reply(400)
+            return
+
+        if receiver._queue.maxsize and len(orders) > receiver._queue.maxsize:
+            # it would never fit, so do not ask the sender to retry it
+            receiver._Count('rejected')
+            self._Reply(413)
+            return
+        if not receiver._Enqueue(orders):
+            self._Reply(503, {'Retry-After': str(RETRY_AFTER)})
+            return
+        self._Reply(202)
+
+    def _Reply(self, status, headers=None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        logger.debug(format, *args)
+
+
+class WebhookReceiver(object):
+    """Receives pushed order notifications and hands every order to a
+    callback, run by a bounded pool of worker threads.
+
+    Orders whose attributes include order-items are built as
+    tienda_mobil.Order, the rest as tienda_mobil.OrderPreview. When the
+    queue is full, notifications are refused with 503 and a Retry-After
+    header, so that the sender retries them later; those holding more
+    orders than the whole queue are refused with 413. Notifications can still
+    be lost, so keep a slow tienda_mobil.OrderSync poll to reconcile.
+    """
+
+    def __init__(self, api_key, handler, host='127.0.0.1', port=0,
+                 path='/webhooks/orders', workers=4, queue_size=1000,
+                 max_body_size=1024 * 1024, json_backend='auto'):
+        """Instantiate a new tienda_mobil.WebhookReceiver object.
+
+        Args:
+          api_key (str):
+            Your Tienda Mobil user's api_key, used to authenticate requests.
+          handler (callable):
+            Called with every tienda_mobil.Order or tienda_mobil.OrderPreview
+            received. Exceptions it raises are logged and counted as failed.
+          host (str, optional):
+            Address to listen on.
+          port (int, optional):
+            Port to listen on, 0 to pick a free one (see address). The
+            socket is bound by Start().
+          path (str, optional):
+            URL path notifications are posted to.
+          workers (int, optional):
+            Number of threads calling handler.
+          queue_size (int, optional):
+            Maximum number of orders waiting for a worker, and so the most
+            orders a single notification can hold.
+          max_body_size (int, optional):
+            Largest request body accepted, in bytes.
+          json_backend (str, optional):
+            JSON library decoding the notifications, see
+            tienda_mobil.jsonlib.GetJsonBackend.
+        """
+        self.handler = handler
+        self.path = path
+        self.workers = workers
+        self.max_body_size = max_body_size
+        self.json_backend = GetJsonBackend(json_backend)
+        self._api_key = api_key
+        self._authorization = 'Token token={0}'.format(api_key)
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self._stats = dict.fromkeys(
+            ('received', 'rejected', 'dropped', 'processed', 'failed'), 0)
+        self._threads = []
+        self._listen = (host, port)
+        self._server = None
+
+    @property
+    def address(self):
+        """The (host, port) the receiver listens on, None unless started."""
+        if self._server is None:
+            return None
+        return self._server.server_address[:2]
+
+    def Start(self):
+        """Binds the socket and starts serving and the worker threads, in
+        the background."""
+        if self._server is not None:
+            return
+        self._server = _Server(self._listen, _Handler)
+        self._server.receiver = self
+        for _ in range(self.workers):
+            thread = threading.Thread(target=self._Work)
+            thread.daemon = True
+            thread.start()
+            self._threads.append(thread)
+        thread = threading.Thread(target=self._server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        self._threads.append(thread)
+
+    def Stop(self):
+        """Stops accepting notifications, and returns once the orders
+        already queued have been handled."""
+        if self._server is None:
+            return
+        self._server.shutdown()
+        self._server.server_close()
+        self._server = None
+        for _ in range(self.workers):
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def __enter__(self):
+        self.Start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.Stop()
+
+    def Stats(self):
+        """Returns a dict counting the orders received, processed and
+        failed, the requests rejected (bad size, signature or body) and
+        the orders dropped because the queue was full."""
+        with self._lock:
+            return dict(self._stats)
+
+    def _Count(self, name, count=1):
+        with self._lock:
+            self._stats[name] += count
+
+    def _Authenticate(self, headers, body):
+        signature = headers.get(SIGNATURE_HEADER)
+        if signature:
+            expected = Sign(self._api_key, body)
+            return hmac.compare_digest(signature.encode('utf-8'),
+                                       expected.encode('utf-8'))
+        authorization = headers.get('Authorization')
+        if authorization:
+            return hmac.compare_digest(authorization.encode('utf-8'),
+                                       self._authorization.encode('utf-8'))
+        return False
+
+    def _Parse(self, body):
+        """Returns the models of the orders in a notification body.
+
+        Raises:
+            (ValueError): if the body is not a JSON:API document of orders.
+        """
+        document = self.json_backend.loads(body)
+        data = document.get('data') if isinstance(document, dict) else None
+        if isinstance(data, dict):
+            data = [data]
+        if not isinstance(data, list):
+            raise ValueError('No data member')
+
+        orders = []
+        for resource in data:
+            if not isinstance(resource, dict):
+                raise ValueError('Invalid resource object')
+            attributes = resource.get('attributes') or {}
+            if 'order-items' in attributes:
+                orders.append(Order.NewFromJsonDict(resource))
+            else:
+                orders.append(OrderPreview.NewFromJsonDict(resource))
+        return orders
+
+    def _Enqueue(self, orders):
+        """Queues every order of a notification, or none of them if they
+        do not all fit."""
+        with self._lock:
+            if self._queue.maxsize and \
+                    self._queue.qsize() + len(orders) > self._queue.maxsize:
+                self._stats['dropped'] += len(orders)
+                return False
+            # only this thread adds orders while the lock is held, so these
+            # puts never block
+            for order in orders:
+                self._queue.put_nowait(order)
+            self._stats['received'] += len(orders)
+            return True
+
+    def _Work(self):
+        while True:
+            order = self._queue.get()
+            if order is None:
+                return
+            try:
+                self.handler(order)
+            except Exception:
+                logger.exception('Webhook handler failed for order %s', order.id)
+                self._Count('failed')
+            else:
+                self._Count('processed')